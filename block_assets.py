@@ -37,10 +37,15 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, Optional, Tuple
 
+# Blockstate generation is shared with btg.py (tools/btg_block_assets.py).
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
+from btg_block_assets import FACING, BlockProperty, property_matrix_blockstate  # noqa: E402
+
 
 @dataclass(frozen=True)
 class BlockAssetKind:
@@ -102,15 +107,10 @@ def _write_json(path: Path, data: Any) -> None:
 def generate_facing_open_false_blockstate(namespace: str, block_id: str) -> Dict[str, Any]:
     # Matches BLOCK-ASSETS.md format.
     model = f"{namespace}:block/{block_id}"
-    return {
-        "variants": {
-            "normal": {"model": model},
-            "facing=north,open=false": {"model": model, "y": 0},
-            "facing=east,open=false": {"model": model, "y": 90},
-            "facing=south,open=false": {"model": model, "y": 180},
-            "facing=west,open=false": {"model": model, "y": 270},
-        }
-    }
+    blockstate = property_matrix_blockstate(
+        model, [FACING, BlockProperty("open", ("false",))], encoding="variants"
+    )
+    return {"variants": {"normal": {"model": model}, **blockstate["variants"]}}
 
 
 def generate_inherited_block_model(namespace: str, block_id: str, parent_model_id: str) -> Dict[str, Any]:
@@ -2,13 +2,37 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import io
 import itertools
 import json
 import logging
+import os
+import platform
 import re
-from dataclasses import dataclass
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 # ----------------------------
 # Optional deps with friendly errors
@@ -34,9 +58,33 @@ except Exception:  # pragma: no cover
     Registry = None  # type: ignore[assignment]
     Resource = None  # type: ignore[assignment]
 
+# numpy is optional; it vectorizes distance scoring (autotemplate --tolerance).
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+# fcntl is POSIX-only; it provides the FICLONE ioctl for reflinked outputs.
+try:
+    import fcntl  # type: ignore
+except Exception:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+# orjson is optional; it backs --json-style compact.
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
 LOG = logging.getLogger("btg")
 
+BTG_VERSION = "1.0.0"
+DEFAULT_CACHE_DIR = Path(".btg_cache")
+
 RGBA = Tuple[int, int, int, int]
+RGB = Tuple[int, int, int]
+T = TypeVar("T")
+R = TypeVar("R")
 HEX6_RE = re.compile(r"^#[0-9a-fA-F]{6}$")
 HEX8_RE = re.compile(r"^#[0-9a-fA-F]{8}$")
 HEX6_OR_8_RE = re.compile(r"^#([0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
@@ -79,6 +127,840 @@ def walk_pngs(root: Path, *, recursive: bool = True) -> List[Path]:
     return [p for p in sorted(root.glob("*.png")) if p.is_file()]
 
 
+def iter_files(root: Path, suffix: str) -> Iterator[Path]:
+    """
+    Lazily walk root (sorted per directory) yielding files ending with suffix.
+    """
+    if root.is_file():
+        if root.name.lower().endswith(suffix):
+            yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(suffix):
+                yield Path(dirpath) / name
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    jobs: int = 1,
+    processes: bool = False,
+) -> Iterator[R]:
+    """
+    Ordered, streaming map over a thread pool: at most jobs * 4 items are in
+    flight, so huge inputs are never materialized up front.
+
+    processes: use a process pool instead (CPU-bound work; fn and items must
+    be picklable).
+    """
+    if jobs <= 1:
+        for x in items:
+            yield fn(x)
+        return
+    window = jobs * 4
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=jobs) as pool:
+        pending: deque = deque()
+        for x in items:
+            pending.append(pool.submit(fn, x))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ----------------------------
+# JSON codec (styles + precompiled templates)
+# ----------------------------
+JSON_STYLES = ("pretty", "compact")
+JSON_STYLE = "pretty"
+
+
+def set_json_style(style: str) -> None:
+    global JSON_STYLE
+    if style not in JSON_STYLES:
+        raise ValueError(f"Unknown JSON style: {style}")
+    JSON_STYLE = style
+
+
+def encode_json(data: Any, *, sort_keys: bool = False) -> bytes:
+    """
+    pretty: same text as save_json() (indent=2, raw UTF-8, trailing newline).
+    compact: no whitespace; uses orjson when installed.
+    """
+    if JSON_STYLE == "compact":
+        if orjson is not None:
+            opts = orjson.OPT_APPEND_NEWLINE
+            if sort_keys:
+                opts |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(data, option=opts)
+            except TypeError:
+                pass  # non-str keys, big ints, ...: stdlib handles them
+        text = json.dumps(
+            data, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":")
+        )
+        return (text + "\n").encode("utf-8")
+    text = json.dumps(data, indent=2, ensure_ascii=False, sort_keys=sort_keys)
+    if not text.endswith("\n"):
+        text += "\n"
+    return text.encode("utf-8")
+
+
+TEMPLATE_SLOT_RE = re.compile(r"\\u0000(\w+)\\u0000")
+
+
+class JsonTemplate:
+    """
+    Fixed-shape JSON document with string slots.
+
+    The builder is encoded once per style with marker strings in the slots;
+    render() then only escapes the slot values and splices them in, so the
+    output is byte-identical to encode_json(build(**values)).
+    """
+
+    def __init__(self, build: Callable[..., Any], *slots: str) -> None:
+        self._build = build
+        self._slots = slots
+        self._parts: Dict[str, List[str]] = {}
+
+    def _compile(self, style: str) -> List[str]:
+        markers = {s: f"\0{s}\0" for s in self._slots}
+        text = encode_json(self._build(**markers)).decode("utf-8")
+        # Even indexes are literal text, odd ones slot names.
+        parts = TEMPLATE_SLOT_RE.split(text)
+        self._parts[style] = parts
+        return parts
+
+    def render(self, **values: str) -> bytes:
+        parts = self._parts.get(JSON_STYLE) or self._compile(JSON_STYLE)
+        out = list(parts)
+        for i in range(1, len(out), 2):
+            out[i] = json.dumps(values[out[i]], ensure_ascii=False)[1:-1]
+        return "".join(out).encode("utf-8")
+
+
+# ----------------------------
+# Output writer (pooled, atomic, skip-unchanged)
+# ----------------------------
+
+
+PNG_PROFILES = ("fast", "balanced", "max")
+PNG_PROFILE = "balanced"
+
+
+def set_png_profile(profile: str) -> None:
+    global PNG_PROFILE
+    if profile not in PNG_PROFILES:
+        raise ValueError(f"Unknown PNG profile: {profile}")
+    PNG_PROFILE = profile
+
+
+# Modes that convert to RGBA and back without losing bits.
+PNG_8BIT_MODES = frozenset({"1", "L", "LA", "P", "PA", "RGB", "RGBA"})
+
+
+def png_mode_candidates(img: Image.Image) -> List[Image.Image]:
+    """
+    Lossless re-encodings of img in the smallest modes that hold its pixels:
+    a palette image (<= 256 RGBA colors, alpha in tRNS) and the narrowest of
+    L / LA / RGB / RGBA. Ancillary info (ICC, text, dpi) is dropped.
+
+    Empty for 16-bit/float modes; candidates that do not round-trip to the
+    source pixels are never returned.
+    """
+    if img.mode not in PNG_8BIT_MODES:
+        return []
+    rgba = img.convert("RGBA")
+    raw = rgba.tobytes()
+    keyed = index_pixels(raw[i : i + 4] for i in range(0, len(raw), 4))
+    if keyed is None:
+        alpha_lo, _ = rgba.getextrema()[3]
+        opaque = alpha_lo == 255
+        r, g, b, _ = rgba.split()
+        gray = r.tobytes() == g.tobytes() == b.tobytes()
+    else:
+        colors: List[RGBA] = [tuple(c) for c in keyed[0]]  # type: ignore[misc]
+        opaque = all(c[3] == 255 for c in colors)
+        gray = all(c[0] == c[1] == c[2] for c in colors)
+    mode = ("L" if opaque else "LA") if gray else ("RGB" if opaque else "RGBA")
+    out = [rgba.convert(mode) if mode != "RGBA" else rgba.copy()]
+    if keyed is not None:
+        out.append(indexed_image(rgba.size, keyed[1], colors))
+    for im in out:
+        im.info = {k: v for k, v in im.info.items() if k == "transparency"}
+    return [im for im in out if im.convert("RGBA").tobytes() == raw]
+
+
+def encode_png(img: Image.Image, *, profile: Optional[str] = None) -> bytes:
+    """
+    fast: zlib level 1 (dev loops). balanced: Pillow defaults (unchanged
+    output). max: smallest of the lossless mode candidates, optimize=True,
+    no ancillary chunks.
+    """
+    profile = profile or PNG_PROFILE
+    buf = io.BytesIO()
+    if profile == "fast":
+        img.save(buf, format="PNG", compress_level=1)
+    elif profile == "max":
+        best: Optional[bytes] = None
+        # Modes without candidates are only recompressed, never converted.
+        for im in png_mode_candidates(img) or [img]:
+            buf = io.BytesIO()
+            im.save(buf, format="PNG", optimize=True)
+            if best is None or buf.tell() < len(best):
+                best = buf.getvalue()
+        assert best is not None
+        return best
+    else:
+        img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+FICLONE = 0x40049409  # Linux _IOW(0x94, 9, int)
+
+
+def clone_into(src: Path, dst: Path, data: bytes, mode: str) -> None:
+    """
+    Create dst with src's bytes (== data): hardlink, reflink (FICLONE), or a
+    plain write when the mode is "copy" or the filesystem refuses.
+    """
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    with open(dst, "wb") as fd:
+        if mode == "reflink" and fcntl is not None:
+            try:
+                with open(src, "rb") as fs:
+                    fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+                return
+            except OSError:
+                pass
+        fd.write(data)
+
+
+class OutputWriter:
+    """
+    Sink for generated files.
+
+    - directories are created once per run (cached);
+    - with jobs > 1, encoding and writing run on a thread pool (at most
+      jobs * 4 queued, so callers get back-pressure instead of memory growth);
+    - writes are atomic (temp file in the same folder + os.replace);
+    - files whose bytes already match are left untouched (mtime kept);
+    - *_many() encode once and write every target; with link="hardlink" or
+      "reflink" the extra targets share the first one's data on disk (safe,
+      because later writes replace files instead of editing them).
+
+    close() waits for pending writes and re-raises the first failure.
+    """
+
+    def __init__(self, *, jobs: int = 1, link: str = "copy") -> None:
+        if link not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link}")
+        self.jobs = max(1, int(jobs))
+        self.link = link
+        self.written = 0
+        self.unchanged = 0
+        self._dirs: set[Path] = set()
+        self._lock = threading.Lock()
+        self._pool = (
+            ThreadPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        )
+        self._slots = threading.BoundedSemaphore(self.jobs * 4)
+        self._futures: List[Any] = []
+
+    def ensure_dir(self, p: Path) -> None:
+        if p in self._dirs:
+            return
+        p.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._dirs.add(p)
+
+    def _write_now(
+        self,
+        path: Path,
+        data: bytes,
+        *,
+        source: Optional[Path] = None,
+        link: Optional[str] = None,
+    ) -> bool:
+        """
+        source: an already written file holding data, to link from
+        (link overrides the writer's link mode).
+        """
+        link = link or self.link
+        try:
+            st = path.stat()
+            if st.st_size == len(data) and (
+                (source is not None and os.path.samefile(source, path))
+                or path.read_bytes() == data
+            ):
+                with self._lock:
+                    self.unchanged += 1
+                return False
+        except FileNotFoundError:
+            pass
+        self.ensure_dir(path.parent)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if source is not None and link != "copy":
+                clone_into(source, tmp, data, link)
+            else:
+                tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self.written += 1
+        return True
+
+    def _submit(self, fn: Callable[[], Any]) -> None:
+        if self._pool is None:
+            fn()
+            return
+        self._slots.acquire()
+        try:
+            fut = self._pool.submit(fn)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._futures.append(fut)
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        self._submit(lambda: self._write_now(path, data))
+
+    def write_bytes_now(self, path: Path, data: bytes) -> None:
+        """
+        Write on the calling thread; failures raise here. For callers that
+        delete the source right after.
+        """
+        self._write_now(path, data)
+
+    def write_json(self, path: Path, data: Any, *, sort_keys: bool = False) -> None:
+        self.write_bytes(path, encode_json(data, sort_keys=sort_keys))
+
+    def write_png(self, path: Path, img: Image.Image) -> None:
+        """
+        The image is encoded on the pool; callers must not modify it afterwards.
+        """
+        self._submit(lambda: self._write_now(path, encode_png(img)))
+
+    def _write_many_now(self, paths: List[Path], data: bytes) -> None:
+        first = paths[0]
+        self._write_now(first, data)
+        for path in paths[1:]:
+            self._write_now(path, data, source=first)
+
+    def write_bytes_many(self, paths: Iterable[Path], data: bytes) -> None:
+        targets = list(paths)
+        if targets:
+            self._submit(lambda: self._write_many_now(targets, data))
+
+    def write_png_many(self, paths: Iterable[Path], img: Image.Image) -> None:
+        """
+        Encode img once (on the pool) and write it to every path.
+        """
+        targets = list(paths)
+        if targets:
+            self._submit(lambda: self._write_many_now(targets, encode_png(img)))
+
+    def captures(self, path: Path) -> bool:
+        """
+        True if path goes somewhere other than the filesystem (--zip).
+        """
+        return False
+
+    def write_copy(
+        self, path: Path, source: Path, *, link: Optional[str] = None
+    ) -> None:
+        """
+        Give path the bytes of source, a file already on disk (flush() first if
+        it was written through this writer).
+        """
+        self._submit(
+            lambda: self._write_now(path, source.read_bytes(), source=source, link=link)
+        )
+
+    def flush(self) -> None:
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for fut in futures:
+            fut.result()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+# Synchronous by default; main() installs a pooled writer for each run.
+OUTPUT = OutputWriter()
+
+
+def open_output_writer(
+    jobs: int, link: str = "copy", *, zip_sink: Optional[OutputWriter] = None
+) -> OutputWriter:
+    """
+    zip_sink: a ZipOutputWriter to install instead of a plain writer.
+    """
+    global OUTPUT
+    OUTPUT = zip_sink or OutputWriter(jobs=jobs, link=link)
+    return OUTPUT
+
+
+# ----------------------------
+# Resource pack zips (deterministic, parallel deflate)
+# ----------------------------
+DEFAULT_PACK_FORMAT = 46  # 1.21.4, first version with items/ definitions
+ZIP_DOS_DATE = (0 << 9) | (1 << 5) | 1  # 1980-01-01, 00:00:00 (time 0)
+ZIP_UTF8 = 0x800
+
+
+@dataclass(frozen=True, slots=True)
+class ZipEntry:
+    name: str
+    crc: int
+    size: int
+    data: bytes  # stored bytes or raw deflate stream
+    method: int  # 0 = stored, 8 = deflated
+
+
+def zip_entry(name: str, data: bytes, *, level: int = 6) -> ZipEntry:
+    """
+    Compress one entry (zlib releases the GIL, so threads deflate in
+    parallel). PNGs are stored as-is: their data is already deflated.
+    """
+    crc = zlib.crc32(data)
+    if name.lower().endswith(".png") or not data:
+        return ZipEntry(name, crc, len(data), data, 0)
+    c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    packed = c.compress(data) + c.flush()
+    if len(packed) >= len(data):
+        return ZipEntry(name, crc, len(data), data, 0)
+    return ZipEntry(name, crc, len(data), packed, 8)
+
+
+def unzip_entry(e: ZipEntry) -> bytes:
+    return e.data if e.method == 0 else zlib.decompress(e.data, -15)
+
+
+def pack_mcmeta(description: str, pack_format: int = DEFAULT_PACK_FORMAT) -> bytes:
+    return encode_json(
+        {"pack": {"pack_format": pack_format, "description": description}}
+    )
+
+
+class PackZipWriter:
+    """
+    Minimal streaming zip writer for resource packs.
+
+    Entries are written in the order given with fixed timestamps and
+    attributes, so equal input gives a byte-identical zip. The SHA-1 servers
+    need for resource-pack-sha1 is computed while writing. The file appears
+    atomically on close(). No zip64: at most 65535 entries and 4 GiB.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = 0
+        self._central: List[bytes] = []
+        self._names: set[str] = set()
+        self._offset = 0
+        self._sha1 = hashlib.sha1()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self._fh = open(self._tmp, "wb")
+
+    def _out(self, data: bytes) -> None:
+        self._fh.write(data)
+        self._sha1.update(data)
+        self._offset += len(data)
+
+    def add(self, e: ZipEntry) -> None:
+        if e.name in self._names:
+            raise ValueError(f"Duplicate zip entry: {e.name}")
+        if self.count == 0xFFFF or self._offset + len(e.data) > 0xFFFFFFFF:
+            raise ValueError("Pack too large for a zip without zip64")
+        self._names.add(e.name)
+        name = e.name.encode("utf-8")
+        offset = self._offset
+        self._out(
+            struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                20,
+                ZIP_UTF8,
+                e.method,
+                0,
+                ZIP_DOS_DATE,
+                e.crc,
+                len(e.data),
+                e.size,
+                len(name),
+                0,
+            )
+            + name
+        )
+        self._out(e.data)
+        self._central.append(
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                (3 << 8) | 20,  # made by: UNIX, zip 2.0
+                20,
+                ZIP_UTF8,
+                e.method,
+                0,
+                ZIP_DOS_DATE,
+                e.crc,
+                len(e.data),
+                e.size,
+                len(name),
+                0,
+                0,
+                0,
+                0,
+                0o100644 << 16,
+                offset,
+            )
+            + name
+        )
+        self.count += 1
+
+    def close(self) -> str:
+        """
+        Finish the zip; returns its SHA-1 (hex).
+        """
+        start = self._offset
+        for rec in self._central:
+            self._out(rec)
+        self._out(
+            struct.pack(
+                "<IHHHHIIH",
+                0x06054B50,
+                0,
+                0,
+                self.count,
+                self.count,
+                self._offset - start,
+                start,
+                0,
+            )
+        )
+        self._fh.close()
+        os.replace(self._tmp, self.path)
+        return self._sha1.hexdigest()
+
+    def abort(self) -> None:
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+@dataclass(frozen=True, slots=True)
+class SpooledEntry:
+    """
+    A ZipEntry whose data sits in a spool file at [offset, offset + length).
+    """
+
+    name: str
+    crc: int
+    size: int
+    method: int
+    offset: int
+    length: int
+
+
+def write_pack_sha1(zip_path: Path, sha1: str) -> Path:
+    """
+    <zip>.sha1 in sha1sum format, next to the zip.
+    """
+    out = zip_path.with_name(zip_path.name + ".sha1")
+    out.write_text(f"{sha1}  {zip_path.name}\n", encoding="utf-8")
+    return out
+
+
+class ZipOutputWriter(OutputWriter):
+    """
+    --zip sink: files written under root go into a resource pack zip instead
+    of the filesystem (as assets/<namespace>/<rel> when a namespace is
+    given); everything else is written normally. Without a namespace, root
+    must be a pack root: anything outside assets/ (other than pack.mcmeta
+    and pack.png) is an error.
+
+    Entries are deflated on the writer's pool as they arrive and appended to
+    a temp spool file next to the zip, so only names and offsets stay in
+    memory. close() copies them into the zip in name order, with a default
+    pack.mcmeta unless one was written.
+    """
+
+    def __init__(
+        self,
+        zip_path: Path,
+        root: Path,
+        *,
+        namespace: Optional[str] = None,
+        jobs: int = 1,
+        link: str = "copy",
+        dry_run: bool = False,
+    ) -> None:
+        super().__init__(jobs=jobs, link=link)
+        self.zip_path = zip_path
+        self.root = root.resolve()
+        self.prefix = f"assets/{namespace}/" if namespace else ""
+        self.dry_run = dry_run
+        self.sha1: Optional[str] = None
+        self._entries: Dict[str, SpooledEntry] = {}
+        self._spool: Optional[BinaryIO] = None
+        self._spool_end = 0
+        self._discarded = False
+
+    def entry_name(self, path: Path) -> Optional[str]:
+        try:
+            rel = path.resolve().relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+        if rel == "pack.mcmeta" or rel == "pack.png":
+            return rel
+        if not self.prefix and not rel.startswith("assets/"):
+            raise SystemExit(
+                f"--zip: {rel} is outside assets/ in --zip-root "
+                f"{self.root.as_posix()}; pass --zip-namespace when the root "
+                "is a namespace tree"
+            )
+        return self.prefix + rel
+
+    def _write_now(
+        self,
+        path: Path,
+        data: bytes,
+        *,
+        source: Optional[Path] = None,
+        link: Optional[str] = None,
+    ) -> bool:
+        name = self.entry_name(path)
+        if name is None:
+            return super()._write_now(path, data, source=source, link=link)
+        e = zip_entry(name, data)
+        with self._lock:
+            if self._spool is None:
+                self.zip_path.parent.mkdir(parents=True, exist_ok=True)
+                self._spool = tempfile.TemporaryFile(dir=self.zip_path.parent)
+            # Rewritten names leave their old bytes unused in the spool.
+            self._spool.seek(self._spool_end)
+            self._spool.write(e.data)
+            self._entries[name] = SpooledEntry(
+                name, e.crc, e.size, e.method, self._spool_end, len(e.data)
+            )
+            self._spool_end += len(e.data)
+            self.written += 1
+        return True
+
+    def _load(self, name: str) -> ZipEntry:
+        with self._lock:
+            s = self._entries[name]
+            assert self._spool is not None
+            self._spool.seek(s.offset)
+            data = self._spool.read(s.length)
+        return ZipEntry(s.name, s.crc, s.size, data, s.method)
+
+    def write_copy(
+        self, path: Path, source: Path, *, link: Optional[str] = None
+    ) -> None:
+        name = self.entry_name(source)
+        if name is None or name not in self._entries:
+            super().write_copy(path, source, link=link)
+            return
+        self._submit(lambda: self._write_now(path, unzip_entry(self._load(name))))
+
+    def captures(self, path: Path) -> bool:
+        return self.entry_name(path) is not None
+
+    def discard(self) -> None:
+        """
+        Do not write the zip (the run failed).
+        """
+        self._discarded = True
+
+    def close(self) -> None:
+        try:
+            super().close()
+            if self.dry_run or self._discarded or self.sha1 is not None:
+                return
+            self._write_zip()
+        finally:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+                self._entries.clear()
+
+    def _write_zip(self) -> None:
+        extra: Dict[str, ZipEntry] = {}
+        if "pack.mcmeta" not in self._entries:
+            extra["pack.mcmeta"] = zip_entry(
+                "pack.mcmeta", pack_mcmeta(f"Generated by btg {BTG_VERSION}")
+            )
+        zw = PackZipWriter(self.zip_path)
+        try:
+            for name in sorted([*self._entries, *extra]):
+                zw.add(extra[name] if name in extra else self._load(name))
+        except BaseException:
+            zw.abort()
+            raise
+        self.sha1 = zw.close()
+        write_pack_sha1(self.zip_path, self.sha1)
+        LOG.info(
+            "Wrote %s (%d entries), sha1 %s",
+            self.zip_path.as_posix(),
+            zw.count,
+            self.sha1,
+        )
+
+
+# ----------------------------
+# Indexed (P-mode) PNG output
+# ----------------------------
+K = TypeVar("K")
+
+
+def index_pixels(keys: Iterable[K]) -> Optional[Tuple[List[K], bytes]]:
+    """
+    Unique keys (first-seen order) plus one byte per pixel indexing them;
+    None when there are more than 256 distinct keys.
+    """
+    ids: Dict[K, int] = {}
+    data = bytearray()
+    for k in keys:
+        i = ids.get(k)
+        if i is None:
+            i = len(ids)
+            if i == 256:
+                return None
+            ids[k] = i
+        data.append(i)
+    return list(ids), bytes(data)
+
+
+def indexed_image(
+    size: Tuple[int, int], data: bytes, colors: List[RGBA]
+) -> Image.Image:
+    """
+    P-mode image whose pixel i is colors[data[i]], built from the known
+    colors instead of re-quantizing. Equal colors share one entry and
+    translucent entries come first, so tRNS only covers those.
+    """
+    palette = sorted(dict.fromkeys(colors), key=lambda c: c[3] == 255)
+    pos = {c: i for i, c in enumerate(palette)}
+    table = bytes(pos[c] for c in colors).ljust(256, b"\0")
+    img = Image.frombytes("P", size, data.translate(table))
+    img.putpalette([v for c in palette for v in c[:3]])
+    alphas = bytes(c[3] for c in palette if c[3] != 255)
+    if alphas:
+        img.info["transparency"] = alphas
+    return img
+
+
+# ----------------------------
+# Content-hash caches
+# ----------------------------
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file_set(paths: Iterable[Path], base: Path) -> str:
+    """
+    One hash over (relative path, content) of every file; changes when any
+    file is added, removed, renamed or edited.
+    """
+    h = hashlib.sha256()
+    for p in sorted(x for x in paths if x.is_file()):
+        h.update(rel_posix(p, base).encode("utf-8") + b"\0")
+        h.update(hashlib.sha256(p.read_bytes()).digest())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    JSON-backed key -> entry cache.
+
+    The whole cache is discarded when its fingerprint (tool version, inputs
+    that affect every entry, ...) differs from the one it was written with.
+    Only entries touched during the run are kept on save(), unless the cache
+    is shared between commands (prune=False); max_entries then caps it by
+    dropping entries this run did not touch.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fingerprint: Dict[str, str],
+        *,
+        prune: bool = True,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.fingerprint = dict(fingerprint)
+        self.prune = prune
+        self.max_entries = max_entries
+        self.entries: Dict[str, Any] = {}
+        self.used: Dict[str, Any] = {}
+        self.hits = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+        if path.exists():
+            try:
+                raw = load_json(path)
+            except Exception as e:
+                LOG.debug("Ignoring unreadable cache %s (%s)", path.as_posix(), e)
+                raw = None
+            if isinstance(raw, dict) and raw.get("fingerprint") == self.fingerprint:
+                entries = raw.get("entries")
+                if isinstance(entries, dict):
+                    self.entries = entries
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.used[key] = entry
+            return entry
+
+    def put(self, key: str, entry: Any) -> None:
+        with self._lock:
+            self.entries[key] = entry
+            self.used[key] = entry
+            self.dirty = True
+
+    def save(self) -> None:
+        entries = self.used if self.prune else self.entries
+        if self.max_entries is not None and len(entries) > self.max_entries:
+            room = max(0, self.max_entries - len(self.used))
+            stale = [k for k in entries if k not in self.used]
+            entries = {**{k: entries[k] for k in stale[:room]}, **self.used}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        save_json(
+            tmp,
+            {"fingerprint": self.fingerprint, "entries": entries},
+            sort_keys=True,
+        )
+        tmp.replace(self.path)
+        self.dirty = False
+
+
 # ----------------------------
 # Color / hex helpers
 # ----------------------------
@@ -171,8 +1053,14 @@ def _infer_material_from_path(palette_path: Path) -> str:
 # Palette parsing (schema-driven + legacy)
 # ----------------------------
 def parse_palette_file_any(palette_path: Path) -> List[PaletteItem]:
-    raw = load_json(palette_path)
+    return parse_palette_data(load_json(palette_path), palette_path)
 
+
+def parse_palette_data(raw: Any, palette_path: Path) -> List[PaletteItem]:
+    """
+    Parse an already-loaded palette document (palette_path is used for
+    material inference and error messages).
+    """
     # A) New schema-driven (btg-newest style)
     if isinstance(raw, dict) and raw.get("schema") == "texture-palettes":
         items_raw = raw.get("items") or []
@@ -324,13 +1212,30 @@ def build_registry(schema_dir: Path) -> Optional["Registry"]:
     reg = Registry()
     for p in schema_dir.rglob("*.schema.json"):
         doc = load_json(p)
-        reg = reg.with_resource(p.as_uri(), Resource.from_contents(doc))
+        reg = reg.with_resource(p.resolve().as_uri(), Resource.from_contents(doc))
         sid = doc.get("$id")
         if isinstance(sid, str) and sid:
             reg = reg.with_resource(sid, Resource.from_contents(doc))
     return reg
 
 
+def build_validator(
+    schema_path: Path, schema_dir: Path, *, registry: Optional["Registry"] = None
+) -> Optional["Draft202012Validator"]:
+    """
+    Compile a validator for schema_path (None if jsonschema is not installed).
+    Pass a prebuilt registry to share it between validators.
+    """
+    if Draft202012Validator is None:
+        return None
+    schema = load_json(schema_path)
+    if registry is None:
+        registry = build_registry(schema_dir)
+    if registry is not None:
+        return Draft202012Validator(schema, registry=registry)
+    return Draft202012Validator(schema)
+
+
 def schema_validate(
     instance_path: Path, schema_path: Path, schema_dir: Path
 ) -> List[str]:
@@ -342,24 +1247,202 @@ def schema_validate(
             f"jsonschema is not installed; cannot validate {instance_path.as_posix()} against schema."
         ]
 
-    schema = load_json(schema_path)
-    instance = load_json(instance_path)
-    registry = build_registry(schema_dir)
-    validator = (
-        Draft202012Validator(schema, registry=registry)
-        if registry is not None
-        else Draft202012Validator(schema)
-    )
+    validator = build_validator(schema_path, schema_dir)
+    return validator_errors(validator, load_json(instance_path))
+
+
+def format_validation_error(e: Any) -> str:
+    loc = "$" + ("." + ".".join(map(str, e.path)) if e.path else "")
+    return f"{loc}: {e.message}"
+
+
+def validator_errors(validator: "Draft202012Validator", instance: Any) -> List[str]:
+    """
+    Error strings ("$.json.path: message") for an already-loaded instance.
+    """
     errors = sorted(validator.iter_errors(instance), key=lambda e: list(e.path))
     out: List[str] = []
     for e in errors[:100]:
-        loc = "$" + ("." + ".".join(map(str, e.path)) if e.path else "")
-        out.append(f"{loc}: {e.message}")
+        out.append(format_validation_error(e))
     if len(errors) > 100:
         out.append(f"...and {len(errors) - 100} more")
     return out
 
 
+# ----------------------------
+# Texture color histograms (shared cache)
+# ----------------------------
+def pack_rgba(c: RGBA) -> int:
+    r, g, b, a = c
+    return (r << 24) | (g << 16) | (b << 8) | a
+
+
+def unpack_rgba(v: int) -> RGBA:
+    return ((v >> 24) & 0xFF, (v >> 16) & 0xFF, (v >> 8) & 0xFF, v & 0xFF)
+
+
+@dataclass(frozen=True, slots=True)
+class ColorHistogram:
+    """
+    Unique RGBA colors of one texture (packed, sorted) with pixel counts and
+    an alpha summary.
+    """
+
+    width: int
+    height: int
+    colors: Tuple[int, ...]
+    counts: Tuple[int, ...]
+    transparent: int  # pixels with alpha == 0
+    translucent: int  # pixels with 0 < alpha < 255
+    opaque: int
+
+    @classmethod
+    def from_image(cls, img: Image.Image) -> "ColorHistogram":
+        rgba = img if img.mode == "RGBA" else img.convert("RGBA")
+        w, h = rgba.size
+        pairs = sorted(
+            (pack_rgba(c), n)
+            for n, c in (rgba.getcolors(maxcolors=max(1, w * h)) or [])
+        )
+        transparent = sum(n for v, n in pairs if v & 0xFF == 0)
+        opaque = sum(n for v, n in pairs if v & 0xFF == 0xFF)
+        return cls(
+            width=w,
+            height=h,
+            colors=tuple(v for v, _ in pairs),
+            counts=tuple(n for _, n in pairs),
+            transparent=transparent,
+            translucent=w * h - transparent - opaque,
+            opaque=opaque,
+        )
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "ColorHistogram":
+        return cls(
+            width=int(data["width"]),
+            height=int(data["height"]),
+            colors=tuple(data["colors"]),
+            counts=tuple(data["counts"]),
+            transparent=int(data["alpha"]["transparent"]),
+            translucent=int(data["alpha"]["translucent"]),
+            opaque=int(data["alpha"]["opaque"]),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "colors": list(self.colors),
+            "counts": list(self.counts),
+            "alpha": {
+                "transparent": self.transparent,
+                "translucent": self.translucent,
+                "opaque": self.opaque,
+            },
+        }
+
+    def rgba(self, *, min_alpha: int = 1) -> set[RGBA]:
+        """
+        Unique colors with alpha >= min_alpha.
+        """
+        return {unpack_rgba(v) for v in self.colors if v & 0xFF >= min_alpha}
+
+
+class ShardedResultCache:
+    """
+    ResultCache split into files by the first hex digits of the key, so a run
+    only parses and rewrites the shards it touches. Each shard is capped at
+    max_entries; entries used this run are always kept.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        fingerprint: Dict[str, str],
+        *,
+        prefix: int = 2,
+        max_entries: int = 512,
+    ) -> None:
+        self.root = root
+        self.fingerprint = dict(fingerprint)
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.shards: Dict[str, ResultCache] = {}
+        self._lock = threading.Lock()
+
+    def _shard(self, key: str) -> ResultCache:
+        name = key[: self.prefix]
+        with self._lock:
+            shard = self.shards.get(name)
+            if shard is None:
+                shard = ResultCache(
+                    self.root / f"{name}.json",
+                    self.fingerprint,
+                    prune=False,
+                    max_entries=self.max_entries,
+                )
+                self.shards[name] = shard
+            return shard
+
+    @property
+    def dirty(self) -> bool:
+        return any(shard.dirty for shard in self.shards.values())
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._shard(key).get(key)
+
+    def put(self, key: str, entry: Any) -> None:
+        self._shard(key).put(key, entry)
+
+    def save(self) -> None:
+        for shard in self.shards.values():
+            if shard.dirty:
+                shard.save()
+
+
+# Opened by main() for the duration of one command; None disables caching.
+HISTOGRAM_CACHE: Optional[ShardedResultCache] = None
+
+
+def open_histogram_cache(cache_dir: Optional[Path]) -> None:
+    global HISTOGRAM_CACHE
+    HISTOGRAM_CACHE = (
+        None
+        if cache_dir is None
+        else ShardedResultCache(cache_dir / "histograms", {"format": "1"})
+    )
+
+
+def save_histogram_cache() -> None:
+    cache = HISTOGRAM_CACHE
+    if cache is None or not cache.dirty:
+        return
+    try:
+        ensure_dir(cache.root)
+        cache.save()
+    except OSError as e:
+        LOG.debug("Could not save histogram cache (%s)", e)
+
+
+def texture_histogram(path: Path) -> ColorHistogram:
+    """
+    Color histogram of a PNG, keyed by the hash of its bytes so every command
+    (and every copy of the same texture) shares one decode.
+    """
+    data = path.read_bytes()
+    key = sha256_bytes(data)
+    cache = HISTOGRAM_CACHE
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return ColorHistogram.from_json(hit)
+    with Image.open(io.BytesIO(data)) as img:
+        hist = ColorHistogram.from_image(img)
+    if cache is not None:
+        cache.put(key, hist.to_json())
+    return hist
+
+
 # ----------------------------
 # Palette extraction
 # ----------------------------
@@ -371,14 +1454,13 @@ def extract_palette_from_png(
     - If unique colors <= max_colors: return exact unique colors (sorted).
     - Else: quantize to max_colors, return the used colors (sorted).
     """
-    img = Image.open(png_path).convert("RGBA")
-    pixels = list(img.getdata())
-    uniq = sorted({p for p in pixels if p[3] >= min_alpha})
+    uniq = sorted(texture_histogram(png_path).rgba(min_alpha=min_alpha))
 
     if 0 < len(uniq) <= max_colors:
         return uniq
 
     # Quantize fallback for big palettes
+    img = Image.open(png_path).convert("RGBA")
     q = img.quantize(colors=max_colors, method=Image.Quantize.MEDIANCUT)
     pal = q.getpalette() or []
     used = sorted(set(q.getdata()))
@@ -394,6 +1476,58 @@ def extract_palette_from_png(
     return out[:max_colors]
 
 
+# ----------------------------
+# Tint ramps (single-hue palettes as grayscale x constant tint)
+# ----------------------------
+WHITE_TINT: RGB = (255, 255, 255)
+
+
+def ramp_grays(
+    colors: Iterable[RGBA], *, tolerance: float
+) -> Optional[Tuple[RGB, Dict[RGBA, int]]]:
+    """
+    If every color is (within tolerance, per RGB channel) a scalar multiple of
+    the brightest one, return that color as the tint and a gray level per
+    color so that gray * tint / 255 reproduces it. None otherwise.
+    """
+    cols = sorted(set(colors))
+    if not cols:
+        return None
+    top = max(cols, key=lambda c: (c[0] + c[1] + c[2], c))
+    norm = top[0] * top[0] + top[1] * top[1] + top[2] * top[2]
+    if norm == 0:
+        return None
+    grays: Dict[RGBA, int] = {}
+    for c in cols:
+        k = (c[0] * top[0] + c[1] * top[1] + c[2] * top[2]) / norm
+        if any(abs(c[i] - k * top[i]) > tolerance for i in range(3)):
+            return None
+        grays[c] = max(0, min(255, round(k * 255)))
+    return (top[0], top[1], top[2]), grays
+
+
+def fit_tint(
+    grays: List[int], colors: List[RGBA], *, tolerance: float
+) -> Optional[RGB]:
+    """
+    Least-squares constant tint so that gray_i * tint / 255 ~= colors_i;
+    None if any color ends up further than tolerance on a channel.
+    """
+    den = sum(g * g for g in grays)
+    if den == 0:
+        return None
+    tint = tuple(
+        max(
+            0, min(255, round(255 * sum(g * c[i] for g, c in zip(grays, colors)) / den))
+        )
+        for i in range(3)
+    )
+    for g, c in zip(grays, colors):
+        if any(abs(g * tint[i] / 255 - c[i]) > tolerance for i in range(3)):
+            return None
+    return tint  # type: ignore[return-value]
+
+
 # ----------------------------
 # Recolor helpers
 # ----------------------------
@@ -422,7 +1556,11 @@ def recolor_png(
     preserve_alpha: bool = True,
     min_alpha: int = 1,
     exact_first: bool = True,
+    indexed: bool = False,
 ) -> None:
+    """
+    indexed: write a P-mode PNG when the result has at most 256 colors.
+    """
     img = Image.open(input_png).convert("RGBA")
     pixels: List[RGBA] = list(img.getdata())
 
@@ -432,21 +1570,13 @@ def recolor_png(
         for i, c in enumerate(src_palette):
             exact_map[c] = dst_by_src_index[i]
 
-    cache: Dict[RGBA, RGBA] = {}
-
     def map_pixel(p: RGBA) -> RGBA:
-        if p[3] < min_alpha:
-            return p
-        if p in cache:
-            return cache[p]
-
         if exact_first:
             m = exact_map.get(p)
             if m is not None:
                 dst = m
                 if preserve_alpha:
                     dst = (dst[0], dst[1], dst[2], p[3])
-                cache[p] = dst
                 return dst
 
         best_i = 0
@@ -460,12 +1590,25 @@ def recolor_png(
         dst = dst_by_src_index[best_i]
         if preserve_alpha:
             dst = (dst[0], dst[1], dst[2], p[3])
-        cache[p] = dst
         return dst
 
-    img.putdata([map_pixel(p) for p in pixels])
-    ensure_dir(output_png.parent)
-    img.save(output_png)
+    # Map each unique color once; pixels below min_alpha are left as-is.
+    lut = {
+        c: map_pixel(c) for c in texture_histogram(input_png).rgba(min_alpha=min_alpha)
+    }
+    keyed = index_pixels(pixels) if indexed else None
+    if keyed is not None:
+        colors, data = keyed
+        img = indexed_image(img.size, data, [lut.get(c, c) for c in colors])
+    else:
+        out_pixels = [lut.get(p, p) for p in pixels]
+        # Many input colors can still collapse onto a small palette.
+        keyed = index_pixels(out_pixels) if indexed else None
+        if keyed is not None:
+            img = indexed_image(img.size, keyed[1], keyed[0])
+        else:
+            img.putdata(out_pixels)
+    OUTPUT.write_png(output_png, img)
 
 
 def classify_pixels_for_slots(
@@ -475,10 +1618,13 @@ def classify_pixels_for_slots(
     alpha_weight: float,
     min_alpha: int,
     exact_first: bool,
+    colors: Optional[Iterable[RGBA]] = None,
 ) -> Dict[RGBA, Tuple[int, int]]:
     """
     For each unique pixel (alpha >= min_alpha), decide:
         pixel -> (slot_index, src_color_index)
+
+    colors: the unique colors if already known (e.g. from texture_histogram).
     """
     exact_lookup: Dict[RGBA, Tuple[int, int]] = {}
     if exact_first:
@@ -487,7 +1633,10 @@ def classify_pixels_for_slots(
                 # first wins so templates can intentionally share colors
                 exact_lookup.setdefault(c, (si, ci))
 
-    uniq = {p for p in pixels if p[3] >= min_alpha}
+    if colors is None:
+        uniq = {p for p in pixels if p[3] >= min_alpha}
+    else:
+        uniq = {p for p in colors if p[3] >= min_alpha}
     mapping: Dict[RGBA, Tuple[int, int]] = {}
 
     for p in uniq:
@@ -511,6 +1660,159 @@ def classify_pixels_for_slots(
     return mapping
 
 
+# ----------------------------
+# Slot masks
+# ----------------------------
+# Default key colors for slot masks, by slot index (slots may override via maskColor).
+MASK_KEY_COLORS: List[str] = [
+    "#ff0000ff",
+    "#00ff00ff",
+    "#0000ffff",
+    "#ffff00ff",
+    "#ff00ffff",
+    "#00ffffff",
+    "#ff8000ff",
+    "#8000ffff",
+]
+
+
+def mask_key_colors(explicit: List[Optional[str]]) -> List[RGBA]:
+    """
+    Key color per slot: explicit maskColor if given, else MASK_KEY_COLORS[slot_index].
+    """
+    out: List[RGBA] = []
+    for i, c in enumerate(explicit):
+        if c:
+            out.append(parse_hex8(hex6_to_hex8(c)))
+        elif i < len(MASK_KEY_COLORS):
+            out.append(parse_hex8(MASK_KEY_COLORS[i]))
+        else:
+            raise ValueError(f"Slot {i} needs an explicit maskColor")
+    if len(set(out)) != len(out):
+        raise ValueError("Slot mask key colors must be distinct")
+    return out
+
+
+def build_slot_mask(
+    img: Image.Image,
+    slot_src_palettes: List[List[RGBA]],
+    key_colors: List[RGBA],
+    *,
+    alpha_weight: float = 0.25,
+    min_alpha: int = 1,
+) -> Image.Image:
+    """
+    Paint each opaque template pixel with its slot's key color.
+
+    Seeds are pixels whose color is an exact hit in exactly one slot palette.
+    Regions grow (4-connected) first through exact hits of the same slot, then
+    through the remaining opaque pixels. Pixels not reachable from any seed
+    fall back to classify_pixels_for_slots().
+    """
+    rgba = img if img.mode == "RGBA" else img.convert("RGBA")
+    w, h = rgba.size
+    pixels: List[RGBA] = list(rgba.getdata())
+    slot_sets = [set(p) for p in slot_src_palettes]
+
+    labels: List[int] = [-1] * len(pixels)
+    hits: List[Tuple[int, ...]] = [()] * len(pixels)
+    for i, p in enumerate(pixels):
+        if p[3] < min_alpha:
+            continue
+        hits[i] = tuple(si for si, ss in enumerate(slot_sets) if p in ss)
+        if len(hits[i]) == 1:
+            labels[i] = hits[i][0]
+
+    def grow(exact_only: bool) -> None:
+        queue = deque(i for i, lab in enumerate(labels) if lab >= 0)
+        while queue:
+            i = queue.popleft()
+            si = labels[i]
+            x, y = i % w, i // w
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if not (0 <= nx < w and 0 <= ny < h):
+                    continue
+                j = ny * w + nx
+                if labels[j] >= 0 or pixels[j][3] < min_alpha:
+                    continue
+                if exact_only and si not in hits[j]:
+                    continue
+                labels[j] = si
+                queue.append(j)
+
+    grow(exact_only=True)
+    grow(exact_only=False)
+
+    rest = [p for i, p in enumerate(pixels) if labels[i] < 0 and p[3] >= min_alpha]
+    if rest:
+        by_color = classify_pixels_for_slots(
+            rest,
+            slot_src_palettes,
+            alpha_weight=alpha_weight,
+            min_alpha=min_alpha,
+            exact_first=True,
+        )
+        for i, p in enumerate(pixels):
+            if labels[i] < 0 and p[3] >= min_alpha:
+                labels[i] = by_color[p][0]
+
+    mask = Image.new("RGBA", (w, h))
+    mask.putdata([key_colors[lab] if lab >= 0 else (0, 0, 0, 0) for lab in labels])
+    return mask
+
+
+def classify_pixels_with_mask(
+    pixels: List[RGBA],
+    mask_pixels: List[RGBA],
+    slot_src_palettes: List[List[RGBA]],
+    key_colors: List[RGBA],
+    *,
+    alpha_weight: float,
+    min_alpha: int,
+    exact_first: bool,
+) -> List[Optional[Tuple[int, int]]]:
+    """
+    Per-pixel (slot_index, src_color_index) from a slot mask.
+
+    The slot is read straight from the mask; nearest-color search only runs
+    within that slot's palette. Pixels that are transparent in the template
+    or in the mask are not recolored (None).
+    """
+    if len(pixels) != len(mask_pixels):
+        raise ValueError("Slot mask size does not match template size")
+
+    slot_by_key = {k: si for si, k in enumerate(key_colors)}
+    exact: List[Dict[RGBA, int]] = []
+    for pal in slot_src_palettes:
+        lookup: Dict[RGBA, int] = {}
+        if exact_first:
+            for ci, c in enumerate(pal):
+                lookup.setdefault(c, ci)
+        exact.append(lookup)
+
+    cache: Dict[Tuple[int, RGBA], int] = {}
+    out: List[Optional[Tuple[int, int]]] = []
+    for p, m in zip(pixels, mask_pixels):
+        if p[3] < min_alpha or m[3] == 0:
+            out.append(None)
+            continue
+        si = slot_by_key.get(m)
+        if si is None:
+            raise ValueError(f"Slot mask color {rgba_to_hex8(m)} is not a slot key")
+        ci = cache.get((si, p))
+        if ci is None:
+            ci = exact[si].get(p)
+            if ci is None:
+                pal = slot_src_palettes[si]
+                ci = min(
+                    range(len(pal)),
+                    key=lambda k: color_dist2(p, pal[k], alpha_weight=alpha_weight),
+                )
+            cache[(si, p)] = ci
+        out.append((si, ci))
+    return out
+
+
 # ----------------------------
 # Template formats
 # ----------------------------
@@ -528,6 +1830,7 @@ class TemplateSlot:
     source: SlotSource
     include_ids: Optional[List[str]] = None
     exclude_ids: Optional[List[str]] = None
+    mask_color: Optional[str] = None  # key color in the slot mask PNG
 
 
 @dataclass(frozen=True, slots=True)
@@ -536,6 +1839,7 @@ class TemplateDef:
     template_path: str
     output_pattern: str
     slots: List[TemplateSlot]
+    mask_path: Optional[str] = None  # optional slot mask PNG
 
 
 # Legacy task format (older btg.py)
@@ -627,6 +1931,7 @@ def load_template_def(path: Path) -> TemplateDef:
                     ),
                     include_ids=list(s.get("includeIds") or []) or None,
                     exclude_ids=list(s.get("excludeIds") or []) or None,
+                    mask_color=(str(s["maskColor"]) if s.get("maskColor") else None),
                 )
             )
 
@@ -644,6 +1949,7 @@ def load_template_def(path: Path) -> TemplateDef:
             template_path=template_path,
             output_pattern=output_pattern,
             slots=slots,
+            mask_path=str(t["mask"]) if t.get("mask") else None,
         )
 
     raise ValueError(
@@ -732,11 +2038,21 @@ def minecraft_item_model(namespace: str, item_id: str) -> Dict[str, Any]:
     }
 
 
-def minecraft_item_definition(namespace: str, item_id: str) -> Dict[str, Any]:
+def minecraft_item_definition(
+    namespace: str, item_id: str, tints: Optional[List[RGB]] = None
+) -> Dict[str, Any]:
     # 1.21+ items/ format (simple forwarding file)
-    return {
-        "model": {"type": "minecraft:model", "model": f"{namespace}:item/{item_id}"}
+    model: Dict[str, Any] = {
+        "type": "minecraft:model",
+        "model": f"{namespace}:item/{item_id}",
     }
+    if tints:
+        # 1.21.4+: constant tint per layer (tintindex = position)
+        model["tints"] = [
+            {"type": "minecraft:constant", "value": (r << 16) | (g << 8) | b}
+            for r, g, b in tints
+        ]
+    return {"model": model}
 
 
 def minecraft_block_model_cube_all(namespace: str, block_id: str) -> Dict[str, Any]:
@@ -750,23 +2066,22 @@ def minecraft_blockstate_facing(
     namespace: str, block_id: str, model_ref: Optional[str] = None
 ) -> Dict[str, Any]:
     # Simple facing variants
-    m = model_ref or f"{namespace}:block/{block_id}"
-    return {
-        "variants": {
-            "facing=north": {"model": m, "y": 0},
-            "facing=east": {"model": m, "y": 90},
-            "facing=south": {"model": m, "y": 180},
-            "facing=west": {"model": m, "y": 270},
-        }
-    }
+    from btg_block_assets import FACING, property_matrix_blockstate
 
+    return property_matrix_blockstate(
+        model_ref or f"{namespace}:block/{block_id}", [FACING]
+    )
 
-def merge_lang(
-    existing: Optional[Dict[str, Any]], updates: Dict[str, str]
-) -> Dict[str, Any]:
-    out: Dict[str, Any] = dict(existing or {})
-    out.update(updates)
-    return out
+
+# Precompiled encodings of the default documents above (see JsonTemplate).
+ITEM_MODEL_JSON = JsonTemplate(minecraft_item_model, "namespace", "item_id")
+ITEM_DEFINITION_JSON = JsonTemplate(minecraft_item_definition, "namespace", "item_id")
+BLOCK_MODEL_CUBE_ALL_JSON = JsonTemplate(
+    minecraft_block_model_cube_all, "namespace", "block_id"
+)
+BLOCKSTATE_FACING_JSON = JsonTemplate(
+    minecraft_blockstate_facing, "namespace", "block_id"
+)
 
 
 def walk_json_mutate(obj: Any, fn) -> Any:
@@ -794,6 +2109,185 @@ def rewrite_namespace_strings(data: Any, *, old_ns: str = "modid", new_ns: str)
     return walk_json_mutate(data, repl)
 
 
+# ----------------------------
+# Lang files (run-scoped accumulator)
+# ----------------------------
+def load_lang(path: Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    data = load_json(path)
+    if not isinstance(data, dict):
+        return {}
+    out: Dict[str, str] = {}
+    for k, v in data.items():
+        if isinstance(k, str):
+            out[k] = str(v)
+    return out
+
+
+def encode_lang(data: Dict[str, str]) -> bytes:
+    """
+    Lang file bytes: keys sorted, in the run's --json-style.
+    """
+    return encode_json(data, sort_keys=True)
+
+
+def save_lang(path: Path, data: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(encode_lang(data))
+
+
+class FileLock:
+    """
+    Cross-process lock via an exclusively created <path>.lock file.
+    Locks older than `stale` seconds are assumed abandoned and broken.
+    """
+
+    def __init__(self, path: Path, *, timeout: float = 30.0, stale: float = 120.0):
+        self.path = path.with_name(path.name + ".lock")
+        self.timeout = timeout
+        self.stale = stale
+
+    def __enter__(self) -> "FileLock":
+        ensure_dir(self.path.parent)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - self.path.stat().st_mtime > self.stale:
+                        LOG.warning("Breaking stale lock %s", self.path.as_posix())
+                        self.path.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.path.as_posix()}")
+                time.sleep(0.05)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return self
+
+    def __exit__(self, *exc: Any) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class LangAccumulator:
+    """
+    Collects lang key updates for a whole run; flush() writes every touched
+    lang file once.
+
+    The flush is atomic (temp file + rename) and conflict-aware: under a
+    per-file lock it re-reads the file, applies only this run's keys on top
+    of whatever other processes/shards wrote meanwhile, and warns when a key
+    was changed concurrently to a different value.
+
+    main() creates one per run (args.lang_acc) and flushes it after the
+    command; callers that bypass main() must flush themselves.
+    """
+
+    def __init__(self) -> None:
+        self._base: Dict[Path, Dict[str, str]] = {}
+        self._pending: Dict[Path, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _view(self, path: Path) -> Tuple[Dict[str, str], Dict[str, str]]:
+        if path not in self._base:
+            self._base[path] = load_lang(path)
+            self._pending[path] = {}
+        return self._base[path], self._pending[path]
+
+    def get(self, path: Path, key: str) -> Optional[str]:
+        with self._lock:
+            base, pending = self._view(path)
+            return pending.get(key, base.get(key))
+
+    def set(self, path: Path, key: str, value: str, *, overwrite: bool = True) -> bool:
+        """
+        Returns True if the key changes (or is added).
+        """
+        with self._lock:
+            base, pending = self._view(path)
+            current = pending.get(key, base.get(key))
+            if current is not None and (not overwrite or current == value):
+                return False
+            pending[key] = value
+            return True
+
+    def update(
+        self, path: Path, updates: Dict[str, str], *, overwrite: bool = True
+    ) -> int:
+        return sum(
+            self.set(path, k, v, overwrite=overwrite) for k, v in updates.items()
+        )
+
+    def flush(
+        self, *, dry_run: bool = False, sink: Optional["OutputWriter"] = None
+    ) -> int:
+        """
+        Write pending keys; returns the number of files written.
+
+        sink: the run's output writer; files it captures (--zip) are merged
+        in memory and handed to it instead of being written to disk.
+        """
+        written = 0
+        with self._lock:
+            for path, pending in self._pending.items():
+                if not pending:
+                    continue
+                if dry_run:
+                    LOG.info(
+                        "[DRY] Would update %s (%d key(s))",
+                        path.as_posix(),
+                        len(pending),
+                    )
+                    continue
+                base = self._base[path]
+                if sink is not None and sink.captures(path):
+                    merged = {**base, **pending}
+                    sink.write_bytes(path, encode_lang(merged))
+                    self._base[path] = merged
+                    self._pending[path] = {}
+                    written += 1
+                    continue
+                with FileLock(path):
+                    current = load_lang(path)
+                    for k, v in pending.items():
+                        theirs = current.get(k)
+                        if theirs is not None and theirs != base.get(k) and theirs != v:
+                            LOG.warning(
+                                "%s: '%s' changed concurrently (%r), overwriting with %r",
+                                path.as_posix(),
+                                k,
+                                theirs,
+                                v,
+                            )
+                    current.update(pending)
+                    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+                    save_lang(tmp, current)
+                    tmp.replace(path)
+                self._base[path] = current
+                self._pending[path] = {}
+                written += 1
+        return written
+
+
+def run_lang(args: argparse.Namespace) -> LangAccumulator:
+    """
+    The run's lang accumulator (created on first use if main() did not).
+    """
+    acc = getattr(args, "lang_acc", None)
+    if acc is None:
+        acc = LangAccumulator()
+        args.lang_acc = acc
+    return acc
+
+
 # ----------------------------
 # Output layout helpers
 # ----------------------------
@@ -819,6 +2313,26 @@ class OutputLayout:
         return out
 
 
+def write_layout_files(
+    bases: List[Tuple[str, Path]],
+    files: List[Tuple[str, Callable[[List[Path]], None]]],
+    *,
+    dry_run: bool = False,
+) -> None:
+    """
+    files: (path relative to a base, writer taking every target path).
+    """
+    if dry_run:
+        for tag, base in bases:
+            for rel, _ in files:
+                LOG.info("[DRY:%s] Would write %s", tag, (base / rel).as_posix())
+        return
+    if not bases:
+        return
+    for rel, write in files:
+        write([base / rel for _, base in bases])
+
+
 def write_item_outputs(
     layout: OutputLayout,
     *,
@@ -830,43 +2344,55 @@ def write_item_outputs(
     generate_models_json: bool = True,
     generate_lang: bool = True,
     dry_run: bool = False,
+    lang: Optional[LangAccumulator] = None,
 ) -> None:
-    for tag, base in layout.bases():
-        tex_path = base / "textures" / "item" / f"{item_id}.png"
-        model_path = base / "models" / "item" / f"{item_id}.json"
-        item_def_path = base / "items" / f"{item_id}.json"
-        lang_path = base / "lang" / lang_file
-
-        if dry_run:
-            LOG.info("[DRY:%s] Would write %s", tag, tex_path.as_posix())
-        else:
-            ensure_dir(tex_path.parent)
-            texture_png.save(tex_path)
-
-        if generate_models_json:
-            if dry_run:
-                LOG.info("[DRY:%s] Would write %s", tag, model_path.as_posix())
-            else:
-                save_json(model_path, minecraft_item_model(layout.namespace, item_id))
-
-        if generate_items_json:
-            if dry_run:
-                LOG.info("[DRY:%s] Would write %s", tag, item_def_path.as_posix())
-            else:
-                save_json(
-                    item_def_path, minecraft_item_definition(layout.namespace, item_id)
-                )
+    """
+    Each file is encoded once and written to every layout base.
 
-        if generate_lang:
-            existing = (
-                load_json(lang_path) if (not dry_run and lang_path.exists()) else {}
+    lang: run accumulator for lang keys; without one the lang file is
+    updated immediately.
+    """
+    bases = layout.bases()
+    files: List[Tuple[str, Callable[[List[Path]], None]]] = [
+        (
+            f"textures/item/{item_id}.png",
+            lambda paths: OUTPUT.write_png_many(paths, texture_png),
+        )
+    ]
+    if generate_models_json:
+        files.append(
+            (
+                f"models/item/{item_id}.json",
+                lambda paths: OUTPUT.write_bytes_many(
+                    paths,
+                    ITEM_MODEL_JSON.render(namespace=layout.namespace, item_id=item_id),
+                ),
             )
-            updates = {f"item.{layout.namespace}.{item_id}": display_name}
-            merged = merge_lang(existing, updates)
-            if dry_run:
-                LOG.info("[DRY:%s] Would update %s", tag, lang_path.as_posix())
-            else:
-                save_json(lang_path, merged, sort_keys=True)
+        )
+    if generate_items_json:
+        files.append(
+            (
+                f"items/{item_id}.json",
+                lambda paths: OUTPUT.write_bytes_many(
+                    paths,
+                    ITEM_DEFINITION_JSON.render(
+                        namespace=layout.namespace, item_id=item_id
+                    ),
+                ),
+            )
+        )
+    write_layout_files(bases, files, dry_run=dry_run)
+
+    if generate_lang:
+        acc = lang or LangAccumulator()
+        for _, base in bases:
+            acc.set(
+                base / "lang" / lang_file,
+                f"item.{layout.namespace}.{item_id}",
+                display_name,
+            )
+        if lang is None:
+            acc.flush(dry_run=dry_run)
 
 
 def write_block_outputs(
@@ -879,39 +2405,73 @@ def write_block_outputs(
     blockstate_json: Optional[Dict[str, Any]] = None,
     lang_file: str = "en_us.json",
     dry_run: bool = False,
+    collect: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
+    lang: Optional[LangAccumulator] = None,
 ) -> None:
-    for tag, base in layout.bases():
-        tex_path = base / "textures" / "block" / f"{block_id}.png"
-        model_path = base / "models" / "block" / f"{block_id}.json"
-        blockstates_path = base / "blockstates" / f"{block_id}.json"
-        lang_path = base / "lang" / lang_file
-
-        if dry_run:
-            LOG.info("[DRY:%s] Would write %s", tag, tex_path.as_posix())
-        else:
-            ensure_dir(tex_path.parent)
-            texture_png.save(tex_path)
+    """
+    Each file is encoded once and written to every layout base.
 
+    collect: (models, blockstates) dicts that receive this block's model and
+    blockstate instead of writing them (for optimize_block_assets).
+    lang: as for write_item_outputs.
+    """
+    bases = layout.bases()
+    files: List[Tuple[str, Callable[[List[Path]], None]]] = [
+        (
+            f"textures/block/{block_id}.png",
+            lambda paths: OUTPUT.write_png_many(paths, texture_png),
+        )
+    ]
+    if collect is not None:
         # If not provided, fall back to cube_all + simple facing
-        model = block_model_json or minecraft_block_model_cube_all(
+        collect[0][block_id] = block_model_json or minecraft_block_model_cube_all(
             layout.namespace, block_id
         )
-        bs = blockstate_json or minecraft_blockstate_facing(layout.namespace, block_id)
-
-        if dry_run:
-            LOG.info("[DRY:%s] Would write %s", tag, model_path.as_posix())
-            LOG.info("[DRY:%s] Would write %s", tag, blockstates_path.as_posix())
-        else:
-            save_json(model_path, model)
-            save_json(blockstates_path, bs)
-
-        existing = load_json(lang_path) if (not dry_run and lang_path.exists()) else {}
-        updates = {f"block.{layout.namespace}.{block_id}": display_name}
-        merged = merge_lang(existing, updates)
-        if dry_run:
-            LOG.info("[DRY:%s] Would update %s", tag, lang_path.as_posix())
-        else:
-            save_json(lang_path, merged, sort_keys=True)
+        collect[1][block_id] = blockstate_json or minecraft_blockstate_facing(
+            layout.namespace, block_id
+        )
+    else:
+        files.append(
+            (
+                f"models/block/{block_id}.json",
+                lambda paths: OUTPUT.write_bytes_many(
+                    paths,
+                    (
+                        encode_json(block_model_json)
+                        if block_model_json
+                        else BLOCK_MODEL_CUBE_ALL_JSON.render(
+                            namespace=layout.namespace, block_id=block_id
+                        )
+                    ),
+                ),
+            )
+        )
+        files.append(
+            (
+                f"blockstates/{block_id}.json",
+                lambda paths: OUTPUT.write_bytes_many(
+                    paths,
+                    (
+                        encode_json(blockstate_json)
+                        if blockstate_json
+                        else BLOCKSTATE_FACING_JSON.render(
+                            namespace=layout.namespace, block_id=block_id
+                        )
+                    ),
+                ),
+            )
+        )
+    write_layout_files(bases, files, dry_run=dry_run)
+
+    acc = lang or LangAccumulator()
+    for _, base in bases:
+        acc.set(
+            base / "lang" / lang_file,
+            f"block.{layout.namespace}.{block_id}",
+            display_name,
+        )
+    if lang is None:
+        acc.flush(dry_run=dry_run)
 
 
 # ----------------------------
@@ -981,7 +2541,7 @@ def cmd_normalize(args: argparse.Namespace) -> int:
             if args.dry_run:
                 LOG.info("[DRY] Would normalize %s", p.as_posix())
             else:
-                save_json(p, raw)
+                OUTPUT.write_json(p, raw)
                 LOG.info("Normalized %s", p.as_posix())
             changed_count += 1
 
@@ -990,133 +2550,626 @@ def cmd_normalize(args: argparse.Namespace) -> int:
 
 
 # ----------------------------
-# Command: validate
+# Command: normalize-images (RGBA, resolution, resource-location names)
 # ----------------------------
-def cmd_validate(args: argparse.Namespace) -> int:
-    palettes_dir = Path(args.palettes or "palettes")
-    schemas_dir = Path(args.schemas or "schemas")
-
-    files = sorted(palettes_dir.rglob("*.texture-palettes.json"))
-    if not files:
-        LOG.warning("No palette files found under %s", palettes_dir.as_posix())
-        return 0
+def to_resource_id(name: str) -> str:
+    """
+    "Oak Barrel-Top", "oakBarrelTop" -> "oak_barrel_top" (valid resource-location id).
+    """
+    s = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name)
+    s = re.sub(r"[^a-z0-9_.]+", "_", s.lower())
+    s = re.sub(r"_+", "_", s).strip("_.")
+    return s or "unnamed"
 
-    schema_path = schemas_dir / "texture-palettes.schema.json"
-    ok = True
 
-    for p in files:
-        try:
-            raw = load_json(p)
-        except Exception as e:
-            ok = False
-            LOG.error("FAIL %s (invalid JSON: %s)", p.as_posix(), e)
-            continue
+def normalized_rel_path(rel: Path) -> Path:
+    parts = [to_resource_id(x) for x in rel.parent.parts]
+    return Path(*parts, to_resource_id(rel.stem) + ".png")
 
-        # If schema-driven and schema exists, validate structure
-        if (
-            isinstance(raw, dict)
-            and raw.get("schema") == "texture-palettes"
-            and schema_path.exists()
-        ):
-            errs = schema_validate(p, schema_path, schemas_dir)
-            if errs and not (
-                len(errs) == 1 and errs[0].startswith("jsonschema is not installed")
-            ):
-                ok = False
-                LOG.error("FAIL %s\n%s", p.as_posix(), "\n".join(errs))
-                continue
 
-        # Semantic checks: all colors must be hex8 after normalization
-        try:
-            items = parse_palette_file_any(p)
-            if not items:
-                raise ValueError("No palette items parsed.")
-            for it in items:
-                for gid, grp in it.groups.items():
-                    for c in grp.colors:
-                        c8 = hex6_to_hex8(c)
-                        if not HEX8_RE.match(c8):
-                            raise ValueError(f"{it.id}.{gid}: invalid color {c!r}")
-        except Exception as e:
-            ok = False
-            LOG.error("FAIL %s (%s)", p.as_posix(), e)
-            continue
+def normalized_size(w: int, h: int, target: Optional[int]) -> Tuple[int, int]:
+    """
+    Scale to target width; vertical animation strips keep square frames.
+    """
+    if not target or w == target:
+        return w, h
+    if h > w and h % w == 0:
+        return target, target * (h // w)
+    return target, max(1, round(h * target / w))
+
+
+def normalize_image(src: Path, target: Optional[int]) -> Image.Image:
+    with Image.open(src) as img:
+        out = img.convert("RGBA")
+    size = normalized_size(out.width, out.height, target)
+    if size != out.size:
+        out = out.resize(size, Image.Resampling.NEAREST)
+    # Drop text/ICC/EXIF/dpi so only pixel data is written.
+    out.info.clear()
+    return out
 
-        LOG.info("OK %s", p.as_posix())
 
-    return 0 if ok else 2
+def same_file(a: Path, b: Path) -> bool:
+    """
+    True if a and b are one file on disk (case-insensitive filesystems,
+    symlinks); False if either is missing.
+    """
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
 
 
-# ----------------------------
-# Command: extract
-# ----------------------------
-def cmd_extract(args: argparse.Namespace) -> int:
-    textures_dir = Path(args.textures or "textures")
-    palettes_dir = Path(args.palettes or "palettes")
-    schema_ref = str(args.schema_ref or "../../schemas/texture-palettes.schema.json")
-    max_colors = int(args.max_colors or 32)
-    min_alpha = int(args.min_alpha or 1)
-    generator_version = str(args.generator_version or "1.0.0")
+def cmd_normalize_images(args: argparse.Namespace) -> int:
+    input_dir = Path(args.input or "textures_input")
+    in_place = bool(getattr(args, "in_place", False))
+    if not in_place and not args.output:
+        raise SystemExit("normalize-images: pass --output DIR or --in-place")
+    output_dir = input_dir if in_place else Path(args.output)
+    target = int(args.size) if args.size else None
+    jobs = max(1, int(getattr(args, "jobs", 1) or 1))
+    rename_map_path = Path(args.rename_map or (output_dir / "rename-map.json"))
     dry_run = bool(args.dry_run)
 
-    pngs = [p for p in sorted(textures_dir.rglob("*.png")) if p.is_file()]
-    if not pngs:
-        LOG.warning("No textures found under %s", textures_dir.as_posix())
+    files = walk_pngs(input_dir, recursive=True)
+    if not files:
+        LOG.warning("No PNG files found in %s", input_dir.as_posix())
         return 0
 
-    count = 0
-    for png in pngs:
-        material = png.parent.name or "unknown"
-        item_id = png.stem
-        out_path = palettes_dir / material / f"{item_id}.texture-palettes.json"
-        colors = extract_palette_from_png(
-            png, max_colors=max_colors, min_alpha=min_alpha
+    # Decide destinations up front so renames can't silently overwrite each other:
+    # any clash aborts the run before a single file is written.
+    plan: List[Tuple[Path, Path, str]] = []
+    claimed: Dict[str, List[Path]] = {}
+    renames: Dict[str, str] = {}
+    for f in files:
+        rel = f.relative_to(input_dir) if input_dir.is_dir() else Path(f.name)
+        new_rel = normalized_rel_path(rel)
+        key = new_rel.as_posix()
+        claimed.setdefault(key, []).append(f)
+        if new_rel != rel:
+            renames[rel.as_posix()] = key
+        plan.append((f, output_dir / new_rel, key))
+    clashes = {k: v for k, v in claimed.items() if len(v) > 1}
+    for key, srcs in clashes.items():
+        LOG.error(
+            "FAIL %s: all normalize to %s",
+            ", ".join(p.as_posix() for p in srcs),
+            key,
         )
+    if clashes:
+        LOG.error(
+            "Normalize-images aborted: %d name clash(es), nothing written.",
+            len(clashes),
+        )
+        return 2
 
-        payload: Dict[str, Any] = {
-            "$schema": schema_ref,
-            "schema": "texture-palettes",
-            "version": 1,
-            "generator": {"name": "btg", "version": generator_version},
-            "items": [
-                {
-                    "id": item_id,
-                    "name": item_id.replace("_", " ").title(),
-                    "path": f"textures/{material}/{png.name}".replace("\\", "/"),
-                    "material": material,
-                    "groups": {
-                        "base": {
-                            "comment": f"Extracted from {png.as_posix()}",
-                            "colors": [rgba_to_hex8(c) for c in colors],
-                        }
-                    },
-                }
-            ],
-        }
+    cache = ResultCache(
+        Path(getattr(args, "cache_dir", None) or DEFAULT_CACHE_DIR)
+        / "normalize-images.json",
+        {"btg": BTG_VERSION, "size": str(target or "")},
+    )
 
+    def run(job: Tuple[Path, Path, str]) -> str:
+        src, dst, key = job
+        data = src.read_bytes()
+        digest = sha256_bytes(data)
+        # The source is only removed once dst holds its normalized bytes, and
+        # never when dst is the same file (e.g. Oak.png -> oak.png on a
+        # case-insensitive filesystem) or lives in the --zip sink.
+        move = in_place and not same_file(src, dst) and not OUTPUT.captures(dst)
+        hit = cache.get(digest)
+        if hit is not None and dst.exists():
+            if sha256_bytes(dst.read_bytes()) == hit["out"]:
+                if move and not dry_run:
+                    src.unlink()
+                return "skipped"
         if dry_run:
-            LOG.info("[DRY] Would write %s", out_path.as_posix())
+            LOG.info("[DRY] Would normalize %s -> %s", src.as_posix(), dst.as_posix())
+            return "written"
+        data = encode_png(normalize_image(src, target))
+        if move:
+            OUTPUT.write_bytes_now(dst, data)
         else:
-            save_json(out_path, payload)
-            LOG.info("Wrote %s", out_path.as_posix())
-        count += 1
+            OUTPUT.write_bytes(dst, data)
+        out_digest = sha256_bytes(data)
+        cache.put(digest, {"out": out_digest})
+        cache.put(out_digest, {"out": out_digest})
+        if move:
+            src.unlink()
+        LOG.info("Normalized %s -> %s", src.as_posix(), dst.as_posix())
+        return "written"
+
+    counts: Dict[str, int] = {"written": 0, "skipped": 0}
+    for status in bounded_map(run, plan, jobs=jobs):
+        counts[status] += 1
+
+    if renames:
+        if dry_run:
+            LOG.info("[DRY] Would write rename map %s", rename_map_path.as_posix())
+        else:
+            OUTPUT.write_json(rename_map_path, renames, sort_keys=True)
+            LOG.info("Wrote rename map %s", rename_map_path.as_posix())
+    if not dry_run:
+        cache.save()
 
-    LOG.info("Extract complete (%d file(s)).", count)
+    LOG.info(
+        "Normalize-images complete: %d written, %d already normalized, %d renamed.",
+        counts["written"],
+        counts["skipped"],
+        len(renames),
+    )
     return 0
 
 
 # ----------------------------
-# Command: recolor (single swap)
+# Command: optimize-pngs (lossless recompression, process pool)
 # ----------------------------
-def cmd_recolor(args: argparse.Namespace) -> int:
-    palettes_dir = Path(args.palettes or "palettes")
-    src_palette_rel = str(args.src_palette)
-    dst_palette_rel = str(args.dst_palette)
-    src_id = str(args.src_id)
-    dst_id = str(args.dst_id)
-
-    group = args.group  # optional; if None -> default group of each item
-
+def optimize_png_file(job: Tuple[str, str]) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Process-pool worker: re-encode one PNG with a profile. Returns (bytes if
+    smaller else None, error if the file could not be read or decoded).
+    """
+    path, profile = job
+    try:
+        # Pillow decodes 16-bit RGB(A) to 8 bits, so those are left alone.
+        if read_png_header(Path(path)).bit_depth > 8:
+            return None, None
+        data = Path(path).read_bytes()
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            out = encode_png(img, profile=profile)
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+    return (out if len(out) < len(data) else None), None
+
+
+def cmd_optimize_pngs(args: argparse.Namespace) -> int:
+    root = Path(args.input or "output")
+    profile = str(args.profile or "max")
+    jobs = max(1, int(args.jobs or os.cpu_count() or 1))
+    dry_run = bool(args.dry_run)
+
+    files = walk_pngs(root, recursive=True)
+    if not files:
+        LOG.warning("No PNG files found in %s", root.as_posix())
+        return 0
+
+    cache: Optional[ResultCache] = None
+    if not getattr(args, "no_cache", False):
+        cache = ResultCache(
+            Path(getattr(args, "cache_dir", None) or DEFAULT_CACHE_DIR)
+            / "optimize-pngs.json",
+            {"btg": BTG_VERSION, "profile": profile, "pillow": Image.__version__},
+        )
+
+    # Files already known to be optimal are skipped without decoding. Only
+    # digests of this run's files are kept, so the cache tracks the tree.
+    todo: List[Tuple[Path, str, int]] = []
+    cached = 0
+    for f in files:
+        data = f.read_bytes()
+        digest = sha256_bytes(data)
+        hit = cache.get(digest) if cache is not None else None
+        if hit is not None and hit.get("out") == digest:
+            cached += 1
+            continue
+        todo.append((f, digest, len(data)))
+
+    rows: List[Dict[str, Any]] = []
+    failures: List[Dict[str, str]] = []
+    before = after = 0
+    results = bounded_map(
+        optimize_png_file,
+        [(f.as_posix(), profile) for f, _, _ in todo],
+        jobs=jobs,
+        processes=True,
+    )
+    for (f, digest, size), (out, error) in zip(todo, results):
+        if error is not None:
+            LOG.error("FAIL %s: %s", f.as_posix(), error)
+            failures.append({"path": f.as_posix(), "error": error})
+            continue
+        if out is None:
+            if cache is not None:
+                cache.put(digest, {"out": digest})
+            continue
+        out_digest = sha256_bytes(out)
+        before += size
+        after += len(out)
+        rows.append({"path": f.as_posix(), "before": size, "after": len(out)})
+        if dry_run:
+            LOG.info("[DRY] %s: %d -> %d bytes", f.as_posix(), size, len(out))
+            continue
+        OUTPUT.write_bytes(f, out)
+        if cache is not None:
+            cache.put(out_digest, {"out": out_digest})
+        LOG.debug("Optimized %s: %d -> %d bytes", f.as_posix(), size, len(out))
+    if cache is not None and cache.dirty and not dry_run:
+        cache.save()
+
+    if args.report == "json":
+        data = {
+            "profile": profile,
+            "files": len(files),
+            "optimized": len(rows),
+            "cached": cached,
+            "bytes_before": before,
+            "bytes_after": after,
+            "bytes_saved": before - after,
+            "failed": len(failures),
+            "results": rows,
+            "failures": failures,
+        }
+        write_report(
+            json.dumps(data, indent=2, ensure_ascii=False) + "\n",
+            getattr(args, "report_out", None),
+        )
+    LOG.info(
+        "Optimize-pngs complete: %d of %d file(s) smaller (%d cached as optimal, %d failed), saved %s (%s -> %s).",
+        len(rows),
+        len(files),
+        cached,
+        len(failures),
+        human_bytes(before - after),
+        human_bytes(before),
+        human_bytes(after),
+    )
+    return 2 if failures else 0
+
+
+# ----------------------------
+# Command: pack (resource pack zip)
+# ----------------------------
+def pack_entries(root: Path, namespace: Optional[str]) -> List[Tuple[str, Path]]:
+    """
+    (entry name, file) pairs, sorted by name. A root holding pack.mcmeta or
+    assets/ is a pack root; otherwise it is one namespace tree and goes
+    under assets/<namespace>/, so namespace is required. Dotfiles (writer
+    temp files) and lock files are skipped.
+    """
+    is_pack_root = (root / "pack.mcmeta").is_file() or (root / "assets").is_dir()
+    if not is_pack_root and not namespace:
+        raise SystemExit(
+            f"pack: {root.as_posix()} has no pack.mcmeta or assets/; pass "
+            "--namespace to pack it as assets/<namespace>/"
+        )
+    prefix = "" if is_pack_root else f"assets/{namespace}/"
+    out: List[Tuple[str, Path]] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if name.startswith(".") or name.endswith(".lock"):
+                continue
+            f = Path(dirpath) / name
+            out.append((prefix + f.relative_to(root).as_posix(), f))
+    return sorted(out)
+
+
+def cmd_pack(args: argparse.Namespace) -> int:
+    root = Path(args.input or "output")
+    out = Path(args.out or f"{root.name}.zip")
+    jobs = max(1, int(args.jobs or os.cpu_count() or 1))
+    level = int(args.level)
+    if not root.is_dir():
+        raise SystemExit(f"pack: not a directory: {root.as_posix()}")
+
+    # (name, file or generated bytes)
+    entries: List[Tuple[str, Any]] = pack_entries(root, args.namespace)
+    if not any(name == "pack.mcmeta" for name, _ in entries):
+        mcmeta = pack_mcmeta(
+            str(args.description or f"Generated by btg {BTG_VERSION}"),
+            int(args.pack_format),
+        )
+        entries = sorted(entries + [("pack.mcmeta", mcmeta)])
+    if args.dry_run:
+        LOG.info(
+            "[DRY] Would pack %d file(s) from %s into %s",
+            len(entries),
+            root.as_posix(),
+            out.as_posix(),
+        )
+        return 0
+
+    def load(item: Tuple[str, Any]) -> ZipEntry:
+        name, src = item
+        data = src if isinstance(src, bytes) else src.read_bytes()
+        return zip_entry(name, data, level=level)
+
+    # Files are read and deflated on the pool, written in name order.
+    zw = PackZipWriter(out)
+    stored = 0
+    try:
+        for e in bounded_map(load, entries, jobs=jobs):
+            zw.add(e)
+            stored += e.method == 0
+    except BaseException:
+        zw.abort()
+        raise
+    sha1 = zw.close()
+    sidecar = write_pack_sha1(out, sha1)
+    LOG.info(
+        "Pack complete: %s, %d entries (%d stored), %s; sha1 written to %s.",
+        out.as_posix(),
+        zw.count,
+        stored,
+        human_bytes(out.stat().st_size),
+        sidecar.as_posix(),
+    )
+    print(sha1)
+    return 0
+
+
+# ----------------------------
+# Command: validate
+# ----------------------------
+@dataclass(slots=True)
+class FileCheck:
+    path: Path
+    ok: bool
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    cached: bool = False
+
+
+def check_palette_file(
+    p: Path, validator: Optional["Draft202012Validator"], data: Optional[bytes] = None
+) -> FileCheck:
+    """
+    Schema + semantic checks for one palette file; the file is read and parsed once.
+    """
+    t0 = time.perf_counter()
+    try:
+        raw = json.loads((data if data is not None else p.read_bytes()).decode("utf-8"))
+    except Exception as e:
+        return FileCheck(p, False, [f"invalid JSON: {e}"], time.perf_counter() - t0)
+
+    # If schema-driven and schema exists, validate structure
+    if (
+        validator is not None
+        and isinstance(raw, dict)
+        and raw.get("schema") == "texture-palettes"
+    ):
+        errs = validator_errors(validator, raw)
+        if errs:
+            return FileCheck(p, False, errs, time.perf_counter() - t0)
+
+    # Semantic checks: all colors must be hex8 after normalization
+    try:
+        items = parse_palette_data(raw, p)
+        if not items:
+            raise ValueError("No palette items parsed.")
+        for it in items:
+            for gid, grp in it.groups.items():
+                for c in grp.colors:
+                    c8 = hex6_to_hex8(c)
+                    if not HEX8_RE.match(c8):
+                        raise ValueError(f"{it.id}.{gid}: invalid color {c!r}")
+    except Exception as e:
+        return FileCheck(p, False, [str(e)], time.perf_counter() - t0)
+
+    return FileCheck(p, True, [], time.perf_counter() - t0)
+
+
+def log_file_check(r: FileCheck) -> None:
+    if r.ok:
+        LOG.info("OK %s%s", r.path.as_posix(), " (cached)" if r.cached else "")
+    elif len(r.errors) == 1 and not r.errors[0].startswith("$"):
+        LOG.error("FAIL %s (%s)", r.path.as_posix(), r.errors[0])
+    else:
+        LOG.error("FAIL %s\n%s", r.path.as_posix(), "\n".join(r.errors))
+
+
+def render_check_report(
+    results: List[FileCheck], fmt: str, *, suite: str, seconds: float
+) -> str:
+    """
+    Machine-readable per-file report: "json" or "junit" (JUnit XML).
+    """
+    failures = sum(1 for r in results if not r.ok)
+    if fmt == "json":
+        data = {
+            "suite": suite,
+            "ok": failures == 0,
+            "total": len(results),
+            "failures": failures,
+            "seconds": round(seconds, 6),
+            "files": [
+                {
+                    "path": r.path.as_posix(),
+                    "status": "ok" if r.ok else "fail",
+                    "seconds": round(r.seconds, 6),
+                    "cached": r.cached,
+                    "errors": r.errors,
+                }
+                for r in results
+            ],
+        }
+        return json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+
+    if fmt == "junit":
+        ts = ET.Element(
+            "testsuite",
+            name=suite,
+            tests=str(len(results)),
+            failures=str(failures),
+            errors="0",
+            time=f"{seconds:.6f}",
+        )
+        for r in results:
+            tc = ET.SubElement(
+                ts,
+                "testcase",
+                classname=suite,
+                name=r.path.as_posix(),
+                time=f"{r.seconds:.6f}",
+            )
+            if not r.ok:
+                fail = ET.SubElement(tc, "failure", message=r.errors[0][:200])
+                fail.text = "\n".join(r.errors)
+        ET.indent(ts)
+        return ET.tostring(ts, encoding="unicode", xml_declaration=True) + "\n"
+
+    raise ValueError(f"Unknown report format '{fmt}' (expected json or junit)")
+
+
+def write_report(text: str, out: Optional[str]) -> None:
+    if out:
+        out_path = Path(out)
+        # Written right away so the log line below only follows a real write.
+        OUTPUT.write_bytes_now(out_path, text.encode("utf-8"))
+        LOG.info("Wrote report %s", out_path.as_posix())
+    else:
+        print(text, end="")
+
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    palettes_dir = Path(args.palettes or "palettes")
+    schemas_dir = Path(args.schemas or "schemas")
+    jobs = max(1, int(getattr(args, "jobs", 1) or 1))
+    report = getattr(args, "report", None)
+
+    files = sorted(palettes_dir.rglob("*.texture-palettes.json"))
+    if not files:
+        LOG.warning("No palette files found under %s", palettes_dir.as_posix())
+        return 0
+
+    t0 = time.perf_counter()
+    schema_path = schemas_dir / "texture-palettes.schema.json"
+    validator = None
+    if schema_path.exists():
+        # Registry + validator are compiled once and shared by all workers.
+        validator = build_validator(schema_path, schemas_dir)
+        if validator is None:
+            LOG.warning("jsonschema is not installed; skipping schema checks.")
+
+    # Outcomes are cached by file content hash; the cache is dropped whenever
+    # anything under schemas/ or the btg version changes.
+    cache: Optional[ResultCache] = None
+    if not bool(getattr(args, "no_cache", False)):
+        cache_dir = Path(getattr(args, "cache_dir", None) or DEFAULT_CACHE_DIR)
+        cache = ResultCache(
+            cache_dir / "validate.json",
+            {
+                "btg": BTG_VERSION,
+                "schemas": hash_file_set(schemas_dir.rglob("*"), schemas_dir),
+                "jsonschema": "yes" if validator is not None else "no",
+            },
+        )
+
+    def check(p: Path) -> FileCheck:
+        t1 = time.perf_counter()
+        try:
+            data = p.read_bytes()
+        except OSError as e:
+            return FileCheck(p, False, [str(e)], time.perf_counter() - t1)
+        if cache is None:
+            return check_palette_file(p, validator, data)
+        digest = sha256_bytes(data)
+        hit = cache.get(digest)
+        if hit is not None:
+            return FileCheck(p, bool(hit["ok"]), list(hit["errors"]), 0.0, True)
+        r = check_palette_file(p, validator, data)
+        cache.put(digest, {"ok": r.ok, "errors": r.errors})
+        return r
+
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(check, files))
+    else:
+        results = [check(p) for p in files]
+
+    for r in results:
+        log_file_check(r)
+
+    if cache is not None:
+        LOG.info("Validate cache: %d/%d file(s) unchanged.", cache.hits, len(files))
+        if not bool(args.dry_run):
+            cache.save()
+
+    if report:
+        write_report(
+            render_check_report(
+                results,
+                str(report),
+                suite="btg.validate",
+                seconds=time.perf_counter() - t0,
+            ),
+            getattr(args, "report_out", None),
+        )
+
+    return 0 if all(r.ok for r in results) else 2
+
+
+# ----------------------------
+# Command: extract
+# ----------------------------
+def cmd_extract(args: argparse.Namespace) -> int:
+    textures_dir = Path(args.textures or "textures")
+    palettes_dir = Path(args.palettes or "palettes")
+    schema_ref = str(args.schema_ref or "../../schemas/texture-palettes.schema.json")
+    max_colors = int(args.max_colors or 32)
+    min_alpha = int(args.min_alpha or 1)
+    generator_version = str(args.generator_version or "1.0.0")
+    dry_run = bool(args.dry_run)
+
+    pngs = [p for p in sorted(textures_dir.rglob("*.png")) if p.is_file()]
+    if not pngs:
+        LOG.warning("No textures found under %s", textures_dir.as_posix())
+        return 0
+
+    count = 0
+    for png in pngs:
+        material = png.parent.name or "unknown"
+        item_id = png.stem
+        out_path = palettes_dir / material / f"{item_id}.texture-palettes.json"
+        colors = extract_palette_from_png(
+            png, max_colors=max_colors, min_alpha=min_alpha
+        )
+
+        payload: Dict[str, Any] = {
+            "$schema": schema_ref,
+            "schema": "texture-palettes",
+            "version": 1,
+            "generator": {"name": "btg", "version": generator_version},
+            "items": [
+                {
+                    "id": item_id,
+                    "name": item_id.replace("_", " ").title(),
+                    "path": f"textures/{material}/{png.name}".replace("\\", "/"),
+                    "material": material,
+                    "groups": {
+                        "base": {
+                            "comment": f"Extracted from {png.as_posix()}",
+                            "colors": [rgba_to_hex8(c) for c in colors],
+                        }
+                    },
+                }
+            ],
+        }
+
+        if dry_run:
+            LOG.info("[DRY] Would write %s", out_path.as_posix())
+        else:
+            OUTPUT.write_json(out_path, payload)
+            LOG.info("Wrote %s", out_path.as_posix())
+        count += 1
+
+    LOG.info("Extract complete (%d file(s)).", count)
+    return 0
+
+
+# ----------------------------
+# Command: recolor (single swap)
+# ----------------------------
+def cmd_recolor(args: argparse.Namespace) -> int:
+    palettes_dir = Path(args.palettes or "palettes")
+    src_palette_rel = str(args.src_palette)
+    dst_palette_rel = str(args.dst_palette)
+    src_id = str(args.src_id)
+    dst_id = str(args.dst_id)
+
+    group = args.group  # optional; if None -> default group of each item
+
     input_dir = Path(args.input or "textures_input")
     output_dir = Path(args.output or "output/textures/item")
     recursive = not bool(args.no_recursive)
@@ -1124,6 +3177,7 @@ def cmd_recolor(args: argparse.Namespace) -> int:
     preserve_alpha = not bool(args.no_preserve_alpha)
     exact_first = not bool(args.no_exact_first)
     min_alpha = int(args.min_alpha or 1)
+    indexed = bool(getattr(args, "indexed", False))
     dry_run = bool(args.dry_run)
 
     src_item = find_palette_item(palettes_dir, src_palette_rel, src_id)
@@ -1159,6 +3213,7 @@ def cmd_recolor(args: argparse.Namespace) -> int:
             preserve_alpha=preserve_alpha,
             min_alpha=min_alpha,
             exact_first=exact_first,
+            indexed=indexed,
         )
         LOG.info("Recolored %s -> %s", f.as_posix(), out_path.as_posix())
 
@@ -1176,6 +3231,8 @@ def cmd_recolor_templates(args: argparse.Namespace) -> int:
     lang_file = str(args.lang_file or "en_us.json")
     write_modid_tree = not bool(args.no_modid_tree)
     write_flat_tree = not bool(args.no_flat_tree)
+    dedupe_models = bool(getattr(args, "dedupe_models", False))
+    indexed = bool(getattr(args, "indexed", False))
     dry_run = bool(args.dry_run)
 
     template_files = sorted(templates_dir.rglob("*.btg-template.json"))
@@ -1192,6 +3249,10 @@ def cmd_recolor_templates(args: argparse.Namespace) -> int:
         write_flat_tree=write_flat_tree,
     )
 
+    collected: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = (
+        ({}, {}) if dedupe_models else None
+    )
+
     total = 0
     for tf in template_files:
         try:
@@ -1215,6 +3276,10 @@ def cmd_recolor_templates(args: argparse.Namespace) -> int:
 
             img = Image.open(base_texture).convert("RGBA")
             pixels: List[RGBA] = list(img.getdata())
+            # --indexed: swap the unique colors only, then index them.
+            keyed = index_pixels(pixels) if indexed else None
+            if keyed is not None:
+                pixels = keyed[0]
 
             # Apply swaps sequentially (last wins), by exact palette mapping only.
             # (Legacy format is intended for exact palette colors.)
@@ -1234,8 +3299,11 @@ def cmd_recolor_templates(args: argparse.Namespace) -> int:
                     new_pixels.append(m if m is not None else p)
                 pixels = new_pixels
 
-            out_img = Image.new("RGBA", img.size)
-            out_img.putdata(pixels)
+            if keyed is not None:
+                out_img = indexed_image(img.size, keyed[1], pixels)
+            else:
+                out_img = Image.new("RGBA", img.size)
+                out_img.putdata(pixels)
 
             if t.kind == "block":
                 block_model_json: Optional[Dict[str, Any]] = None
@@ -1271,6 +3339,8 @@ def cmd_recolor_templates(args: argparse.Namespace) -> int:
                     blockstate_json=blockstate_json,
                     lang_file=lang_file,
                     dry_run=dry_run,
+                    collect=collected,
+                    lang=run_lang(args),
                 )
             else:
                 # item
@@ -1284,87 +3354,180 @@ def cmd_recolor_templates(args: argparse.Namespace) -> int:
                     generate_models_json=True,
                     generate_lang=True,
                     dry_run=dry_run,
+                    lang=run_lang(args),
                 )
 
             total += 1
 
+    if collected is not None and collected[0]:
+        from btg_block_assets import log_optimized, optimize_block_assets
+
+        opt = optimize_block_assets(namespace, collected[0], collected[1])
+        for _, base in layout.bases():
+            opt.write(base, dry_run=dry_run, writer=OUTPUT)
+        log_optimized(opt, len(collected[0]))
+
     LOG.info("Legacy recolor-templates complete: %d task(s).", total)
     return 0
 
 
 # ----------------------------
-# Command: generate (schema-driven multi-slot templates)
+# Template preflight (schema, cross-references, combinations, collisions)
 # ----------------------------
-def cmd_generate(args: argparse.Namespace) -> int:
-    templates_dir = Path(args.templates or "textures_input")
-    palettes_dir = Path(args.palettes or "palettes")
-    output_dir = Path(args.output or "output/textures/item")
-    alpha_weight = float(args.alpha_weight or 0.25)
-    min_alpha = int(args.min_alpha or 1)
-    preserve_alpha = not bool(args.no_preserve_alpha)
-    exact_first = not bool(args.no_exact_first)
-    dry_run = bool(args.dry_run)
-    limit = int(args.limit) if args.limit is not None else None
+@dataclass(slots=True)
+class TemplatePlan:
+    """
+    A schema-driven template with every reference resolved, ready for pixel work.
+    """
 
-    palette_index = load_all_palettes_index(palettes_dir)
+    template_file: Path
+    tdef: TemplateDef
+    template_png: Path
+    mask_png: Optional[Path]
+    slot_src_palettes: List[List[RGBA]]
+    slot_choices: List[List[str]]
+
+    @property
+    def combinations(self) -> int:
+        n = 1
+        for ids in self.slot_choices:
+            n *= len(ids)
+        return n
+
+    def combos(self, limit: Optional[int] = None) -> Iterable[Tuple[str, ...]]:
+        combos: Iterable[Tuple[str, ...]] = itertools.product(*self.slot_choices)
+        if limit is not None:
+            combos = itertools.islice(combos, int(limit))
+        return combos
 
-    template_files = sorted(templates_dir.rglob("*.btg-template.json"))
-    if not template_files:
-        LOG.warning(
-            "No schema-driven templates found under %s", templates_dir.as_posix()
-        )
-        return 0
+    def output_name(self, combo: Tuple[str, ...]) -> str:
+        mapping = {self.tdef.slots[i].slot: combo[i] for i in range(len(combo))}
+        return safe_format_pattern(self.tdef.output_pattern, mapping)
+
+
+def resolve_template_asset(template_file: Path, rel: str) -> Path:
+    """
+    Template-referenced files are relative to the template file folder;
+    paths written relative to the working directory (autotemplate) also resolve.
+    """
+    p = Path(rel)
+    if p.is_absolute():
+        return p
+    cand = (template_file.parent / rel).resolve()
+    if cand.exists() or not p.exists():
+        return cand
+    return p.resolve()
 
-    total_written = 0
+
+def preflight_templates(
+    template_files: List[Path],
+    palettes_dir: Path,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    *,
+    validator: Optional["Draft202012Validator"] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[TemplatePlan], List[str]]:
+    """
+    One cheap pass over all schema-driven templates, before any pixel work:
+    schema check, slot palette/id resolution through the index, combination
+    counts and output filename collisions (within and across templates).
+
+    Returns (plans, errors). Legacy task templates are skipped.
+    """
+    by_file_id: Dict[Tuple[Path, str], PaletteItem] = {}
+    for by_id in palette_index.values():
+        for ref in by_id.values():
+            by_file_id[(ref.file_path.resolve(), ref.item.id)] = ref.item
+
+    plans: List[TemplatePlan] = []
+    errors: List[str] = []
+    outputs: Dict[str, Tuple[TemplatePlan, Tuple[str, ...]]] = {}
 
     for tf in template_files:
+        where = tf.as_posix()
+        try:
+            raw = load_json(tf)
+        except Exception as e:
+            errors.append(f"{where}: invalid JSON ({e})")
+            continue
+        if not isinstance(raw, dict) or raw.get("schema") != "btg-template":
+            LOG.debug("Preflight: skipping non schema-driven template %s", where)
+            continue
+
+        if validator is not None:
+            errs = validator_errors(validator, raw)
+            if errs:
+                errors.extend(f"{where}: {e}" for e in errs)
+                continue
         try:
             tdef = load_template_def(tf)
-        except Exception:
-            continue  # ignore legacy templates here
-
-        template_png = Path(tdef.template_path)
-        if not template_png.is_absolute():
-            # allow paths relative to the template file folder
-            cand = (tf.parent / tdef.template_path).resolve()
-            template_png = cand
+        except Exception as e:
+            errors.append(f"{where}: {e}")
+            continue
+
+        ok = True
+        template_png = resolve_template_asset(tf, tdef.template_path)
         if not template_png.exists():
-            raise SystemExit(
-                f"Template PNG not found: {tdef.template_path} (from {tf.as_posix()})"
-            )
+            errors.append(f"{where}: template PNG not found: {tdef.template_path}")
+            ok = False
+        mask_png: Optional[Path] = None
+        if tdef.mask_path:
+            mask_png = resolve_template_asset(tf, tdef.mask_path)
+            if not mask_png.exists():
+                errors.append(f"{where}: slot mask PNG not found: {tdef.mask_path}")
+                ok = False
+            try:
+                mask_key_colors([s.mask_color for s in tdef.slots])
+            except ValueError as e:
+                errors.append(f"{where}: {e}")
+                ok = False
 
-        # Build slot sources: src palettes (from source palette + id + group)
         slot_src_palettes: List[List[RGBA]] = []
         slot_choices: List[List[str]] = []
-
         for slot in tdef.slots:
+            sw = f"{where}: slot '{slot.slot}'"
             material_map = palette_index.get(slot.material, {})
             if not material_map:
-                raise SystemExit(
-                    f"No palettes found for material '{slot.material}' under {palettes_dir.as_posix()}"
-                )
-
-            ids = sorted(material_map.keys())
-            ids = apply_includes_excludes(ids, slot.include_ids, slot.exclude_ids)
-            if not ids:
-                raise SystemExit(
-                    f"After include/exclude, slot '{slot.slot}' has no ids for material '{slot.material}'"
+                errors.append(
+                    f"{sw}: no palettes for material '{slot.material}' under {palettes_dir.as_posix()}"
                 )
+                ok = False
+                continue
 
-            src_palette_path = Path(slot.source.palette)
-            if not src_palette_path.is_absolute():
-                src_palette_path = (palettes_dir / slot.source.palette).resolve()
-            if not src_palette_path.exists():
-                raise SystemExit(
-                    f"Slot source palette not found: {src_palette_path.as_posix()}"
+            unknown = [x for x in (slot.include_ids or []) if x not in material_map]
+            if unknown:
+                errors.append(
+                    f"{sw}: includeIds not found for material '{slot.material}': {', '.join(unknown)}"
                 )
+                ok = False
+            ids = apply_includes_excludes(
+                sorted(material_map.keys()), slot.include_ids, slot.exclude_ids
+            )
+            if not ids:
+                errors.append(f"{sw}: no ids left after include/exclude")
+                ok = False
 
-            src_items = parse_palette_file_any(src_palette_path)
-            src_item = next((i for i in src_items if i.id == slot.source.id), None)
-            if not src_item:
-                raise SystemExit(
-                    f"Source id '{slot.source.id}' not found in {src_palette_path.as_posix()}"
+            src_path = Path(slot.source.palette)
+            if not src_path.is_absolute():
+                src_path = palettes_dir / slot.source.palette
+            src_item = by_file_id.get((src_path.resolve(), slot.source.id))
+            if src_item is None:
+                if not src_path.exists():
+                    errors.append(
+                        f"{sw}: source palette not found: {src_path.as_posix()}"
+                    )
+                else:
+                    errors.append(
+                        f"{sw}: source id '{slot.source.id}' not found in {src_path.as_posix()}"
+                    )
+                ok = False
+                continue
+            if slot.source.group and slot.source.group not in src_item.groups:
+                errors.append(
+                    f"{sw}: source group '{slot.source.group}' not found for '{src_item.id}'"
                 )
+                ok = False
+                continue
             src_group = (
                 src_item.group(slot.source.group)
                 if slot.source.group
@@ -1373,245 +3536,2336 @@ def cmd_generate(args: argparse.Namespace) -> int:
             slot_src_palettes.append(src_group.colors_rgba())
             slot_choices.append(ids)
 
-        # Precompute per-pixel classification once per template
-        img = Image.open(template_png).convert("RGBA")
-        pixels: List[RGBA] = list(img.getdata())
-        pixel_class = classify_pixels_for_slots(
-            pixels,
-            slot_src_palettes,
-            alpha_weight=alpha_weight,
-            min_alpha=min_alpha,
-            exact_first=exact_first,
+        if not ok:
+            continue
+
+        plan = TemplatePlan(
+            template_file=tf,
+            tdef=tdef,
+            template_png=template_png,
+            mask_png=mask_png,
+            slot_src_palettes=slot_src_palettes,
+            slot_choices=slot_choices,
         )
+        try:
+            for combo in plan.combos(limit):
+                name = plan.output_name(combo)
+                if name not in outputs:
+                    outputs[name] = (plan, combo)
+                    continue
+                other, other_combo = outputs[name]
+                errors.append(
+                    f"Output collision: '{name}' from {where} {'/'.join(combo)} "
+                    f"and {other.template_file.as_posix()} {'/'.join(other_combo)}"
+                )
+                ok = False
+        except ValueError as e:
+            errors.append(f"{where}: {e}")
+            ok = False
+        if ok:
+            plans.append(plan)
 
-        combos: Iterable[Tuple[str, ...]] = itertools.product(*slot_choices)
-        if limit is not None:
-            combos = itertools.islice(combos, int(limit))
+    return plans, errors
 
-        for combo in combos:
-            mapping = {tdef.slots[i].slot: combo[i] for i in range(len(combo))}
-            filename = safe_format_pattern(tdef.output_pattern, mapping)
-            out_path = output_dir / filename
 
-            if dry_run:
-                LOG.info("[DRY] %s -> %s", template_png.name, out_path.as_posix())
-                total_written += 1
-                continue
+def load_template_validator(schemas_dir: Path) -> Optional["Draft202012Validator"]:
+    schema_path = schemas_dir / "btg-template.schema.json"
+    if not schema_path.exists():
+        LOG.debug("No %s; skipping template schema checks", schema_path.as_posix())
+        return None
+    return build_validator(schema_path, schemas_dir)
 
-            # Destination palettes for this combo (default group)
-            slot_dst_palettes: List[List[RGBA]] = []
-            for i, dst_id in enumerate(combo):
-                material = tdef.slots[i].material
-                ref = palette_index[material][dst_id]
-                _, grp = ref.item.default_group()
-                slot_dst_palettes.append(grp.colors_rgba())
-
-            slot_dst_by_src = [
-                build_index_map(src, dst)
-                for src, dst in zip(slot_src_palettes, slot_dst_palettes, strict=True)
+
+def run_preflight(
+    templates_dir: Path,
+    palettes_dir: Path,
+    schemas_dir: Path,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    *,
+    limit: Optional[int] = None,
+) -> Tuple[List[TemplatePlan], List[str]]:
+    template_files = sorted(templates_dir.rglob("*.btg-template.json"))
+    return preflight_templates(
+        template_files,
+        palettes_dir,
+        palette_index,
+        validator=load_template_validator(schemas_dir),
+        limit=limit,
+    )
+
+
+def cmd_preflight(args: argparse.Namespace) -> int:
+    templates_dir = Path(args.templates or "textures_input")
+    palettes_dir = Path(args.palettes or "palettes")
+    schemas_dir = Path(args.schemas or "schemas")
+    limit = int(args.limit) if args.limit is not None else None
+
+    palette_index = load_all_palettes_index(palettes_dir)
+    plans, errors = run_preflight(
+        templates_dir, palettes_dir, schemas_dir, palette_index, limit=limit
+    )
+    for plan in plans:
+        LOG.info(
+            "OK %s: %d slot(s), %d combination(s)",
+            plan.template_file.as_posix(),
+            len(plan.slot_choices),
+            plan.combinations,
+        )
+    for e in errors:
+        LOG.error("FAIL %s", e)
+
+    total = sum(
+        plan.combinations if limit is None else min(limit, plan.combinations)
+        for plan in plans
+    )
+    LOG.info(
+        "Preflight complete: %d template(s), %d output(s), %d error(s).",
+        len(plans),
+        total,
+        len(errors),
+    )
+    return 0 if not errors else 2
+
+
+# ----------------------------
+# Command: generate (schema-driven multi-slot templates)
+# ----------------------------
+def classify_template_pixels(
+    plan: TemplatePlan,
+    img: Image.Image,
+    pixels: List[RGBA],
+    *,
+    alpha_weight: float,
+    min_alpha: int,
+    exact_first: bool,
+) -> List[Optional[Tuple[int, int]]]:
+    """
+    Per-pixel (slot_index, src_color_index), None for pixels left unchanged.
+    Uses the slot mask when the template has one.
+    """
+    if plan.mask_png is not None:
+        mask = Image.open(plan.mask_png).convert("RGBA")
+        if mask.size != img.size:
+            raise ValueError(
+                f"Slot mask {plan.mask_png.as_posix()} is {mask.size}, template is {img.size}"
+            )
+        return classify_pixels_with_mask(
+            pixels,
+            list(mask.getdata()),
+            plan.slot_src_palettes,
+            mask_key_colors([s.mask_color for s in plan.tdef.slots]),
+            alpha_weight=alpha_weight,
+            min_alpha=min_alpha,
+            exact_first=exact_first,
+        )
+
+    pixel_class = classify_pixels_for_slots(
+        pixels,
+        plan.slot_src_palettes,
+        alpha_weight=alpha_weight,
+        min_alpha=min_alpha,
+        exact_first=exact_first,
+        colors=texture_histogram(plan.template_png).rgba(min_alpha=min_alpha),
+    )
+    return [pixel_class[p] if p[3] >= min_alpha else None for p in pixels]
+
+
+def combo_dst_palettes(
+    plan: TemplatePlan,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    combo: Tuple[str, ...],
+) -> List[List[RGBA]]:
+    """
+    Destination palettes for one combo (default group of each chosen id).
+    """
+    out: List[List[RGBA]] = []
+    for i, dst_id in enumerate(combo):
+        ref = palette_index[plan.tdef.slots[i].material][dst_id]
+        _, grp = ref.item.default_group()
+        out.append(grp.colors_rgba())
+    return out
+
+
+def template_pixel_keys(
+    pixels: List[RGBA],
+    pixel_slots: List[Optional[Tuple[int, int]]],
+    *,
+    preserve_alpha: bool = True,
+) -> Optional[Tuple[List[Any], bytes]]:
+    """
+    Per-template input for render_combo(keys=...): pixels reduced to what
+    their output color depends on ((slot, index) and alpha, or the fixed
+    color), indexed once. None when that exceeds 256 keys (RGBA fallback).
+    """
+    return index_pixels(
+        (None, p) if cls is None else (cls, p[3] if preserve_alpha else 255)
+        for p, cls in zip(pixels, pixel_slots)
+    )
+
+
+def render_combo(
+    size: Tuple[int, int],
+    pixels: List[RGBA],
+    pixel_slots: List[Optional[Tuple[int, int]]],
+    slot_src_palettes: List[List[RGBA]],
+    slot_dst_palettes: List[List[RGBA]],
+    *,
+    preserve_alpha: bool = True,
+    keys: Optional[Tuple[List[Any], bytes]] = None,
+) -> Image.Image:
+    """
+    keys: template_pixel_keys() of this template; the result is then a P-mode
+    image built without touching individual pixels.
+    """
+    slot_dst_by_src = [
+        build_index_map(src, dst)
+        for src, dst in zip(slot_src_palettes, slot_dst_palettes, strict=True)
+    ]
+
+    if keys is not None:
+        colors: List[RGBA] = []
+        for cls, v in keys[0]:
+            if cls is None:
+                colors.append(v)
+                continue
+            dst = slot_dst_by_src[cls[0]][cls[1]]
+            colors.append((dst[0], dst[1], dst[2], v) if preserve_alpha else dst)
+        return indexed_image(size, keys[1], colors)
+
+    out_pixels: List[RGBA] = []
+    for p, cls in zip(pixels, pixel_slots):
+        if cls is None:
+            out_pixels.append(p)
+            continue
+        si, ci = cls
+        dst = slot_dst_by_src[si][ci]
+        if preserve_alpha:
+            dst = (dst[0], dst[1], dst[2], p[3])
+        out_pixels.append(dst)
+
+    out_img = Image.new("RGBA", size)
+    out_img.putdata(out_pixels)
+    return out_img
+
+
+# ----------------------------
+# Paletted permutations (atlas source output for generate)
+# ----------------------------
+@dataclass(frozen=True, slots=True)
+class TextureTarget:
+    """
+    Where generate output lives as a resource pack texture.
+    """
+
+    namespace: str
+    textures_root: Path  # .../assets/<namespace>/textures (or .../textures)
+    texture_dir: str  # output dir relative to textures_root, e.g. "item"
+    atlas_path: Path
+
+
+def texture_target(
+    output_dir: Path, namespace: str, atlas: Optional[Path] = None
+) -> TextureTarget:
+    """
+    Split e.g. output/assets/modid/textures/item into namespace "modid",
+    texture dir "item" and the vanilla blocks atlas at
+    output/assets/minecraft/atlases/blocks.json.
+    """
+    parts = output_dir.parts
+    if "textures" not in parts:
+        raise SystemExit(
+            f"--output {output_dir.as_posix()} must be inside a textures/ folder "
+            "for paletted output"
+        )
+    i = len(parts) - 1 - parts[::-1].index("textures")
+    textures_root = Path(*parts[: i + 1])
+    texture_dir = "/".join(parts[i + 1 :])
+    # Flat trees (output/textures/...) get output/atlases/blocks.json.
+    atlas_dir = textures_root.parent / "atlases"
+    if i >= 2 and parts[i - 2] == "assets":
+        namespace = parts[i - 1]
+        atlas_dir = textures_root.parent.parent / "minecraft" / "atlases"
+    return TextureTarget(
+        namespace=namespace,
+        textures_root=textures_root,
+        texture_dir=texture_dir,
+        atlas_path=atlas or atlas_dir / "blocks.json",
+    )
+
+
+def permutation_key_colors(n: int, reserved: Iterable[RGBA]) -> List[RGBA]:
+    """
+    n distinct opaque grays, evenly spread and avoiding the RGB of pixels the
+    template leaves unchanged (the atlas source matches keys by RGB).
+    """
+    taken = {(c[0], c[1], c[2]) for c in reserved}
+    free = [v for v in range(256) if (v, v, v) not in taken]
+    if n > len(free):
+        raise ValueError(f"{n} key colors needed, only {len(free)} free gray levels")
+    if n == 1:
+        return [(free[-1],) * 3 + (255,)]
+    return [
+        (v, v, v, 255)
+        for v in (free[round(i * (len(free) - 1) / (n - 1))] for i in range(n))
+    ]
+
+
+def palette_strip(colors: List[RGBA]) -> Image.Image:
+    img = Image.new("RGBA", (len(colors), 1))
+    img.putdata(colors)
+    return img
+
+
+def build_paletted_permutations(
+    plan: TemplatePlan,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    size: Tuple[int, int],
+    pixels: List[RGBA],
+    pixel_slots: List[Optional[Tuple[int, int]]],
+    *,
+    limit: Optional[int] = None,
+    preserve_alpha: bool = True,
+) -> Tuple[Image.Image, Image.Image, Dict[str, Image.Image]]:
+    """
+    (grayscale base texture, key palette, {output stem: palette strip}).
+
+    Key entry k stands for one (slot, source color) pair; every combo gets a
+    strip with that pair's mapped destination color at position k, i.e. the
+    same colors render_combo() would have written.
+    """
+    offsets: List[int] = []
+    n = 0
+    for pal in plan.slot_src_palettes:
+        offsets.append(n)
+        n += len(pal)
+
+    keys = permutation_key_colors(
+        n, (p for p, cls in zip(pixels, pixel_slots) if cls is None and p[3] > 0)
+    )
+    base: List[RGBA] = []
+    for p, cls in zip(pixels, pixel_slots):
+        if cls is None:
+            base.append(p)
+            continue
+        k = keys[offsets[cls[0]] + cls[1]]
+        base.append((k[0], k[1], k[2], p[3] if preserve_alpha else 255))
+    base_img = Image.new("RGBA", size)
+    base_img.putdata(base)
+
+    strips: Dict[str, Image.Image] = {}
+    for combo in plan.combos(limit):
+        colors: List[RGBA] = []
+        for src, dst in zip(
+            plan.slot_src_palettes,
+            combo_dst_palettes(plan, palette_index, combo),
+            strict=True,
+        ):
+            mapped = build_index_map(src, dst)
+            if preserve_alpha:
+                # The atlas multiplies base alpha by palette alpha.
+                mapped = [(c[0], c[1], c[2], 255) for c in mapped]
+            colors.extend(mapped)
+        strips[Path(plan.output_name(combo)).with_suffix("").as_posix()] = (
+            palette_strip(colors)
+        )
+    return base_img, palette_strip(keys), strips
+
+
+def merge_atlas_sources(atlas_path: Path, sources: List[Dict[str, Any]]) -> None:
+    """
+    Replace any earlier paletted_permutations source for the same textures,
+    keep everything else in the atlas file.
+    """
+    data = load_json(atlas_path) if atlas_path.exists() else {}
+    ours = {t for src in sources for t in src["textures"]}
+    kept = [
+        src
+        for src in data.get("sources", [])
+        if not (
+            src.get("type")
+            in ("paletted_permutations", "minecraft:paletted_permutations")
+            and ours.intersection(src.get("textures", []))
+        )
+    ]
+    data["sources"] = kept + sources
+    OUTPUT.write_json(atlas_path, data)
+
+
+def write_paletted_outputs(
+    plan: TemplatePlan,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    target: TextureTarget,
+    size: Tuple[int, int],
+    pixels: List[RGBA],
+    pixel_slots: List[Optional[Tuple[int, int]]],
+    *,
+    separator: str,
+    limit: Optional[int],
+    preserve_alpha: bool,
+    dry_run: bool,
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Write one template's base texture and palette images; returns its atlas
+    source and the number of permutations it covers.
+    """
+    tid = plan.tdef.template_id
+    base_img, key_img, strips = build_paletted_permutations(
+        plan,
+        palette_index,
+        size,
+        pixels,
+        pixel_slots,
+        limit=limit,
+        preserve_alpha=preserve_alpha,
+    )
+    tex_rel = "/".join(x for x in (target.texture_dir, tid) if x)
+    pal_rel = f"palettes/{tid}"
+    ns = target.namespace
+
+    images = [(target.textures_root / f"{tex_rel}.png", base_img)]
+    images.append((target.textures_root / pal_rel / "key.png", key_img))
+    images += [
+        (target.textures_root / pal_rel / f"{stem}.png", img)
+        for stem, img in strips.items()
+    ]
+    for path, img in images:
+        if dry_run:
+            LOG.info("[DRY] Would write %s", path.as_posix())
+            continue
+        OUTPUT.write_png(path, img)
+    LOG.info(
+        "%s: %d permutation(s) -> %s:%s%s<name>",
+        plan.template_file.name,
+        len(strips),
+        ns,
+        tex_rel,
+        separator,
+    )
+
+    source: Dict[str, Any] = {
+        "type": "paletted_permutations",
+        "textures": [f"{ns}:{tex_rel}"],
+        "palette_key": f"{ns}:{pal_rel}/key",
+        "permutations": {stem: f"{ns}:{pal_rel}/{stem}" for stem in strips},
+    }
+    if separator != "_":
+        source["separator"] = separator
+    return source, len(strips)
+
+
+# ----------------------------
+# Tinted item output (generate --tint-mode)
+# ----------------------------
+def tint_slots(
+    plan: TemplatePlan,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    *,
+    tolerance: float,
+) -> Dict[int, Tuple[List[int], Dict[str, RGB]]]:
+    """
+    slot index -> (gray per source color, tint per destination id), for slots
+    whose source palette is a single-hue ramp and whose every destination can
+    be reproduced from the same grays with a constant tint.
+    """
+    out: Dict[int, Tuple[List[int], Dict[str, RGB]]] = {}
+    for si, (slot, src, ids) in enumerate(
+        zip(plan.tdef.slots, plan.slot_src_palettes, plan.slot_choices)
+    ):
+        ramp = ramp_grays(src, tolerance=tolerance)
+        if ramp is None:
+            continue
+        grays = [ramp[1][c] for c in src]
+        tints: Dict[str, RGB] = {}
+        for dst_id in ids:
+            _, grp = palette_index[slot.material][dst_id].item.default_group()
+            tint = fit_tint(
+                grays, build_index_map(src, grp.colors_rgba()), tolerance=tolerance
+            )
+            if tint is None:
+                break
+            tints[dst_id] = tint
+        else:
+            out[si] = (grays, tints)
+    return out
+
+
+def write_tinted_outputs(
+    plan: TemplatePlan,
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    target: TextureTarget,
+    size: Tuple[int, int],
+    pixels: List[RGBA],
+    pixel_slots: List[Optional[Tuple[int, int]]],
+    tinted: Dict[int, Tuple[List[int], Dict[str, RGB]]],
+    *,
+    limit: Optional[int],
+    preserve_alpha: bool,
+    dry_run: bool,
+) -> int:
+    """
+    One grayscale layer per tinted slot, one layer per choice of the other
+    slots, a shared item model per such choice and a tinted item definition
+    per combination. Returns the number of item definitions.
+    """
+    tid = plan.tdef.template_id
+    ns = target.namespace
+    untinted = [i for i in range(len(plan.tdef.slots)) if i not in tinted]
+    assets_root = target.textures_root.parent
+    images: List[Tuple[Path, Image.Image]] = []
+    jsons: List[Tuple[Path, Dict[str, Any]]] = []
+
+    def layer(px: List[RGBA]) -> Image.Image:
+        img = Image.new("RGBA", size)
+        img.putdata(px)
+        return img
+
+    tint_layers: List[str] = []
+    for si, (grays, _) in tinted.items():
+        name = f"{tid}_{plan.tdef.slots[si].slot}_tint"
+        px: List[RGBA] = []
+        for p, cls in zip(pixels, pixel_slots):
+            if cls is not None and cls[0] == si:
+                g = grays[cls[1]]
+                px.append((g, g, g, p[3]))
+            else:
+                px.append((0, 0, 0, 0))
+        images.append(
+            (target.textures_root / target.texture_dir / f"{name}.png", layer(px))
+        )
+        tint_layers.append(name)
+
+    models: Dict[Tuple[str, ...], Tuple[str, bool]] = {}
+    for combo in plan.combos(limit):
+        key = tuple(combo[i] for i in untinted)
+        if key not in models:
+            name = "_".join((tid,) + key)
+            dst = combo_dst_palettes(plan, palette_index, combo)
+            maps = {
+                i: build_index_map(plan.slot_src_palettes[i], dst[i]) for i in untinted
+            }
+            px = []
+            for p, cls in zip(pixels, pixel_slots):
+                if cls is None:
+                    px.append(p)
+                elif cls[0] in tinted:
+                    px.append((0, 0, 0, 0))
+                else:
+                    c = maps[cls[0]][cls[1]]
+                    px.append((c[0], c[1], c[2], p[3]) if preserve_alpha else c)
+            has_base = any(p[3] for p in px)
+            layers = ([name] if has_base else []) + tint_layers
+            if has_base:
+                images.append(
+                    (
+                        target.textures_root / target.texture_dir / f"{name}.png",
+                        layer(px),
+                    )
+                )
+            jsons.append(
+                (
+                    assets_root / "models" / target.texture_dir / f"{name}.json",
+                    {
+                        "parent": "item/generated",
+                        "textures": {
+                            f"layer{i}": f"{ns}:{target.texture_dir}/{n}"
+                            for i, n in enumerate(layers)
+                        },
+                    },
+                )
+            )
+            models[key] = (name, has_base)
+
+        name, has_base = models[key]
+        tints = ([WHITE_TINT] if has_base else []) + [
+            tinted[si][1][combo[si]] for si in tinted
+        ]
+        model_id = "/".join(target.texture_dir.split("/")[1:] + [name])
+        stem = Path(plan.output_name(combo)).with_suffix("").as_posix()
+        jsons.append(
+            (
+                assets_root / "items" / f"{stem}.json",
+                minecraft_item_definition(ns, model_id, tints),
+            )
+        )
+
+    for path, img in images:
+        if dry_run:
+            LOG.info("[DRY] Would write %s", path.as_posix())
+            continue
+        OUTPUT.write_png(path, img)
+    for path, data in jsons:
+        if dry_run:
+            LOG.info("[DRY] Would write %s", path.as_posix())
+            continue
+        OUTPUT.write_json(path, data)
+
+    LOG.info(
+        "%s: tinted slot(s) %s -> %d texture(s), %d item definition(s)",
+        plan.template_file.name,
+        ", ".join(plan.tdef.slots[si].slot for si in tinted),
+        len(images),
+        len(jsons) - len(models),
+    )
+    return len(jsons) - len(models)
+
+
+# ----------------------------
+# Generated output dedupe (content-addressed)
+# ----------------------------
+@dataclass(slots=True)
+class DedupeGroup:
+    source: Path
+    members: List[Tuple[Path, str]]  # (output, "template: palette ids")
+
+
+class OutputDeduper:
+    """
+    generate --dedupe: every rendered image is keyed by a hash of its pixel
+    buffer; the first output with a key is encoded and written, later ones
+    become copies/links of it (write_duplicates, after the run).
+
+    Destination palettes are remembered per template as well, so combos that
+    resolve to the same colors (e.g. one ramp under two ids) skip rendering.
+    """
+
+    def __init__(self) -> None:
+        self.groups: Dict[str, DedupeGroup] = {}
+        self._by_palettes: Dict[Tuple[Any, ...], str] = {}
+
+    def palette_digest(
+        self, template: Path, dst_palettes: List[List[RGBA]]
+    ) -> Optional[str]:
+        return self._by_palettes.get((template, *map(tuple, dst_palettes)))
+
+    def image_digest(
+        self, template: Path, dst_palettes: List[List[RGBA]], img: Image.Image
+    ) -> str:
+        w, h = img.size
+        data = f"{img.mode}:{w}x{h}:".encode("ascii") + img.tobytes()
+        if img.mode == "P":
+            data += bytes(img.getpalette() or []) + img.info.get("transparency", b"")
+        digest = sha256_bytes(data)
+        self._by_palettes[(template, *map(tuple, dst_palettes))] = digest
+        return digest
+
+    def add(self, digest: str, path: Path, label: str) -> Optional[Path]:
+        """
+        Register path; returns the path it duplicates, or None if it is new.
+        """
+        group = self.groups.get(digest)
+        if group is None:
+            self.groups[digest] = DedupeGroup(source=path, members=[(path, label)])
+            return None
+        group.members.append((path, label))
+        return group.source
+
+    def duplicate_groups(self) -> List[DedupeGroup]:
+        return [g for g in self.groups.values() if len(g.members) > 1]
+
+    def write_duplicates(self, link: str) -> int:
+        OUTPUT.flush()  # sources must be on disk
+        n = 0
+        for group in self.duplicate_groups():
+            for path, _ in group.members[1:]:
+                OUTPUT.write_copy(path, group.source, link=link)
+                n += 1
+        return n
+
+    def log_summary(self) -> None:
+        groups = self.duplicate_groups()
+        dupes = sum(len(g.members) - 1 for g in groups)
+        LOG.info(
+            "Dedupe: %d unique image(s), %d duplicate(s) in %d group(s).",
+            len(self.groups),
+            dupes,
+            len(groups),
+        )
+        for g in groups:
+            LOG.info(
+                "  %s <- %s",
+                g.source.name,
+                ", ".join(f"{p.name} ({label})" for p, label in g.members[1:]),
+            )
+
+    def report_json(self) -> str:
+        data = {
+            "unique": len(self.groups),
+            "groups": [
+                {
+                    "files": [p.as_posix() for p, _ in g.members],
+                    "combos": [label for _, label in g.members],
+                }
+                for g in self.duplicate_groups()
+            ],
+        }
+        return json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+
+
+def cmd_generate(args: argparse.Namespace) -> int:
+    templates_dir = Path(args.templates or "textures_input")
+    palettes_dir = Path(args.palettes or "palettes")
+    schemas_dir = Path(getattr(args, "schemas", None) or "schemas")
+    output_dir = Path(args.output or "output/textures/item")
+    alpha_weight = float(args.alpha_weight or 0.25)
+    min_alpha = int(args.min_alpha or 1)
+    preserve_alpha = not bool(args.no_preserve_alpha)
+    exact_first = not bool(args.no_exact_first)
+    dry_run = bool(args.dry_run)
+    limit = int(args.limit) if args.limit is not None else None
+    indexed = bool(getattr(args, "indexed", False))
+    dedupe_link = getattr(args, "dedupe", None)
+    deduper = OutputDeduper() if dedupe_link and not dry_run else None
+    paletted = getattr(args, "mode", "png") == "paletted"
+    tint_mode = bool(getattr(args, "tint_mode", False))
+    tint_tolerance = float(getattr(args, "tint_tolerance", 6) or 0)
+    if paletted and tint_mode:
+        raise SystemExit("--tint-mode cannot be combined with --mode paletted")
+    target = (
+        texture_target(
+            output_dir,
+            str(getattr(args, "namespace", None) or "modid"),
+            Path(args.atlas) if getattr(args, "atlas", None) else None,
+        )
+        if paletted or tint_mode
+        else None
+    )
+    if tint_mode and target is not None and target.texture_dir.split("/")[0] != "item":
+        raise SystemExit("--tint-mode needs --output under textures/item")
+
+    palette_index = load_all_palettes_index(palettes_dir)
+
+    template_files = sorted(templates_dir.rglob("*.btg-template.json"))
+    if not template_files:
+        LOG.warning(
+            "No schema-driven templates found under %s", templates_dir.as_posix()
+        )
+        return 0
+
+    # Everything that can fail without decoding pixels fails here, before any write.
+    plans, errors = preflight_templates(
+        template_files,
+        palettes_dir,
+        palette_index,
+        validator=load_template_validator(schemas_dir),
+        limit=limit,
+    )
+    if errors:
+        for e in errors:
+            LOG.error("Preflight: %s", e)
+        LOG.error("Generate aborted: %d preflight error(s).", len(errors))
+        return 2
+
+    if dry_run and not paletted and not tint_mode:
+        log_plan_summary(
+            estimate_plans(
+                plans,
+                palette_index,
+                load_throughput(
+                    Path(getattr(args, "cache_dir", None) or DEFAULT_CACHE_DIR),
+                    dry_run=True,
+                    indexed=indexed,
+                ),
+                limit=limit,
+                min_alpha=min_alpha,
+                indexed=indexed,
+            ),
+            prefix="[DRY] ",
+        )
+
+    total_written = 0
+    atlas_sources: List[Dict[str, Any]] = []
+
+    for plan in plans:
+        template_png = plan.template_png
+
+        # Precompute per-pixel classification once per template
+        img = Image.open(template_png).convert("RGBA")
+        pixels: List[RGBA] = list(img.getdata())
+        try:
+            pixel_slots = classify_template_pixels(
+                plan,
+                img,
+                pixels,
+                alpha_weight=alpha_weight,
+                min_alpha=min_alpha,
+                exact_first=exact_first,
+            )
+        except ValueError as e:
+            raise SystemExit(f"{plan.template_file.as_posix()}: {e}") from e
+        keys = (
+            template_pixel_keys(pixels, pixel_slots, preserve_alpha=preserve_alpha)
+            if indexed
+            else None
+        )
+        if indexed and keys is None:
+            LOG.info("%s: over 256 colors, writing RGBA", template_png.name)
+
+        if tint_mode and target is not None:
+            tinted = tint_slots(plan, palette_index, tolerance=tint_tolerance)
+            if tinted:
+                total_written += write_tinted_outputs(
+                    plan,
+                    palette_index,
+                    target,
+                    img.size,
+                    pixels,
+                    pixel_slots,
+                    tinted,
+                    limit=limit,
+                    preserve_alpha=preserve_alpha,
+                    dry_run=dry_run,
+                )
+                continue
+            LOG.info(
+                "%s: no single-hue slots, writing one texture per combination",
+                plan.template_file.name,
+            )
+
+        if paletted and target is not None:
+            try:
+                source, count = write_paletted_outputs(
+                    plan,
+                    palette_index,
+                    target,
+                    img.size,
+                    pixels,
+                    pixel_slots,
+                    separator=str(getattr(args, "separator", None) or "_"),
+                    limit=limit,
+                    preserve_alpha=preserve_alpha,
+                    dry_run=dry_run,
+                )
+            except ValueError as e:
+                raise SystemExit(f"{plan.template_file.as_posix()}: {e}") from e
+            atlas_sources.append(source)
+            total_written += count
+            continue
+
+        for combo in plan.combos(limit):
+            filename = plan.output_name(combo)
+            out_path = output_dir / filename
+
+            if dry_run:
+                LOG.info("[DRY] %s -> %s", template_png.name, out_path.as_posix())
+                total_written += 1
+                continue
+
+            dst_palettes = combo_dst_palettes(plan, palette_index, combo)
+            out_img: Optional[Image.Image] = None
+            if deduper is not None:
+                digest = deduper.palette_digest(plan.template_file, dst_palettes)
+                if digest is None:
+                    out_img = render_combo(
+                        img.size,
+                        pixels,
+                        pixel_slots,
+                        plan.slot_src_palettes,
+                        dst_palettes,
+                        preserve_alpha=preserve_alpha,
+                        keys=keys,
+                    )
+                    digest = deduper.image_digest(
+                        plan.template_file, dst_palettes, out_img
+                    )
+                source = deduper.add(
+                    digest, out_path, f"{plan.template_file.name}: {','.join(combo)}"
+                )
+                if source is not None:
+                    total_written += 1
+                    LOG.debug("Duplicate %s = %s", out_path.name, source.name)
+                    continue
+            if out_img is None:
+                out_img = render_combo(
+                    img.size,
+                    pixels,
+                    pixel_slots,
+                    plan.slot_src_palettes,
+                    dst_palettes,
+                    preserve_alpha=preserve_alpha,
+                    keys=keys,
+                )
+            OUTPUT.write_png(out_path, out_img)
+
+            total_written += 1
+            LOG.info("Wrote %s", out_path.as_posix())
+
+    if paletted and target is not None:
+        if dry_run:
+            LOG.info("[DRY] Would update %s", target.atlas_path.as_posix())
+        elif atlas_sources:
+            merge_atlas_sources(target.atlas_path, atlas_sources)
+            LOG.info("Wrote %s", target.atlas_path.as_posix())
+        LOG.info(
+            "Generate complete: %d permutation(s) from %d template(s).",
+            total_written,
+            len(atlas_sources),
+        )
+        return 0
+
+    if deduper is not None:
+        deduper.write_duplicates(str(dedupe_link))
+        deduper.log_summary()
+        if getattr(args, "dedupe_report", None):
+            write_report(deduper.report_json(), args.dedupe_report)
+
+    LOG.info("Generate complete: wrote %d file(s).", total_written)
+    return 0
+
+
+# ----------------------------
+# Command: plan (cost estimation for generate)
+# ----------------------------
+@dataclass(frozen=True, slots=True)
+class Throughput:
+    """
+    Render + encode speed of this machine (see calibrate_throughput).
+    """
+
+    pixels_per_second: float
+    seconds_per_file: float
+
+
+@dataclass(slots=True)
+class TemplateEstimate:
+    template: str
+    png: str
+    width: int
+    height: int
+    unique_colors: int
+    slot_ids: Dict[str, int]
+    combinations: int
+    files: int
+    pixel_ops: int
+    bytes: int
+    seconds: float
+
+
+def calibrate_throughput(*, budget: float = 0.25, indexed: bool = False) -> Throughput:
+    """
+    Time the generate inner loop (render_combo + encode_png with the active
+    --png-profile + write to disk) on synthetic 16x16 and 64x64 templates,
+    then solve for per-pixel and per-file cost. indexed: render P-mode
+    images as generate --indexed does.
+    """
+    samples: List[Tuple[int, float]] = []
+    tmp_dir = tempfile.TemporaryDirectory(prefix="btg-calib-")
+    try:
+        for side in (16, 64):
+            n = side * side
+            pixels = [(i % 256, (i // 7) % 256, (i // 13) % 256, 255) for i in range(n)]
+            slots = [(0, i % 8) for i in range(n)]
+            src = [[(i * 30, i * 30, i * 30, 255) for i in range(8)]]
+            dst = [[(255 - i * 30, i * 20, 90, 255) for i in range(8)]]
+            keys = template_pixel_keys(pixels, slots) if indexed else None
+            runs = 0
+            t0 = time.perf_counter()
+            while True:
+                img = render_combo((side, side), pixels, slots, src, dst, keys=keys)
+                (Path(tmp_dir.name) / f"{side}_{runs}.png").write_bytes(encode_png(img))
+                runs += 1
+                elapsed = time.perf_counter() - t0
+                if elapsed >= budget / 2:
+                    break
+            samples.append((n, elapsed / runs))
+    finally:
+        tmp_dir.cleanup()
+
+    (n1, t1), (n2, t2) = samples
+    per_px = max((t2 - t1) / (n2 - n1), 1e-12)
+    per_file = max(t1 - per_px * n1, 0.0)
+    return Throughput(pixels_per_second=1.0 / per_px, seconds_per_file=per_file)
+
+
+def load_throughput(
+    cache_dir: Path,
+    *,
+    recalibrate: bool = False,
+    dry_run: bool = False,
+    indexed: bool = False,
+) -> Throughput:
+    """
+    Calibration is cached per machine/Python/btg version, with one entry per
+    PNG profile and --indexed. Dry runs use the cached one or calibrate (in a
+    temp dir) without saving the result.
+    """
+    cache = ResultCache(
+        cache_dir / "plan-calibration.json",
+        {
+            "btg": BTG_VERSION,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "node": platform.node(),
+        },
+        prune=False,
+    )
+    key = f"{PNG_PROFILE}:{'indexed' if indexed else 'rgba'}"
+    hit = None if recalibrate else cache.get(key)
+    if hit is not None:
+        return Throughput(
+            float(hit["pixels_per_second"]), float(hit["seconds_per_file"])
+        )
+    tp = calibrate_throughput(indexed=indexed)
+    if dry_run:
+        return tp
+    cache.put(
+        key,
+        {
+            "pixels_per_second": tp.pixels_per_second,
+            "seconds_per_file": tp.seconds_per_file,
+        },
+    )
+    try:
+        cache.save()
+    except OSError as e:
+        LOG.debug("Could not save calibration (%s)", e)
+    return tp
+
+
+def estimate_plans(
+    plans: List[TemplatePlan],
+    palette_index: Dict[str, Dict[str, PaletteRef]],
+    throughput: Throughput,
+    *,
+    limit: Optional[int] = None,
+    min_alpha: int = 1,
+    indexed: bool = False,
+) -> List[TemplateEstimate]:
+    """
+    Per-template output counts, pixel work, disk usage and wall time.
+    Disk usage comes from encoding the first combo of each template once,
+    the way generate would (encode_png, P-mode when indexed).
+    """
+    out: List[TemplateEstimate] = []
+    for plan in plans:
+        hdr = read_png_header(plan.template_png)
+        files = plan.combinations if limit is None else min(limit, plan.combinations)
+        img = Image.open(plan.template_png).convert("RGBA")
+        colors = texture_histogram(plan.template_png).rgba(min_alpha=min_alpha)
+
+        sample_bytes = 0
+        first = next(iter(plan.combos(1)), None)
+        if first is not None:
+            pixels: List[RGBA] = list(img.getdata())
+            try:
+                slots = classify_template_pixels(
+                    plan,
+                    img,
+                    pixels,
+                    alpha_weight=0.25,
+                    min_alpha=min_alpha,
+                    exact_first=True,
+                )
+            except ValueError as e:
+                raise SystemExit(f"{plan.template_file.as_posix()}: {e}") from e
+            sample = render_combo(
+                img.size,
+                pixels,
+                slots,
+                plan.slot_src_palettes,
+                combo_dst_palettes(plan, palette_index, first),
+                keys=template_pixel_keys(pixels, slots) if indexed else None,
+            )
+            sample_bytes = len(encode_png(sample))
+
+        px = hdr.width * hdr.height
+        out.append(
+            TemplateEstimate(
+                template=plan.template_file.as_posix(),
+                png=plan.template_png.as_posix(),
+                width=hdr.width,
+                height=hdr.height,
+                unique_colors=len(colors),
+                slot_ids={
+                    s.slot: len(ids)
+                    for s, ids in zip(plan.tdef.slots, plan.slot_choices)
+                },
+                combinations=plan.combinations,
+                files=files,
+                pixel_ops=files * px,
+                bytes=files * sample_bytes,
+                seconds=files
+                * (px / throughput.pixels_per_second + throughput.seconds_per_file),
+            )
+        )
+    return out
+
+
+def human_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+def log_plan_summary(estimates: List[TemplateEstimate], prefix: str = "") -> None:
+    LOG.info(
+        "%sPlan: %d template(s), %d file(s), %d pixel op(s), ~%s, ~%.1fs",
+        prefix,
+        len(estimates),
+        sum(e.files for e in estimates),
+        sum(e.pixel_ops for e in estimates),
+        human_bytes(sum(e.bytes for e in estimates)),
+        sum(e.seconds for e in estimates),
+    )
+
+
+def cmd_plan(args: argparse.Namespace) -> int:
+    templates_dir = Path(args.templates or "textures_input")
+    palettes_dir = Path(args.palettes or "palettes")
+    schemas_dir = Path(args.schemas or "schemas")
+    cache_dir = Path(getattr(args, "cache_dir", None) or DEFAULT_CACHE_DIR)
+    limit = int(args.limit) if args.limit is not None else None
+    min_alpha = int(args.min_alpha or 1)
+    indexed = bool(getattr(args, "indexed", False))
+
+    palette_index = load_all_palettes_index(palettes_dir)
+    plans, errors = run_preflight(
+        templates_dir, palettes_dir, schemas_dir, palette_index, limit=limit
+    )
+    for e in errors:
+        LOG.error("Preflight: %s", e)
+
+    throughput = load_throughput(
+        cache_dir,
+        recalibrate=bool(getattr(args, "recalibrate", False)),
+        dry_run=bool(getattr(args, "dry_run", False)),
+        indexed=indexed,
+    )
+    estimates = estimate_plans(
+        plans,
+        palette_index,
+        throughput,
+        limit=limit,
+        min_alpha=min_alpha,
+        indexed=indexed,
+    )
+
+    for e in estimates:
+        LOG.info(
+            "%s: %dx%d, %d color(s), slots %s -> %d file(s), ~%s, ~%.2fs",
+            e.template,
+            e.width,
+            e.height,
+            e.unique_colors,
+            ", ".join(f"{k}={v}" for k, v in e.slot_ids.items()),
+            e.files,
+            human_bytes(e.bytes),
+            e.seconds,
+        )
+    log_plan_summary(estimates)
+
+    if getattr(args, "report", None) == "json":
+        data = {
+            "throughput": {
+                "pixels_per_second": throughput.pixels_per_second,
+                "seconds_per_file": throughput.seconds_per_file,
+            },
+            "totals": {
+                "templates": len(estimates),
+                "files": sum(e.files for e in estimates),
+                "pixel_ops": sum(e.pixel_ops for e in estimates),
+                "bytes": sum(e.bytes for e in estimates),
+                "seconds": sum(e.seconds for e in estimates),
+            },
+            "templates": [
+                {
+                    "template": e.template,
+                    "png": e.png,
+                    "width": e.width,
+                    "height": e.height,
+                    "unique_colors": e.unique_colors,
+                    "slot_ids": e.slot_ids,
+                    "combinations": e.combinations,
+                    "files": e.files,
+                    "pixel_ops": e.pixel_ops,
+                    "bytes": e.bytes,
+                    "seconds": e.seconds,
+                }
+                for e in estimates
+            ],
+            "errors": errors,
+        }
+        write_report(
+            json.dumps(data, indent=2, ensure_ascii=False) + "\n",
+            getattr(args, "report_out", None),
+        )
+    return 0 if not errors else 2
+
+
+# ----------------------------
+# Command: autotemplate (schema-driven)
+# ----------------------------
+# (material, palette id, group id)
+PaletteKey = Tuple[str, str, str]
+
+
+def build_color_index(
+    palette_index: Dict[str, Dict[str, PaletteRef]], materials: Iterable[str]
+) -> Dict[int, List[PaletteKey]]:
+    """
+    Inverted index over the default group of every palette item:
+        packed color -> [(material, id, group), ...]
+
+    Each palette is listed at most once per color, so a palette's hit count
+    is the number of template colors it contains.
+    """
+    index: Dict[int, List[PaletteKey]] = {}
+    for material in materials:
+        for pid, ref in palette_index.get(material, {}).items():
+            gid, grp = ref.item.default_group()
+            key = (material, pid, gid)
+            for c in set(grp.colors_rgba()):
+                index.setdefault(pack_rgba(c), []).append(key)
+    return index
+
+
+def palette_hit_counts(
+    template_colors: Iterable[RGBA], color_index: Dict[int, List[PaletteKey]]
+) -> Dict[PaletteKey, int]:
+    """
+    Exact-hit counts for every indexed palette at once.
+    """
+    counts: Dict[PaletteKey, int] = {}
+    for c in template_colors:
+        for key in color_index.get(pack_rgba(c), ()):
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def palette_tolerance_counts(
+    template_colors: List[RGBA],
+    palettes: List[Tuple[PaletteKey, List[RGBA]]],
+    *,
+    tolerance: float,
+    alpha_weight: float = 0.25,
+) -> Dict[PaletteKey, int]:
+    """
+    Number of template colors within color_dist2 <= tolerance**2 of any color
+    of each palette.
+
+    With numpy this is one (template colors x all palette colors) distance
+    matrix for the whole batch of palettes; without it, plain loops.
+    """
+    limit = float(tolerance) * float(tolerance)
+    palettes = [(key, pal) for key, pal in palettes if pal]
+    if not template_colors or not palettes:
+        return {}
+
+    if np is None:
+        return {
+            key: sum(
+                1
+                for t in template_colors
+                if any(
+                    color_dist2(t, c, alpha_weight=alpha_weight) <= limit for c in pal
+                )
+            )
+            for key, pal in palettes
+        }
+
+    tc = np.asarray(template_colors, dtype=np.float32)
+    pc = np.asarray([c for _, pal in palettes for c in pal], dtype=np.float32)
+    weights = (1.0, 1.0, 1.0, float(alpha_weight))
+    d2 = np.zeros((tc.shape[0], pc.shape[0]), dtype=np.float32)
+    for ch, w in enumerate(weights):
+        diff = tc[:, ch, None] - pc[None, :, ch]
+        d2 += w * diff * diff
+
+    # Column ranges per palette -> "any palette color within radius" per template color
+    starts = np.cumsum([0] + [len(pal) for _, pal in palettes[:-1]])
+    within = np.logical_or.reduceat(d2 <= limit, starts, axis=1)
+    counts = within.sum(axis=0)
+    return {key: int(counts[i]) for i, (key, _) in enumerate(palettes)}
+
+
+def cmd_autotemplate(args: argparse.Namespace) -> int:
+    templates_dir = Path(args.templates or "textures_input")
+    palettes_dir = Path(args.palettes or "palettes")
+    out_dir = Path(args.out_dir).resolve() if args.out_dir else templates_dir
+    materials = [
+        m.strip() for m in str(args.materials or "wood,metal,glass").split(",")
+    ]
+    materials = [m for m in materials if m]
+    min_alpha = int(args.min_alpha or 1)
+    min_hits = int(args.min_hits or 2)
+    tolerance = float(getattr(args, "tolerance", 0) or 0)
+    alpha_weight = float(getattr(args, "alpha_weight", 0.25) or 0.25)
+    write_masks = bool(getattr(args, "masks", False))
+    dry_run = bool(args.dry_run)
+
+    palette_index = load_all_palettes_index(palettes_dir)
+    pngs = sorted([p for p in templates_dir.glob("*.png") if p.is_file()])
+    if not pngs:
+        LOG.warning("No PNG templates found in %s", templates_dir.as_posix())
+        return 0
+
+    # Built once per run: template colors are looked up directly instead of
+    # re-scanning every palette for every template.
+    color_index = build_color_index(palette_index, materials)
+    material_palettes: Dict[str, List[Tuple[PaletteKey, List[RGBA]]]] = {}
+    if tolerance > 0:
+        for material in materials:
+            material_palettes[material] = []
+            for pid, ref in palette_index.get(material, {}).items():
+                gid, grp = ref.item.default_group()
+                material_palettes[material].append(
+                    ((material, pid, gid), grp.colors_rgba())
+                )
+
+    written = 0
+    for png in pngs:
+        template_id = png.stem
+        template_colors = texture_histogram(png).rgba(min_alpha=min_alpha)
+        if tolerance > 0:
+            ordered = sorted(template_colors)
+            hits: Dict[PaletteKey, int] = {}
+            for material in materials:
+                hits.update(
+                    palette_tolerance_counts(
+                        ordered,
+                        material_palettes.get(material, []),
+                        tolerance=tolerance,
+                        alpha_weight=alpha_weight,
+                    )
+                )
+        else:
+            hits = palette_hit_counts(template_colors, color_index)
+
+        slots: List[Dict[str, Any]] = []
+        slot_names: List[str] = []
+        slot_src_palettes: List[List[RGBA]] = []
+
+        for material in materials:
+            by_id = palette_index.get(material, {})
+            if not by_id:
+                continue
+
+            best_score = 0
+            best_ref: Optional[PaletteRef] = None
+            best_gid = "base"
+            for pid, ref in by_id.items():
+                gid, _ = ref.item.default_group()
+                score = hits.get((material, pid, gid), 0)
+                if score > best_score:
+                    best_score = score
+                    best_ref = ref
+                    best_gid = gid
+
+            if best_ref is None or best_score < min_hits:
+                continue
+
+            LOG.info(
+                "%s: slot '%s' -> %s (%d/%d colors, match ratio %.2f)",
+                png.name,
+                material,
+                best_ref.item.id,
+                best_score,
+                len(template_colors),
+                best_score / len(template_colors),
+            )
+            slot_names.append(material)
+            slots.append(
+                {
+                    "slot": material,
+                    "material": material,
+                    "source": {
+                        "palette": rel_posix(best_ref.file_path, palettes_dir),
+                        "id": best_ref.item.id,
+                        "group": best_gid,
+                    },
+                }
+            )
+            slot_src_palettes.append(best_ref.item.group(best_gid).colors_rgba())
+
+        if not slots:
+            LOG.warning("No slots detected for %s (try lowering --min-hits).", png.name)
+            continue
+
+        out_pattern = infer_output_pattern(template_id, slot_names)
+        template_info: Dict[str, Any] = {
+            "id": template_id,
+            "path": png.as_posix().replace("\\", "/"),
+        }
+        mask_img: Optional[Image.Image] = None
+        if write_masks:
+            keys = mask_key_colors([None] * len(slots))
+            for slot, key in zip(slots, keys):
+                slot["maskColor"] = rgba_to_hex8(key)
+            with Image.open(png) as img:
+                mask_img = build_slot_mask(
+                    img,
+                    slot_src_palettes,
+                    keys,
+                    alpha_weight=alpha_weight,
+                    min_alpha=min_alpha,
+                )
+            # Relative to the template file, which is written next to the mask.
+            template_info["mask"] = f"{template_id}.mask.png"
+
+        data = {
+            "schema": "btg-template",
+            "version": 1,
+            "template": template_info,
+            "output": {"pattern": out_pattern},
+            "slots": slots,
+        }
+
+        out_path = out_dir / f"{template_id}.btg-template.json"
+        mask_path = out_dir / f"{template_id}.mask.png"
+        if dry_run:
+            LOG.info("[DRY] Would write %s", out_path.as_posix())
+            if mask_img is not None:
+                LOG.info("[DRY] Would write %s", mask_path.as_posix())
+        else:
+            OUTPUT.write_json(out_path, data)
+            LOG.info("Wrote %s", out_path.as_posix())
+            if mask_img is not None:
+                OUTPUT.write_png(mask_path, mask_img)
+                LOG.info("Wrote %s", mask_path.as_posix())
+        written += 1
+
+    LOG.info("Autotemplate complete: %d file(s).", written)
+    return 0
+
+
+# ----------------------------
+# Command: assets (items/models/lang from output/textures/item)
+# ----------------------------
+def title_from_id(s: str) -> str:
+    s = s.replace(":", "_").replace("/", "_").replace("-", "_")
+    parts = [p for p in s.split("_") if p]
+    return " ".join(p[:1].upper() + p[1:] for p in parts)
+
+
+def common_id_suffix(ids: List[str]) -> str:
+    """
+    Longest shared trailing run of "_"-separated words ("oak_cup", "birch_cup" -> "cup").
+    """
+    split = [i.split("_") for i in ids]
+    n = 0
+    while all(len(w) > n for w in split) and len({w[-1 - n] for w in split}) == 1:
+        n += 1
+    return "_".join(split[0][len(split[0]) - n :]) if n else ids[0]
+
+
+def group_tinted_textures(
+    pngs: List[Path], *, tolerance: float
+) -> Tuple[List[Tuple[Image.Image, List[Tuple[str, RGB]]]], List[Path]]:
+    """
+    Textures that are the same grayscale image times a constant tint.
+
+    Returns ([(gray base, [(item id, tint), ...]), ...], remaining pngs);
+    only groups with two or more members are folded.
+    """
+    groups: Dict[bytes, Tuple[Image.Image, List[Tuple[str, RGB]], List[Path]]] = {}
+    rest: List[Path] = []
+    for png in pngs:
+        ramp = ramp_grays(texture_histogram(png).rgba(min_alpha=1), tolerance=tolerance)
+        if ramp is None:
+            rest.append(png)
+            continue
+        tint, grays = ramp
+        with Image.open(png) as img:
+            rgba = img.convert("RGBA")
+        gray = Image.new("RGBA", rgba.size)
+        gray.putdata(
+            [
+                (grays[p], grays[p], grays[p], p[3]) if p[3] else p
+                for p in rgba.getdata()
             ]
+        )
+        key = f"{gray.size}".encode("ascii") + gray.tobytes()
+        entry = groups.setdefault(key, (gray, [], []))
+        entry[1].append((png.stem, tint))
+        entry[2].append(png)
+
+    out: List[Tuple[Image.Image, List[Tuple[str, RGB]]]] = []
+    for gray, members, paths in groups.values():
+        if len(members) < 2:
+            rest.extend(paths)
+        else:
+            out.append((gray, members))
+    return out, sorted(rest)
+
+
+def cmd_assets(args: argparse.Namespace) -> int:
+    textures_dir = Path(args.textures or "output/textures/item")
+    items_dir = Path(args.items_dir or "output/items")
+    models_dir = Path(args.models_dir or "output/models/item")
+    lang_path = Path(args.lang or "output/lang/en_us.json")
+    namespace = str(args.namespace or "modid").strip() or "modid"
+    overwrite_lang = bool(args.overwrite_lang)
+    recursive = bool(args.recursive)
+    tint_mode = bool(getattr(args, "tint_mode", False))
+    tint_tolerance = float(getattr(args, "tint_tolerance", 6) or 0)
+    dry_run = bool(args.dry_run)
+
+    pngs = walk_pngs(textures_dir, recursive=recursive)
+    if not pngs:
+        LOG.warning("No PNGs found in %s", textures_dir.as_posix())
+        return 0
+
+    lang = run_lang(args)
+    written_items = 0
+    written_models = 0
+    lang_changes = 0
+
+    def add_lang(item_id: str) -> None:
+        nonlocal lang_changes
+        lang_changes += lang.set(
+            lang_path,
+            f"item.{namespace}.{item_id}",
+            title_from_id(item_id),
+            overwrite=overwrite_lang,
+        )
+
+    if tint_mode:
+        # Grayscale bases live in <textures>/tinted/ and are not items themselves.
+        tinted_dir = textures_dir / "tinted"
+        pngs = [p for p in pngs if tinted_dir not in p.parents]
+        groups, pngs = group_tinted_textures(pngs, tolerance=tint_tolerance)
+        used: set[str] = set()
+        for gray, members in groups:
+            base_id = common_id_suffix([m for m, _ in members])
+            n = 2
+            while base_id in used:
+                base_id = f"{common_id_suffix([m for m, _ in members])}_{n}"
+                n += 1
+            used.add(base_id)
+
+            tex_path = tinted_dir / f"{base_id}.png"
+            model_path = models_dir / "tinted" / f"{base_id}.json"
+            model_json = minecraft_item_model(namespace, f"tinted/{base_id}")
+            if dry_run:
+                LOG.info("[DRY] Would write %s", tex_path.as_posix())
+                LOG.info("[DRY] Would write %s", model_path.as_posix())
+            else:
+                OUTPUT.write_png(tex_path, gray)
+                OUTPUT.write_json(model_path, model_json)
+            written_models += 1
+
+            for item_id, tint in members:
+                item_path = items_dir / f"{item_id}.json"
+                item_json = minecraft_item_definition(
+                    namespace, f"tinted/{base_id}", [tint]
+                )
+                if dry_run:
+                    LOG.info("[DRY] Would write %s", item_path.as_posix())
+                else:
+                    OUTPUT.write_json(item_path, item_json)
+                written_items += 1
+                add_lang(item_id)
+            LOG.info("Tinted %d item(s) onto %s", len(members), tex_path.as_posix())
+
+    for png in pngs:
+        item_id = png.stem
+        if not item_id:
+            continue
+
+        item_path = items_dir / f"{item_id}.json"
+        model_path = models_dir / f"{item_id}.json"
+
+        if dry_run:
+            LOG.info("[DRY] Would write %s", item_path.as_posix())
+            LOG.info("[DRY] Would write %s", model_path.as_posix())
+        else:
+            OUTPUT.write_bytes(
+                item_path,
+                ITEM_DEFINITION_JSON.render(namespace=namespace, item_id=item_id),
+            )
+            OUTPUT.write_bytes(
+                model_path, ITEM_MODEL_JSON.render(namespace=namespace, item_id=item_id)
+            )
+        written_items += 1
+        written_models += 1
+        add_lang(item_id)
+
+    LOG.info(
+        "Assets complete: %d item json, %d model json, %d lang change(s).",
+        written_items,
+        written_models,
+        lang_changes,
+    )
+    return 0
+
+
+# ----------------------------
+# Command: check-refs (asset reference graph)
+# ----------------------------
+ASSET_CATEGORIES = ("blockstates", "items", "models", "textures")
+
+
+@dataclass(frozen=True, slots=True)
+class AssetBase:
+    """
+    One namespace tree (<root>/{blockstates,items,models,textures}/...).
+    files holds posix paths relative to root.
+    """
+
+    namespace: str
+    root: Path
+    files: frozenset[str]
+
+
+@dataclass(frozen=True, slots=True)
+class AssetRef:
+    base: AssetBase
+    source: str  # file containing the reference (relative to base.root)
+    kind: str  # "model" or "texture"
+    ref: str  # resource location as written
+    path: str  # expected file for ref, relative to a namespace tree root
+    resolved: bool  # path exists (in base when resolved)
+    external: bool = False  # namespace not present under the scan root (e.g. minecraft)
+
+
+@dataclass(slots=True)
+class AssetGraph:
+    bases: List[AssetBase]
+    refs: List[AssetRef]
+
+    def dangling(self) -> List[AssetRef]:
+        return [r for r in self.refs if not r.resolved and not r.external]
+
+    def orphaned_textures(self) -> List[Tuple[AssetBase, str]]:
+        used = {(id(r.base), r.path) for r in self.refs if r.resolved}
+        return [
+            (b, f)
+            for b in self.bases
+            for f in sorted(b.files)
+            if f.startswith("textures/")
+            and f.endswith(".png")
+            and (id(b), f) not in used
+        ]
+
+
+def parse_resource_location(ref: str) -> Tuple[str, str]:
+    """
+    "ns:path" -> (ns, path); a bare "path" is in the minecraft namespace.
+    """
+    ns, sep, path = ref.partition(":")
+    return (ns, path) if sep else ("minecraft", ref)
+
+
+def scan_asset_bases(root: Path, namespace: str) -> List[AssetBase]:
+    """
+    Single directory walk. Category folders directly under root form the flat
+    tree (namespace=namespace); <root>/<ns>/<category>/... form namespace trees.
+    """
+    buckets: Dict[str, List[str]] = {}
+    root_s = str(root)
+    for dirpath, _, filenames in os.walk(root_s):
+        rel_dir = os.path.relpath(dirpath, root_s).replace(os.sep, "/")
+        parts = [] if rel_dir == "." else rel_dir.split("/")
+        if parts and parts[0] in ASSET_CATEGORIES:
+            key, sub = "", rel_dir
+        elif len(parts) >= 2 and parts[1] in ASSET_CATEGORIES:
+            key, sub = parts[0], "/".join(parts[1:])
+        else:
+            continue
+        bucket = buckets.setdefault(key, [])
+        bucket.extend(f"{sub}/{name}" for name in filenames)
+
+    bases: List[AssetBase] = []
+    for key in sorted(buckets):
+        bases.append(
+            AssetBase(
+                namespace=key or namespace,
+                root=root / key if key else root,
+                files=frozenset(buckets[key]),
+            )
+        )
+    return bases
+
+
+def collect_json_refs(category: str, data: Any) -> List[Tuple[str, str]]:
+    """
+    (kind, resource location) pairs referenced by one asset JSON document.
+    """
+    out: List[Tuple[str, str]] = []
+    if category == "models":
+        if isinstance(data, dict):
+            parent = data.get("parent")
+            if isinstance(parent, str):
+                out.append(("model", parent))
+            textures = data.get("textures")
+            if isinstance(textures, dict):
+                for v in textures.values():
+                    # "#var" references another texture variable, not a file
+                    if isinstance(v, str) and not v.startswith("#"):
+                        out.append(("texture", v))
+        return out
+
+    # items/ and blockstates/: any "model": "<location>" anywhere in the document
+    def walk(obj: Any) -> None:
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if k == "model" and isinstance(v, str):
+                    out.append(("model", v))
+                else:
+                    walk(v)
+        elif isinstance(obj, list):
+            for v in obj:
+                walk(v)
+
+    walk(data)
+    return out
+
+
+def build_asset_graph(root: Path, namespace: str, *, jobs: int = 1) -> AssetGraph:
+    """
+    Resolve every model/texture reference under root against an in-memory
+    path set (no per-reference filesystem calls).
+    """
+    bases = scan_asset_bases(root, namespace)
+    by_ns: Dict[str, List[AssetBase]] = {}
+    for b in bases:
+        by_ns.setdefault(b.namespace, []).append(b)
+
+    def resolve(
+        base: AssetBase, kind: str, ref: str
+    ) -> Tuple[Optional[AssetBase], str, bool]:
+        ns, path = parse_resource_location(ref)
+        rel = f"models/{path}.json" if kind == "model" else f"textures/{path}.png"
+        # Same tree first, then any other tree of that namespace.
+        candidates = ([base] if base.namespace == ns else []) + by_ns.get(ns, [])
+        for cand in candidates:
+            if rel in cand.files:
+                return cand, rel, False
+        return None, rel, ns not in by_ns
+
+    def refs_of(item: Tuple[AssetBase, str]) -> List[AssetRef]:
+        base, rel = item
+        try:
+            data = load_json(base.root / rel)
+        except Exception as e:
+            LOG.error("Unreadable JSON %s (%s)", (base.root / rel).as_posix(), e)
+            return []
+        out: List[AssetRef] = []
+        for kind, ref in collect_json_refs(rel.split("/", 1)[0], data):
+            target_base, target, external = resolve(base, kind, ref)
+            out.append(
+                AssetRef(
+                    base=target_base or base,
+                    source=rel,
+                    kind=kind,
+                    ref=ref,
+                    path=target,
+                    resolved=target_base is not None,
+                    external=external,
+                )
+            )
+        return out
 
-            out_pixels: List[RGBA] = []
-            for p in pixels:
-                if p[3] < min_alpha:
-                    out_pixels.append(p)
-                    continue
-                si, ci = pixel_class[p]
-                dst = slot_dst_by_src[si][ci]
-                if preserve_alpha:
-                    dst = (dst[0], dst[1], dst[2], p[3])
-                out_pixels.append(dst)
+    docs = [
+        (b, f)
+        for b in bases
+        for f in sorted(b.files)
+        if f.endswith(".json")
+        and f.split("/", 1)[0] in ("models", "items", "blockstates")
+    ]
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            chunks = list(pool.map(refs_of, docs))
+    else:
+        chunks = [refs_of(d) for d in docs]
+    return AssetGraph(bases=bases, refs=[r for chunk in chunks for r in chunk])
 
-            out_img = Image.new("RGBA", img.size)
-            out_img.putdata(out_pixels)
-            ensure_dir(out_path.parent)
-            out_img.save(out_path)
 
-            total_written += 1
-            LOG.info("Wrote %s", out_path.as_posix())
+def cmd_check_refs(args: argparse.Namespace) -> int:
+    root = Path(args.root or "output")
+    namespace = str(args.namespace or "modid").strip() or "modid"
+    jobs = max(1, int(getattr(args, "jobs", 1) or 1))
+    strict = bool(getattr(args, "strict_orphans", False))
 
-    LOG.info("Generate complete: wrote %d file(s).", total_written)
+    if not root.is_dir():
+        LOG.warning("Output root not found: %s", root.as_posix())
+        return 0
+
+    t0 = time.perf_counter()
+    graph = build_asset_graph(root, namespace, jobs=jobs)
+    dangling = graph.dangling()
+    orphans = graph.orphaned_textures()
+
+    for r in dangling:
+        LOG.error(
+            "DANGLING %s: %s '%s' (no %s/%s)",
+            (r.base.root / r.source).as_posix(),
+            r.kind,
+            r.ref,
+            parse_resource_location(r.ref)[0],
+            r.path,
+        )
+    for b, f in orphans:
+        log = LOG.error if strict else LOG.warning
+        log("ORPHAN %s (no model references it)", (b.root / f).as_posix())
+
+    report = getattr(args, "report", None)
+    if report == "json":
+        data = {
+            "root": root.as_posix(),
+            "files": sum(len(b.files) for b in graph.bases),
+            "references": len(graph.refs),
+            "dangling": [
+                {
+                    "file": (r.base.root / r.source).as_posix(),
+                    "kind": r.kind,
+                    "ref": r.ref,
+                    "expected": r.path,
+                }
+                for r in dangling
+            ],
+            "orphaned_textures": [(b.root / f).as_posix() for b, f in orphans],
+            "seconds": round(time.perf_counter() - t0, 6),
+        }
+        write_report(
+            json.dumps(data, indent=2, ensure_ascii=False) + "\n",
+            getattr(args, "report_out", None),
+        )
+
+    LOG.info(
+        "Check-refs complete: %d file(s), %d reference(s), %d dangling, %d orphaned texture(s) in %.2fs.",
+        sum(len(b.files) for b in graph.bases),
+        len(graph.refs),
+        len(dangling),
+        len(orphans),
+        time.perf_counter() - t0,
+    )
+    if dangling or (strict and orphans):
+        return 2
     return 0
 
 
 # ----------------------------
-# Command: autotemplate (schema-driven)
+# Command: audit (schema validation of generated JSON outputs)
 # ----------------------------
-def palette_hit_score(template_colors: set[RGBA], palette: List[RGBA]) -> int:
-    pal_set = set(palette)
-    return sum(1 for c in template_colors if c in pal_set)
+# Asset category folder -> bundled schema
+AUDIT_SCHEMAS: Dict[str, str] = {
+    "items": "minecraft-item-definition.schema.json",
+    "models": "minecraft-model.schema.json",
+    "blockstates": "minecraft-blockstate.schema.json",
+}
 
 
-def cmd_autotemplate(args: argparse.Namespace) -> int:
-    templates_dir = Path(args.templates or "textures_input")
-    palettes_dir = Path(args.palettes or "palettes")
-    out_dir = Path(args.out_dir).resolve() if args.out_dir else templates_dir
-    materials = str(args.materials or "wood,metal,glass")
-    min_alpha = int(args.min_alpha or 1)
-    min_hits = int(args.min_hits or 2)
-    dry_run = bool(args.dry_run)
+def asset_category(path: Path, root: Path) -> Optional[str]:
+    """
+    First category folder (items/models/blockstates) in path below root, if any.
+    """
+    for part in path.relative_to(root).parts[:-1]:
+        if part in AUDIT_SCHEMAS:
+            return part
+    return None
 
-    palette_index = load_all_palettes_index(palettes_dir)
-    pngs = sorted([p for p in templates_dir.glob("*.png") if p.is_file()])
-    if not pngs:
-        LOG.warning("No PNG templates found in %s", templates_dir.as_posix())
+
+def audit_json_file(
+    path: Path, category: str, validator: "Draft202012Validator"
+) -> Tuple[FileCheck, List[str]]:
+    """
+    Validate one output document. Returns the check and one error-type key
+    per error ("<category>/<keyword>") for grouping.
+    """
+    t0 = time.perf_counter()
+    try:
+        doc = load_json(path)
+    except Exception as e:
+        check = FileCheck(path, False, [f"invalid JSON: {e}"], time.perf_counter() - t0)
+        return check, [f"{category}/invalid-json"]
+    errors = sorted(validator.iter_errors(doc), key=lambda e: list(e.path))
+    check = FileCheck(
+        path,
+        not errors,
+        [format_validation_error(e) for e in errors[:20]],
+        time.perf_counter() - t0,
+    )
+    return check, [f"{category}/{e.validator}" for e in errors]
+
+
+def cmd_audit(args: argparse.Namespace) -> int:
+    root = Path(args.root or "output")
+    schemas_dir = Path(args.schemas or "schemas")
+    jobs = max(1, int(getattr(args, "jobs", 1) or 1))
+    report = getattr(args, "report", None)
+
+    if Draft202012Validator is None:
+        LOG.error("jsonschema is not installed; cannot audit outputs.")
+        return 2
+    if not root.exists():
+        LOG.warning("Output root not found: %s", root.as_posix())
         return 0
 
-    written = 0
-    for png in pngs:
-        template_id = png.stem
-        img = Image.open(png).convert("RGBA")
-        pixels: List[RGBA] = list(img.getdata())
-        template_colors: set[RGBA] = {p for p in pixels if p[3] >= min_alpha}
+    # One registry, one compiled validator per output kind.
+    registry = build_registry(schemas_dir)
+    validators: Dict[str, "Draft202012Validator"] = {}
+    for category, schema_name in AUDIT_SCHEMAS.items():
+        schema_path = schemas_dir / schema_name
+        if not schema_path.exists():
+            LOG.error("Missing schema %s", schema_path.as_posix())
+            return 2
+        validators[category] = build_validator(
+            schema_path, schemas_dir, registry=registry
+        )
 
-        slots: List[Dict[str, Any]] = []
-        slot_names: List[str] = []
+    def jobs_iter() -> Iterator[Tuple[Path, str]]:
+        for path in iter_files(root, ".json"):
+            category = asset_category(path, root)
+            if category is not None:
+                yield path, category
 
-        for material in (m.strip() for m in materials.split(",")):
-            if not material:
-                continue
-            by_id = palette_index.get(material, {})
-            if not by_id:
-                continue
+    t0 = time.perf_counter()
+    total = 0
+    failed: List[FileCheck] = []
+    results: List[FileCheck] = []
+    groups: Dict[str, int] = {}
+    for check, kinds in bounded_map(
+        lambda job: audit_json_file(job[0], job[1], validators[job[1]]),
+        jobs_iter(),
+        jobs=jobs,
+    ):
+        total += 1
+        if report:
+            results.append(check)
+        if not check.ok:
+            failed.append(check)
+            log_file_check(check)
+            for k in kinds:
+                groups[k] = groups.get(k, 0) + 1
+
+    if report:
+        write_report(
+            render_check_report(
+                results,
+                str(report),
+                suite="btg.audit",
+                seconds=time.perf_counter() - t0,
+            ),
+            getattr(args, "report_out", None),
+        )
 
-            best_score = 0
-            best_ref: Optional[PaletteRef] = None
-            for _, ref in by_id.items():
-                _, grp = ref.item.default_group()
-                score = palette_hit_score(template_colors, grp.colors_rgba())
-                if score > best_score:
-                    best_score = score
-                    best_ref = ref
+    LOG.info(
+        "Audit complete: %d file(s), %d failed in %.2fs.",
+        total,
+        len(failed),
+        time.perf_counter() - t0,
+    )
+    for k, n in sorted(groups.items(), key=lambda kv: (-kv[1], kv[0])):
+        LOG.info("  %-40s %d error(s)", k, n)
+    return 0 if not failed else 2
 
-            if best_ref is None or best_score < min_hits:
-                continue
 
-            slot_names.append(material)
-            slots.append(
-                {
-                    "slot": material,
-                    "material": material,
-                    "source": {
-                        "palette": rel_posix(best_ref.file_path, palettes_dir),
-                        "id": best_ref.item.id,
-                        "group": "base",
-                    },
-                }
-            )
+# ----------------------------
+# Command: lint-textures (PNG header + pixel lint)
+# ----------------------------
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_TYPES: Dict[int, str] = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+RESOURCE_PATH_RE = re.compile(r"^[a-z0-9_./-]+$")
 
-        if not slots:
-            LOG.warning("No slots detected for %s (try lowering --min-hits).", png.name)
-            continue
 
-        out_pattern = infer_output_pattern(template_id, slot_names)
-        data = {
-            "schema": "btg-template",
-            "version": 1,
-            "template": {"id": template_id, "path": png.as_posix().replace("\\", "/")},
-            "output": {"pattern": out_pattern},
-            "slots": slots,
-        }
+@dataclass(frozen=True, slots=True)
+class PngHeader:
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+    interlace: int
 
-        out_path = out_dir / f"{template_id}.btg-template.json"
-        if dry_run:
-            LOG.info("[DRY] Would write %s", out_path.as_posix())
+    @property
+    def mode(self) -> str:
+        return PNG_COLOR_TYPES.get(self.color_type, f"type{self.color_type}")
+
+
+def read_png_header(path: Path) -> PngHeader:
+    """
+    Parse the IHDR chunk only (first 29 bytes); no pixel data is read.
+    """
+    with path.open("rb") as f:
+        head = f.read(29)
+    if len(head) < 29 or head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        raise ValueError("not a PNG file")
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+        ">IIBBBBB", head[16:29]
+    )
+    return PngHeader(width, height, bit_depth, color_type, interlace)
+
+
+def is_pow2(n: int) -> bool:
+    return n > 0 and (n & (n - 1)) == 0
+
+
+@dataclass(slots=True)
+class TextureLint:
+    path: Path
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def lint_texture(path: Path, root: Path, *, check_pixels: bool = True) -> TextureLint:
+    t0 = time.perf_counter()
+    out = TextureLint(path)
+
+    rel = path.relative_to(root).as_posix() if path != root else path.name
+    if not RESOURCE_PATH_RE.match(rel):
+        out.errors.append(
+            f"'{rel}' is not a valid resource location (use [a-z0-9_./-] only)"
+        )
+
+    try:
+        hdr = read_png_header(path)
+    except Exception as e:
+        out.errors.append(str(e))
+        out.seconds = time.perf_counter() - t0
+        return out
+
+    w, h = hdr.width, hdr.height
+    if not is_pow2(w):
+        out.errors.append(f"width {w} is not a power of two")
+    elif h != w:
+        if h % w == 0:
+            # Vertical animation strip: frames are w x w
+            mcmeta = path.with_name(path.name + ".mcmeta")
+            if not mcmeta.exists():
+                out.warnings.append(
+                    f"{w}x{h} looks like an animation strip but has no {mcmeta.name}"
+                )
+        elif not is_pow2(h):
+            out.errors.append(f"height {h} is not a power of two or a multiple of {w}")
+
+    if hdr.color_type not in PNG_COLOR_TYPES:
+        out.errors.append(f"unknown PNG color type {hdr.color_type}")
+    if hdr.bit_depth > 8:
+        out.warnings.append(f"{hdr.bit_depth}-bit {hdr.mode}; 8-bit is expected")
+    if hdr.interlace:
+        out.warnings.append("interlaced (Adam7) PNG")
+
+    if check_pixels and not out.errors:
+        try:
+            colors = texture_histogram(path).rgba(min_alpha=0)
+        except Exception as e:
+            out.errors.append(f"cannot decode ({e})")
         else:
-            save_json(out_path, data)
-            LOG.info("Wrote %s", out_path.as_posix())
-        written += 1
+            stray = sum(1 for c in colors if c[3] == 0 and (c[0] or c[1] or c[2]))
+            if stray:
+                out.warnings.append(
+                    f"{stray} fully transparent color(s) with non-zero RGB"
+                )
 
-    LOG.info("Autotemplate complete: %d file(s).", written)
+    out.seconds = time.perf_counter() - t0
+    return out
+
+
+def cmd_lint_textures(args: argparse.Namespace) -> int:
+    roots = [Path(r.strip()) for r in str(args.roots).split(",") if r.strip()]
+    jobs = max(1, int(getattr(args, "jobs", 1) or 1))
+    check_pixels = not bool(getattr(args, "headers_only", False))
+    strict = bool(getattr(args, "strict", False))
+    report = getattr(args, "report", None)
+
+    def jobs_iter() -> Iterator[Tuple[Path, Path]]:
+        for root in roots:
+            if not root.exists():
+                LOG.debug("Skipping missing root %s", root.as_posix())
+                continue
+            for path in iter_files(root, ".png"):
+                yield path, root
+
+    t0 = time.perf_counter()
+    total = errors = warnings = 0
+    results: List[FileCheck] = []
+    for r in bounded_map(
+        lambda job: lint_texture(job[0], job[1], check_pixels=check_pixels),
+        jobs_iter(),
+        jobs=jobs,
+    ):
+        total += 1
+        errors += bool(r.errors)
+        warnings += bool(r.warnings)
+        for msg in r.errors:
+            LOG.error("FAIL %s: %s", r.path.as_posix(), msg)
+        for msg in r.warnings:
+            LOG.warning("WARN %s: %s", r.path.as_posix(), msg)
+        if report:
+            failed = bool(r.errors) or (strict and bool(r.warnings))
+            results.append(
+                FileCheck(
+                    r.path,
+                    not failed,
+                    r.errors + [f"warning: {m}" for m in r.warnings],
+                    r.seconds,
+                )
+            )
+
+    if report:
+        write_report(
+            render_check_report(
+                results,
+                str(report),
+                suite="btg.lint-textures",
+                seconds=time.perf_counter() - t0,
+            ),
+            getattr(args, "report_out", None),
+        )
+
+    LOG.info(
+        "Lint complete: %d texture(s), %d with errors, %d with warnings in %.2fs.",
+        total,
+        errors,
+        warnings,
+        time.perf_counter() - t0,
+    )
+    if errors or (strict and warnings):
+        return 2
     return 0
 
 
 # ----------------------------
-# Command: assets (items/models/lang from output/textures/item)
+# Command: generate-tab-assets (incremental)
 # ----------------------------
-def load_lang(path: Path) -> Dict[str, str]:
-    if not path.exists():
-        return {}
-    data = load_json(path)
-    if not isinstance(data, dict):
-        return {}
-    out: Dict[str, str] = {}
-    for k, v in data.items():
-        if isinstance(k, str):
-            out[k] = str(v)
-    return out
+def copy_file_fast(src: Path, dst: Path, mode: str = "copy") -> None:
+    """
+    Create dst with src's bytes: hardlink or reflink when asked (and the
+    filesystem allows), else copy_file_range (in-kernel, may reflink by
+    itself), else a buffered copy.
+    """
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        if mode == "reflink" and fcntl is not None:
+            try:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+                return
+            except OSError:
+                pass
+        if hasattr(os, "copy_file_range"):
+            try:
+                left = os.fstat(fs.fileno()).st_size
+                while left > 0:
+                    n = os.copy_file_range(fs.fileno(), fd.fileno(), left)
+                    if n == 0:
+                        break
+                    left -= n
+                if left == 0:
+                    return
+            except OSError:
+                pass
+            fs.seek(0)
+            fd.seek(0)
+            fd.truncate()
+        shutil.copyfileobj(fs, fd)
+
+
+def sync_file(src: Path, dst: Path, *, mode: str = "copy") -> bool:
+    """
+    Make dst a copy of src unless it already is; returns True if copied.
 
+    Same size and mtime (or the same inode) counts as unchanged; same size
+    with a different mtime falls back to comparing hashes. Copies get src's
+    mtime, so the next run takes the fast path.
+    """
+    st = src.stat()
+    try:
+        dt: Optional[os.stat_result] = dst.stat()
+    except FileNotFoundError:
+        dt = None
+    if dt is not None and dt.st_size == st.st_size:
+        if dt.st_mtime_ns == st.st_mtime_ns or os.path.samestat(st, dt):
+            return False
+        if sha256_bytes(src.read_bytes()) == sha256_bytes(dst.read_bytes()):
+            os.utime(dst, ns=(dt.st_atime_ns, st.st_mtime_ns))
+            return False
+    OUTPUT.ensure_dir(dst.parent)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        copy_file_fast(src, tmp, mode)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return True
 
-def save_lang(path: Path, data: Dict[str, str]) -> None:
-    ordered = dict(sorted(data.items(), key=lambda kv: kv[0]))
-    save_json(path, ordered, sort_keys=False)
 
+# Files a generate-tab-assets run produced, relative to --dst.
+SYNC_MANIFEST = ".btg-sync-manifest.json"
 
-def title_from_id(s: str) -> str:
-    s = s.replace(":", "_").replace("/", "_").replace("-", "_")
-    parts = [p for p in s.split("_") if p]
-    return " ".join(p[:1].upper() + p[1:] for p in parts)
 
+def load_sync_manifest(root: Path) -> List[str]:
+    path = root / SYNC_MANIFEST
+    if not path.is_file():
+        return []
+    try:
+        data = load_json(path)
+    except Exception as e:
+        LOG.warning("Ignoring unreadable %s (%s)", path.as_posix(), e)
+        return []
+    files = data.get("files") if isinstance(data, dict) else None
+    return [f for f in files if isinstance(f, str)] if isinstance(files, list) else []
 
-def cmd_assets(args: argparse.Namespace) -> int:
-    textures_dir = Path(args.textures or "output/textures/item")
-    items_dir = Path(args.items_dir or "output/items")
-    models_dir = Path(args.models_dir or "output/models/item")
-    lang_path = Path(args.lang or "output/lang/en_us.json")
-    namespace = str(args.namespace or "modid").strip() or "modid"
-    overwrite_lang = bool(args.overwrite_lang)
-    recursive = bool(args.recursive)
-    dry_run = bool(args.dry_run)
 
-    pngs = walk_pngs(textures_dir, recursive=recursive)
-    if not pngs:
-        LOG.warning("No PNGs found in %s", textures_dir.as_posix())
-        return 0
+def prune_stale_files(
+    root: Path, previous: Iterable[str], keep: set[str], *, dry_run: bool = False
+) -> int:
+    """
+    Delete files a previous run produced (previous, relative to root) that
+    are no longer in keep, then the folders that leaves empty. Files the
+    manifest never listed (other tools', hand-made) are left alone.
+    """
+    removed = 0
+    for rel in sorted(set(previous) - keep):
+        if Path(rel).is_absolute() or ".." in Path(rel).parts:
+            continue
+        f = root / rel
+        if not f.is_file():
+            continue
+        removed += 1
+        if dry_run:
+            LOG.info("[DRY] Would delete stale %s", f.as_posix())
+            continue
+        f.unlink()
+        d = f.parent
+        while d != root and not any(d.iterdir()):
+            d.rmdir()
+            d = d.parent
+    return removed
 
-    lang = load_lang(lang_path)
-    written_items = 0
-    written_models = 0
-    lang_changes = 0
 
-    for png in pngs:
-        item_id = png.stem
-        if not item_id:
+def generate_tab_assets(
+    src: Path = Path("examples/tab"),
+    dst: Path = Path("resources/assets/tab"),
+    namespace: str = "tab",
+    lang: Optional[LangAccumulator] = None,
+    *,
+    jobs: int = 4,
+    link: str = "copy",
+    prune: bool = True,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Walks the tab/ folder and generates .json files for items, blockstates, and models,
+    matching the format of the attached examples.
+
+    Incremental: copied files (models, textures, ...) are skipped when
+    unchanged and otherwise copied on a thread pool (see sync_file);
+    generated JSON goes through the output writer, which skips equal bytes.
+    The files produced are recorded in dst/.btg-sync-manifest.json; with
+    prune, files the previous manifest lists that this source no longer
+    produces are deleted. Returns counts (copied, unchanged, generated,
+    deleted).
+    """
+    acc = lang or LangAccumulator()
+    produced: set[str] = set()
+    copies: List[Tuple[Path, Path]] = []
+    generated = 0
+    for path in sorted(src.rglob("*")):
+        if path.is_dir():
             continue
+        rel = path.relative_to(src)
+        out_path = dst / rel
 
-        model_loc = f"{namespace}:item/{item_id}"
-        item_json = {"model": {"type": "minecraft:model", "model": model_loc}}
-        model_json = {"parent": "item/generated", "textures": {"layer0": model_loc}}
+        # Items
+        if "items" in rel.parts and path.suffix == ".json":
+            # e.g. items/barrels/oak_iron_barrel.json
+            item_id = rel.with_suffix("").as_posix().split("items/", 1)[1]
+            if "_block" in item_id:
+                # Block item
+                model_path = f"{namespace}:block/{item_id.replace('_block','_block')}"
+            else:
+                model_path = f"{namespace}:item/{item_id}"
+            data = {"model": {"type": "minecraft:model", "model": model_path}}
+            generated += 1
+            produced.add(rel.as_posix())
+            if dry_run:
+                LOG.info("[DRY] Would write %s", out_path.as_posix())
+            else:
+                OUTPUT.write_json(out_path, data)
+            continue
 
-        item_path = items_dir / f"{item_id}.json"
-        model_path = models_dir / f"{item_id}.json"
+        # Blockstates
+        if "blockstates" in rel.parts and path.suffix == ".json":
+            # e.g. blockstates/barrels/oak_iron_barrel_block.json
+            block_id = rel.with_suffix("").as_posix().split("blockstates/", 1)[1]
+            model_path = f"{namespace}:block/{block_id}"
+            data = {
+                "variants": {
+                    "normal": {"model": model_path},
+                    "facing=north": {"model": model_path},
+                    "facing=south": {"model": model_path, "y": 180},
+                    "facing=west": {"model": model_path, "y": 270},
+                    "facing=east": {"model": model_path, "y": 90},
+                }
+            }
+            generated += 1
+            produced.add(rel.as_posix())
+            if dry_run:
+                LOG.info("[DRY] Would write %s", out_path.as_posix())
+            else:
+                OUTPUT.write_json(out_path, data)
+            continue
 
-        if dry_run:
-            LOG.info("[DRY] Would write %s", item_path.as_posix())
-            LOG.info("[DRY] Would write %s", model_path.as_posix())
-        else:
-            save_json(item_path, item_json)
-            save_json(model_path, model_json)
-        written_items += 1
-        written_models += 1
+        # Lang (merged into the destination file, keeping keys from other tools)
+        if "lang" in rel.parts and path.suffix == ".json":
+            acc.update(out_path, load_lang(path))
+            continue
 
-        lang_key = f"item.{namespace}.{item_id}"
-        lang_val = title_from_id(item_id)
-        if overwrite_lang or (lang_key not in lang):
-            if lang.get(lang_key) != lang_val:
-                lang[lang_key] = lang_val
-                lang_changes += 1
+        # Models and other files (textures, etc): copy as-is
+        copies.append((path, out_path))
+        produced.add(rel.as_posix())
 
+    counts = {"copied": 0, "unchanged": 0, "generated": generated, "deleted": 0}
     if dry_run:
-        LOG.info(
-            "[DRY] Would update %s (%d change(s))", lang_path.as_posix(), lang_changes
-        )
+        for path, out_path in copies:
+            LOG.info("[DRY] Would sync %s -> %s", path.as_posix(), out_path.as_posix())
+    elif isinstance(OUTPUT, ZipOutputWriter):
+        # --zip: the files go into the pack, nothing to sync or prune on disk
+        for path, out_path in copies:
+            OUTPUT.write_bytes(out_path, path.read_bytes())
+        counts["copied"] = len(copies)
     else:
-        ensure_dir(lang_path.parent)
-        save_lang(lang_path, lang)
-
-    LOG.info(
-        "Assets complete: %d item json, %d model json, %d lang change(s).",
-        written_items,
-        written_models,
-        lang_changes,
+        for copied in bounded_map(
+            lambda job: sync_file(job[0], job[1], mode=link), copies, jobs=jobs
+        ):
+            counts["copied" if copied else "unchanged"] += 1
+
+    if not isinstance(OUTPUT, ZipOutputWriter):
+        # Queued JSON writes must land before pruning removes empty folders.
+        OUTPUT.flush()
+        previous = load_sync_manifest(dst)
+        if prune:
+            counts["deleted"] = prune_stale_files(
+                dst, previous, produced, dry_run=dry_run
+            )
+        if not dry_run:
+            # Kept stale files stay listed so a later pruning run removes them.
+            files = produced if prune else produced | set(previous)
+            save_json(dst / SYNC_MANIFEST, {"files": sorted(files)})
+    if lang is None:
+        acc.flush(dry_run=dry_run)
+    return counts
+
+
+def cmd_generate_tab_assets(args: argparse.Namespace) -> int:
+    src = Path(args.src or "examples/tab")
+    if not src.is_dir():
+        raise SystemExit(f"generate-tab-assets: not a directory: {src.as_posix()}")
+    counts = generate_tab_assets(
+        src,
+        Path(args.dst or "resources/assets/tab"),
+        str(args.namespace or "tab"),
+        lang=run_lang(args),
+        jobs=max(1, int(args.jobs or 1)),
+        link=str(args.link or "copy"),
+        prune=not bool(args.keep_stale),
+        dry_run=bool(args.dry_run),
+    )
+    LOG.info(
+        "Tab assets: %d copied, %d unchanged, %d generated, %d stale deleted.",
+        counts["copied"],
+        counts["unchanged"],
+        counts["generated"],
+        counts["deleted"],
     )
     return 0
 
@@ -1627,6 +5881,52 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument(
         "--dry-run", action="store_true", help="Do not write files; only log actions."
     )
+    p.add_argument(
+        "--write-jobs",
+        type=int,
+        default=4,
+        help="Threads encoding/writing output files (default: 4; 1 = synchronous).",
+    )
+    p.add_argument(
+        "--output-links",
+        choices=LINK_MODES,
+        default="copy",
+        help="When one file goes to several places (modid + flat trees): copy "
+        "the bytes (default), hardlink, or reflink on filesystems that support "
+        "it (falls back to copying).",
+    )
+    p.add_argument(
+        "--zip",
+        default=None,
+        help="Write files under --zip-root into this resource pack zip instead of "
+        "the filesystem (deterministic; a .sha1 file is written next to it).",
+    )
+    p.add_argument(
+        "--zip-root",
+        default="output",
+        help="Output directory captured by --zip (default: output).",
+    )
+    p.add_argument(
+        "--zip-namespace",
+        default=None,
+        help="Store --zip-root files as assets/<namespace>/... (required when "
+        "the root is a namespace tree rather than a pack root).",
+    )
+    p.add_argument(
+        "--png-profile",
+        choices=PNG_PROFILES,
+        default="balanced",
+        help="PNG encoding for written textures: fast (zlib level 1, dev runs), "
+        "balanced (Pillow defaults), max (smallest lossless mode, optimize, no "
+        "ancillary chunks).",
+    )
+    p.add_argument(
+        "--json-style",
+        choices=JSON_STYLES,
+        default="pretty",
+        help="Generated JSON layout: pretty (indent 2, default) or compact "
+        "(no whitespace; uses orjson when installed).",
+    )
 
     sub = p.add_subparsers(dest="cmd", required=True)
 
@@ -1639,6 +5939,116 @@ def build_parser() -> argparse.ArgumentParser:
     )
     n.set_defaults(func=cmd_normalize)
 
+    # normalize-images
+    ni = sub.add_parser(
+        "normalize-images",
+        help="Convert PNGs to RGBA, resize (nearest-neighbor), strip metadata and rename to resource-location ids.",
+    )
+    ni.add_argument(
+        "--input",
+        default="textures_input",
+        help="Input directory (default: textures_input).",
+    )
+    ni.add_argument("--output", default=None, help="Output directory.")
+    ni.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Rewrite files inside --input (renamed originals are removed).",
+    )
+    ni.add_argument(
+        "--size",
+        type=int,
+        default=None,
+        help="Target width in pixels (animation strips keep square frames).",
+    )
+    ni.add_argument(
+        "--rename-map",
+        default=None,
+        help="Where to write the old -> new name map (default: <output>/rename-map.json).",
+    )
+    ni.add_argument("--jobs", type=int, default=1, help="Worker threads (default: 1).")
+    ni.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for cached results (default: .btg_cache).",
+    )
+    ni.set_defaults(func=cmd_normalize_images)
+
+    # optimize-pngs
+    op = sub.add_parser(
+        "optimize-pngs",
+        help="Losslessly recompress every PNG under a tree (process pool, cached by content hash).",
+    )
+    op.add_argument(
+        "--input",
+        default=None,
+        help="Directory to optimize in place (default: output).",
+    )
+    op.add_argument(
+        "--profile",
+        choices=PNG_PROFILES,
+        default="max",
+        help="PNG profile to re-encode with; files only change if they shrink (default: max).",
+    )
+    op.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes (default: CPU count).",
+    )
+    op.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for cached results (default: .btg_cache).",
+    )
+    op.add_argument("--no-cache", action="store_true", help="Re-check every file.")
+    op.add_argument("--report", choices=["json"], default=None)
+    op.add_argument(
+        "--report-out", default=None, help="Write the report here instead of stdout."
+    )
+    op.set_defaults(func=cmd_optimize_pngs)
+
+    # pack
+    pk = sub.add_parser(
+        "pack",
+        help="Zip an output tree into a resource pack (deterministic, prints the SHA-1).",
+    )
+    pk.add_argument(
+        "--input",
+        default=None,
+        help="Pack root (has pack.mcmeta or assets/) or a namespace tree such as "
+        "output/<namespace> (default: output).",
+    )
+    pk.add_argument(
+        "--namespace",
+        default=None,
+        help="Namespace for a namespace-tree --input (required unless --input "
+        "is a pack root).",
+    )
+    pk.add_argument("--out", default=None, help="Zip to write (default: <input>.zip).")
+    pk.add_argument(
+        "--pack-format",
+        type=int,
+        default=DEFAULT_PACK_FORMAT,
+        help=f"pack.mcmeta pack_format if the tree has none (default: {DEFAULT_PACK_FORMAT}).",
+    )
+    pk.add_argument(
+        "--description", default=None, help="pack.mcmeta description if generated."
+    )
+    pk.add_argument(
+        "--level",
+        type=int,
+        default=6,
+        help="Deflate level for non-PNG entries (default: 6).",
+    )
+    pk.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Threads reading/deflating entries (default: CPU count).",
+    )
+    pk.set_defaults(func=cmd_pack)
+
     # validate
     v = sub.add_parser(
         "validate", help="Validate palette JSON files (schema + semantic checks)."
@@ -1649,6 +6059,30 @@ def build_parser() -> argparse.ArgumentParser:
     v.add_argument(
         "--palettes", default=None, help="Palettes directory (default: palettes)."
     )
+    v.add_argument(
+        "--jobs", type=int, default=1, help="Validate files concurrently (default: 1)."
+    )
+    v.add_argument(
+        "--report",
+        choices=["json", "junit"],
+        default=None,
+        help="Emit a per-file report with status and timing.",
+    )
+    v.add_argument(
+        "--report-out",
+        default=None,
+        help="Write the report to this file (default: stdout).",
+    )
+    v.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for cached results (default: .btg_cache).",
+    )
+    v.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached results and validate every file.",
+    )
     v.set_defaults(func=cmd_validate)
 
     # extract
@@ -1717,6 +6151,12 @@ def build_parser() -> argparse.ArgumentParser:
     r.add_argument("--alpha-weight", type=float, default=0.25)
     r.add_argument("--no-preserve-alpha", action="store_true")
     r.add_argument("--no-exact-first", action="store_true")
+    r.add_argument(
+        "--indexed",
+        action="store_true",
+        help="Write palette (P-mode) PNGs with tRNS, built from the known colors, "
+        "when a texture has at most 256 colors (RGBA otherwise).",
+    )
     r.set_defaults(func=cmd_recolor)
 
     # recolor-templates (legacy task templates)
@@ -1751,6 +6191,17 @@ def build_parser() -> argparse.ArgumentParser:
     lt.add_argument(
         "--no-flat-tree", action="store_true", help="Disable output/... flat tree."
     )
+    lt.add_argument(
+        "--dedupe-models",
+        action="store_true",
+        help="Write identical block models once and hoist shared model structure into models/block/shared/ parents.",
+    )
+    lt.add_argument(
+        "--indexed",
+        action="store_true",
+        help="Write palette (P-mode) PNGs with tRNS, built from the known colors, "
+        "when a texture has at most 256 colors (RGBA otherwise).",
+    )
     lt.set_defaults(func=cmd_recolor_templates)
 
     # generate (schema-driven multi-slot templates)
@@ -1766,6 +6217,9 @@ def build_parser() -> argparse.ArgumentParser:
     g.add_argument(
         "--palettes", default=None, help="Palettes directory (default: palettes)."
     )
+    g.add_argument(
+        "--schemas", default=None, help="Schema directory (default: schemas)."
+    )
     g.add_argument(
         "--output",
         default="output/textures/item",
@@ -1778,8 +6232,139 @@ def build_parser() -> argparse.ArgumentParser:
     g.add_argument(
         "--limit", type=int, default=None, help="Limit number of outputs per run."
     )
+    g.add_argument(
+        "--mode",
+        choices=["png", "paletted"],
+        default="png",
+        help=(
+            "png: one texture per combination (default). paletted: one grayscale "
+            "texture per template plus palette strips and a paletted_permutations "
+            "atlas source, so the game builds the combinations at load time."
+        ),
+    )
+    g.add_argument(
+        "--namespace",
+        default="modid",
+        help="Texture namespace for paletted mode if --output is not under assets/<ns>/.",
+    )
+    g.add_argument(
+        "--atlas",
+        default=None,
+        help="Atlas JSON to update in paletted mode (default: <assets>/minecraft/atlases/blocks.json).",
+    )
+    g.add_argument(
+        "--separator",
+        default="_",
+        help=(
+            "Sprite name separator in paletted mode: sprites are "
+            "<texture><separator><output name> (default: _)."
+        ),
+    )
+    g.add_argument(
+        "--tint-mode",
+        action="store_true",
+        help=(
+            "Slots whose palettes are single-hue ramps become one grayscale layer; "
+            "each combination gets a 1.21.4+ item definition with constant tints "
+            "instead of its own texture (requires --output under textures/item)."
+        ),
+    )
+    g.add_argument(
+        "--tint-tolerance",
+        type=float,
+        default=6,
+        help="Max per-channel error allowed when reproducing a palette with a tint (default: 6).",
+    )
+    g.add_argument(
+        "--dedupe",
+        nargs="?",
+        const="hardlink",
+        default=None,
+        choices=LINK_MODES,
+        help=(
+            "Encode identical rendered images once; duplicates become hardlinks "
+            "(default), reflinks or byte copies of the first file. Duplicate "
+            "groups are logged."
+        ),
+    )
+    g.add_argument(
+        "--dedupe-report",
+        default=None,
+        help="Write duplicate groups as JSON to this file (with --dedupe).",
+    )
+    g.add_argument(
+        "--indexed",
+        action="store_true",
+        help="Write palette (P-mode) PNGs with tRNS, built from the known colors, "
+        "when a texture has at most 256 colors (RGBA otherwise).",
+    )
     g.set_defaults(func=cmd_generate)
 
+    # preflight (schema-driven templates, no pixel work)
+    pf = sub.add_parser(
+        "preflight",
+        help="Check schema-driven templates (schema, palette refs, combinations, output collisions).",
+    )
+    pf.add_argument(
+        "--templates",
+        default=None,
+        help="Templates directory (default: textures_input).",
+    )
+    pf.add_argument(
+        "--palettes", default=None, help="Palettes directory (default: palettes)."
+    )
+    pf.add_argument(
+        "--schemas", default=None, help="Schema directory (default: schemas)."
+    )
+    pf.add_argument(
+        "--limit", type=int, default=None, help="Only check the first N outputs."
+    )
+    pf.set_defaults(func=cmd_preflight)
+
+    # plan (estimate generate cost)
+    pl = sub.add_parser(
+        "plan",
+        help="Estimate files, pixel work, disk usage and time for generate.",
+    )
+    pl.add_argument(
+        "--templates",
+        default=None,
+        help="Templates directory (default: textures_input).",
+    )
+    pl.add_argument(
+        "--palettes", default=None, help="Palettes directory (default: palettes)."
+    )
+    pl.add_argument(
+        "--schemas", default=None, help="Schema directory (default: schemas)."
+    )
+    pl.add_argument("--min-alpha", type=int, default=1)
+    pl.add_argument(
+        "--limit", type=int, default=None, help="Limit number of outputs per template."
+    )
+    pl.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for the cached calibration (default: .btg_cache).",
+    )
+    pl.add_argument(
+        "--recalibrate",
+        action="store_true",
+        help="Re-measure render/encode throughput on this machine.",
+    )
+    pl.add_argument(
+        "--indexed",
+        action="store_true",
+        help="Estimate for generate --indexed (P-mode PNGs). Encoding follows "
+        "the global --png-profile.",
+    )
+    pl.add_argument("--report", choices=["json"], default=None)
+    pl.add_argument(
+        "--report-out",
+        default=None,
+        help="Write the report to this file (default: stdout).",
+    )
+    pl.set_defaults(func=cmd_plan)
+
     # autotemplate (schema-driven)
     a = sub.add_parser(
         "autotemplate",
@@ -1810,6 +6395,18 @@ def build_parser() -> argparse.ArgumentParser:
         default=2,
         help="Minimum exact palette hits to accept a material.",
     )
+    a.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.0,
+        help="Count template colors within this color distance of a palette color as hits (default: 0, exact only).",
+    )
+    a.add_argument("--alpha-weight", type=float, default=0.25)
+    a.add_argument(
+        "--masks",
+        action="store_true",
+        help="Also write <template>.mask.png slot masks built from connected regions of exact palette hits.",
+    )
     a.set_defaults(func=cmd_autotemplate)
 
     # assets
@@ -1848,8 +6445,134 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Overwrite existing lang keys if present.",
     )
+    x.add_argument(
+        "--tint-mode",
+        action="store_true",
+        help=(
+            "Fold textures that are one grayscale image times a constant color into "
+            "<textures>/tinted/<name>.png plus 1.21.4+ item definitions with tints."
+        ),
+    )
+    x.add_argument(
+        "--tint-tolerance",
+        type=float,
+        default=6,
+        help="Max per-channel error allowed when matching a texture to a tint (default: 6).",
+    )
     x.set_defaults(func=cmd_assets)
 
+    # check-refs
+    cr = sub.add_parser(
+        "check-refs",
+        help="Report dangling model/texture references and orphaned textures under an output root.",
+    )
+    cr.add_argument(
+        "--root",
+        default="output",
+        help="Output root holding <namespace>/ trees and/or a flat tree (default: output).",
+    )
+    cr.add_argument(
+        "--namespace",
+        default="modid",
+        help="Namespace of the flat tree directly under --root (default: modid).",
+    )
+    cr.add_argument(
+        "--jobs", type=int, default=1, help="Parse JSON files concurrently."
+    )
+    cr.add_argument(
+        "--strict-orphans",
+        action="store_true",
+        help="Treat orphaned textures as errors.",
+    )
+    cr.add_argument("--report", choices=["json"], default=None)
+    cr.add_argument(
+        "--report-out",
+        default=None,
+        help="Write the report to this file (default: stdout).",
+    )
+    cr.set_defaults(func=cmd_check_refs)
+
+    # audit
+    au = sub.add_parser(
+        "audit",
+        help="Validate generated items/, models/ and blockstates/ JSON against bundled schemas.",
+    )
+    au.add_argument("--root", default="output", help="Output root (default: output).")
+    au.add_argument(
+        "--schemas", default=None, help="Schema directory (default: schemas)."
+    )
+    au.add_argument(
+        "--jobs", type=int, default=1, help="Validate files concurrently (default: 1)."
+    )
+    au.add_argument("--report", choices=["json", "junit"], default=None)
+    au.add_argument(
+        "--report-out",
+        default=None,
+        help="Write the report to this file (default: stdout).",
+    )
+    au.set_defaults(func=cmd_audit)
+
+    # lint-textures
+    lx = sub.add_parser(
+        "lint-textures",
+        help="Lint PNGs (size, color type, bit depth, stray transparent colors, resource-location names).",
+    )
+    lx.add_argument(
+        "--roots",
+        default="textures,templates,output",
+        help="Comma list of directories to scan (default: textures,templates,output).",
+    )
+    lx.add_argument(
+        "--jobs", type=int, default=1, help="Lint files concurrently (default: 1)."
+    )
+    lx.add_argument(
+        "--headers-only",
+        action="store_true",
+        help="Only read PNG headers; skip pixel checks.",
+    )
+    lx.add_argument("--strict", action="store_true", help="Treat warnings as errors.")
+    lx.add_argument("--report", choices=["json", "junit"], default=None)
+    lx.add_argument(
+        "--report-out",
+        default=None,
+        help="Write the report to this file (default: stdout).",
+    )
+    lx.set_defaults(func=cmd_lint_textures)
+
+    # generate-tab-assets
+    ta = sub.add_parser(
+        "generate-tab-assets",
+        help="Sync examples/tab into a resource tree (incremental; generates items/blockstates JSON).",
+    )
+    ta.add_argument(
+        "--src", default=None, help="Source tab folder (default: examples/tab)."
+    )
+    ta.add_argument(
+        "--dst",
+        default=None,
+        help="Destination assets folder (default: resources/assets/tab).",
+    )
+    ta.add_argument(
+        "--namespace",
+        default="tab",
+        help="Namespace for model references (default: tab).",
+    )
+    ta.add_argument("--jobs", type=int, default=4, help="Copy threads (default: 4).")
+    ta.add_argument(
+        "--link",
+        choices=LINK_MODES,
+        default="copy",
+        help="How copied files are created: copy (copy_file_range), hardlink or "
+        "reflink; links fall back to copying (default: copy).",
+    )
+    ta.add_argument(
+        "--keep-stale",
+        action="store_true",
+        help="Do not delete files earlier runs synced that the source no longer "
+        "has (only files in --dst/.btg-sync-manifest.json are ever deleted).",
+    )
+    ta.set_defaults(func=cmd_generate_tab_assets)
+
     # block-assets
     from btg_block_assets import cmd_block_assets
 
@@ -1897,6 +6620,19 @@ def build_parser() -> argparse.ArgumentParser:
         default="templates/block_assets/blockstates",
         help="Optional directory with per-block blockstate templates: <block_id>.json",
     )
+    b.add_argument(
+        "--blockstate-properties",
+        default="facing",
+        help=(
+            "Blockstate properties for blocks without a template, e.g. facing,open,half,waterlogged "
+            "(default: facing). Variants or multipart is chosen by size."
+        ),
+    )
+    b.add_argument(
+        "--dedupe-models",
+        action="store_true",
+        help="Write identical block models once and hoist shared model structure into models/block/shared/ parents.",
+    )
     b.set_defaults(func=cmd_block_assets)
 
     return p
@@ -1911,85 +6647,61 @@ def main(argv: Optional[List[str]] = None) -> int:
         format="%(levelname)s: %(message)s",
     )
 
+    # Shared texture histogram cache; commands with --cache-dir/--no-cache steer it.
+    open_histogram_cache(
+        None
+        if getattr(args, "no_cache", False)
+        else Path(getattr(args, "cache_dir", None) or DEFAULT_CACHE_DIR)
+    )
+
     # Allow global --dry-run to apply everywhere, even if subparser didn't define it
     # (argparse will still set args.dry_run because we added it globally).
-    return int(args.func(args))
-
-
-if __name__ == "__main__":
-    raise SystemExit(main())
-
-
-def generate_tab_assets(
-    src: Path = Path("examples/tab"),
-    dst: Path = Path("resources/assets/tab"),
-    namespace: str = "tab",
-) -> None:
-    """
-    Walks the tab/ folder and generates .json files for items, blockstates, and models,
-    matching the format of the attached examples.
-    """
-    for path in sorted(src.rglob("*")):
-        if path.is_dir():
-            continue
-        rel = path.relative_to(src)
-        out_path = dst / rel
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Items
-        if "items" in rel.parts and path.suffix == ".json":
-            # e.g. items/barrels/oak_iron_barrel.json
-            item_id = rel.with_suffix("").as_posix().split("items/", 1)[1]
-            if "_block" in item_id:
-                # Block item
-                model_path = f"{namespace}:block/{item_id.replace('_block','_block')}"
-            else:
-                model_path = f"{namespace}:item/{item_id}"
-            data = {"model": {"type": "minecraft:model", "model": model_path}}
-            out_path.write_text(
-                json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
-            )
-            continue
-
-        # Blockstates
-        if "blockstates" in rel.parts and path.suffix == ".json":
-            # e.g. blockstates/barrels/oak_iron_barrel_block.json
-            block_id = rel.with_suffix("").as_posix().split("blockstates/", 1)[1]
-            model_path = f"{namespace}:block/{block_id}"
-            data = {
-                "variants": {
-                    "normal": {"model": model_path},
-                    "facing=north": {"model": model_path},
-                    "facing=south": {"model": model_path, "y": 180},
-                    "facing=west": {"model": model_path, "y": 270},
-                    "facing=east": {"model": model_path, "y": 90},
-                }
-            }
-            out_path.write_text(
-                json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
+    # Lang keys from the whole run are written once, after the command;
+    # generated files go through one pooled writer.
+    set_json_style(str(getattr(args, "json_style", None) or "pretty"))
+    set_png_profile(str(getattr(args, "png_profile", None) or "balanced"))
+    args.lang_acc = LangAccumulator()
+    jobs = int(getattr(args, "write_jobs", 4) or 1)
+    link = str(getattr(args, "output_links", None) or "copy")
+    zip_sink: Optional[ZipOutputWriter] = None
+    if getattr(args, "zip", None):
+        zip_sink = ZipOutputWriter(
+            Path(args.zip),
+            Path(getattr(args, "zip_root", None) or "output"),
+            namespace=getattr(args, "zip_namespace", None),
+            jobs=jobs,
+            link=link,
+            dry_run=bool(getattr(args, "dry_run", False)),
+        )
+    writer = open_output_writer(jobs, link, zip_sink=zip_sink)
+    args.writer = writer
+    try:
+        rc = int(args.func(args))
+        if rc != 0 and zip_sink is not None:
+            zip_sink.discard()  # a failed command must not replace the pack
+        writer.flush()
+        args.lang_acc.flush(dry_run=bool(getattr(args, "dry_run", False)), sink=writer)
+        writer.close()
+        if writer.written or writer.unchanged:
+            LOG.info(
+                "Output: %d file(s) written, %d unchanged.",
+                writer.written,
+                writer.unchanged,
             )
-            continue
-
-        # Models (copy as-is)
-        if "models" in rel.parts and path.suffix == ".json":
-            # Copy the model file as-is
-            out_path.write_text(path.read_text(encoding="utf-8"), encoding="utf-8")
-            continue
-
-        # Lang (copy as-is)
-        if "lang" in rel.parts and path.suffix == ".json":
-            out_path.write_text(path.read_text(encoding="utf-8"), encoding="utf-8")
-            continue
-
-        # Other files (textures, etc): copy as-is
-        out_path.write_bytes(path.read_bytes())
+        return rc
+    except BaseException:
+        if zip_sink is not None:
+            zip_sink.discard()  # never publish a partial pack
+        try:
+            writer.close()
+        except Exception as e:
+            # Keep the original error; this one is usually a consequence of it.
+            LOG.error("Pending output writes also failed: %s", e)
+        raise
+    finally:
+        if not getattr(args, "dry_run", False):
+            save_histogram_cache()
 
 
-# Add to your CLI
 if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) > 1 and sys.argv[1] == "generate-tab-assets":
-        generate_tab_assets()
-        print("Tab assets generated.")
-        sys.exit(0)
+    raise SystemExit(main())
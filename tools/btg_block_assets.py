@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import hashlib
+import itertools
 import json
 import logging
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 LOG = logging.getLogger("btg.block_assets")
 
@@ -77,16 +80,320 @@ def minecraft_block_model_cube_all(namespace: str, block_id: str) -> Dict[str, A
     }
 
 
+# ----------------------------
+# Property-matrix blockstates
+# ----------------------------
+@dataclass(frozen=True, slots=True)
+class BlockProperty:
+    """
+    One blockstate property.
+
+    rotations: value -> {"x": deg, "y": deg} added to the model rotation.
+    models: value -> suffix appended to the model id (e.g. open=true -> "_open").
+    Properties without rotations/models do not change the look and are left
+    out of the blockstate (it then matches every value), unless they are
+    pinned to a single value.
+    """
+
+    name: str
+    values: Tuple[str, ...]
+    rotations: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    models: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def keyed(self) -> bool:
+        return bool(self.rotations or self.models) or len(self.values) == 1
+
+
+FACING = BlockProperty(
+    "facing",
+    ("north", "east", "south", "west"),
+    rotations={
+        "north": {"y": 0},
+        "east": {"y": 90},
+        "south": {"y": 180},
+        "west": {"y": 270},
+    },
+)
+OPEN = BlockProperty("open", ("false", "true"), models={"true": "_open"})
+HALF = BlockProperty("half", ("bottom", "top"), rotations={"top": {"x": 180}})
+WATERLOGGED = BlockProperty("waterlogged", ("false", "true"))
+BLOCK_PROPERTIES: Dict[str, BlockProperty] = {
+    p.name: p for p in (FACING, OPEN, HALF, WATERLOGGED)
+}
+
+
+def parse_block_properties(spec: str) -> List[BlockProperty]:
+    """
+    "facing,open,waterlogged" -> built-in properties, in that order.
+    """
+    out: List[BlockProperty] = []
+    for name in (n.strip() for n in spec.split(",")):
+        if not name:
+            continue
+        if name not in BLOCK_PROPERTIES:
+            raise SystemExit(
+                f"Unknown blockstate property '{name}' (known: {', '.join(BLOCK_PROPERTIES)})"
+            )
+        out.append(BLOCK_PROPERTIES[name])
+    return out
+
+
+def _matrix_apply(
+    model: str, props: List[BlockProperty], combo: Tuple[str, ...], uvlock: bool
+) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "model": model + "".join(p.models.get(v, "") for p, v in zip(props, combo))
+    }
+    for axis in ("x", "y"):
+        parts = [
+            p.rotations[v][axis]
+            for p, v in zip(props, combo)
+            if axis in p.rotations.get(v, {})
+        ]
+        if parts:
+            out[axis] = sum(parts) % 360
+    if uvlock:
+        out["uvlock"] = True
+    return out
+
+
+def _matrix_when(
+    props: List[BlockProperty], combos: List[Tuple[str, ...]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Multipart condition matching exactly these combos: one "a|b" clause per
+    property when they form a product, an OR of single combos otherwise.
+    None means "always".
+    """
+    sets = [
+        sorted({c[i] for c in combos}, key=p.values.index) for i, p in enumerate(props)
+    ]
+    size = 1
+    for s in sets:
+        size *= len(s)
+    if size == len(combos):
+        when = {
+            p.name: "|".join(vals)
+            for p, vals in zip(props, sets)
+            if len(vals) < len(p.values) or len(p.values) == 1
+        }
+        return when or None
+    return {"OR": [{p.name: v for p, v in zip(props, c)} for c in combos]}
+
+
+def property_matrix_blockstate(
+    model: str,
+    properties: List[BlockProperty],
+    *,
+    uvlock: bool = False,
+    encoding: str = "auto",
+) -> Dict[str, Any]:
+    """
+    Blockstate for a property matrix. Only properties that change the look
+    are expanded, and with encoding="auto" the smaller (serialized) of the
+    "variants" and "multipart" forms is returned; multipart wins when many
+    states share a model/rotation (e.g. axis-symmetric models).
+
+    Both forms still enumerate the product of the keyed properties: a
+    multipart part renders one more model, so rotations and model suffixes
+    of several properties cannot be split into per-property parts. Size and
+    time grow with that product (4 facings x 2 open x 2 half = 16 entries).
+    """
+    props = [p for p in properties if p.keyed]
+    combos = list(itertools.product(*(p.values for p in props)))
+
+    variants: Dict[str, Any] = {}
+    groups: Dict[str, List[Tuple[str, ...]]] = {}
+    applies: Dict[str, Dict[str, Any]] = {}
+    for combo in combos:
+        apply = _matrix_apply(model, props, combo, uvlock)
+        key = ",".join(f"{p.name}={v}" for p, v in zip(props, combo))
+        variants[key] = apply
+        k = json_key(apply)
+        applies.setdefault(k, apply)
+        groups.setdefault(k, []).append(combo)
+
+    as_variants = {"variants": variants}
+    if encoding == "variants":
+        return as_variants
+
+    parts = []
+    for k, members in groups.items():
+        when = _matrix_when(props, members)
+        parts.append(
+            {"when": when, "apply": applies[k]} if when else {"apply": applies[k]}
+        )
+    as_multipart = {"multipart": parts}
+    if encoding == "multipart":
+        return as_multipart
+    return min(as_variants, as_multipart, key=lambda d: len(json_key(d)))
+
+
 def minecraft_blockstate_facing(namespace: str, block_id: str) -> Dict[str, Any]:
-    m = f"{namespace}:block/{block_id}"
-    return {
-        "variants": {
-            "facing=north": {"model": m, "y": 0},
-            "facing=east": {"model": m, "y": 90},
-            "facing=south": {"model": m, "y": 180},
-            "facing=west": {"model": m, "y": 270},
+    return property_matrix_blockstate(f"{namespace}:block/{block_id}", [FACING])
+
+
+# ----------------------------
+# Output optimizer (shared parents for models, shared blockstate shapes)
+# ----------------------------
+SHARED_MODEL_DIR = "shared"
+
+
+def json_key(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass(slots=True)
+class OptimizedBlockAssets:
+    models: Dict[str, Dict[str, Any]]  # path under models/block -> JSON
+    blockstates: Dict[str, Dict[str, Any]]  # block id -> JSON
+    item_models: Dict[str, Dict[str, Any]]  # item id -> JSON
+    aliases: Dict[str, str] = field(default_factory=dict)  # dropped -> kept model
+    shared_parents: int = 0
+    blockstate_shapes: int = 0
+
+    def write(
+        self, base_dir: Path, *, dry_run: bool = False, writer: Any = None
+    ) -> None:
+        """
+        writer: btg.py's run OutputWriter, if any (falls back to save_json).
+        """
+        files = (
+            [
+                (base_dir / "models" / "block" / f"{k}.json", v)
+                for k, v in self.models.items()
+            ]
+            + [
+                (base_dir / "blockstates" / f"{k}.json", v)
+                for k, v in self.blockstates.items()
+            ]
+            + [
+                (base_dir / "models" / "item" / f"{k}.json", v)
+                for k, v in self.item_models.items()
+            ]
+        )
+        for path, data in files:
+            if dry_run:
+                LOG.info("[DRY] Would write %s", path.as_posix())
+            elif writer is not None:
+                writer.write_json(path, data)
+            else:
+                save_json(path, data)
+
+
+def rewrite_model_refs(data: Any, namespace: str, aliases: Dict[str, str]) -> Any:
+    if not aliases:
+        return data
+    refs = {
+        f"{namespace}:block/{a}": f"{namespace}:block/{b}" for a, b in aliases.items()
+    }
+    return walk_json_mutate(data, lambda v: refs.get(v, v) if isinstance(v, str) else v)
+
+
+def optimize_block_assets(
+    namespace: str,
+    models: Dict[str, Dict[str, Any]],
+    blockstates: Dict[str, Dict[str, Any]],
+    item_models: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> OptimizedBlockAssets:
+    """
+    1. Byte-identical block models are written once; blockstates, item models
+       and child models referring to a dropped copy point at the kept one.
+    2. Models that share everything except "textures" (e.g. one Blockbench
+       model per wood/metal variant) get a shared parent under
+       models/block/shared/ holding that structure plus any texture entry
+       common to the whole group; each child keeps only its own textures, as
+       generate_inherited_block_model() does for kegs and barrels.
+
+    Blockstates cannot inherit, so they are only re-pointed at kept models;
+    blockstate_shapes counts their distinct structures (model refs ignored).
+    """
+    item_models = dict(item_models or {})
+
+    kept: Dict[str, str] = {}  # content key -> first model id
+    aliases: Dict[str, str] = {}
+    for mid in sorted(models):
+        key = json_key(models[mid])
+        if key in kept:
+            aliases[mid] = kept[key]
+        else:
+            kept[key] = mid
+
+    out_models = {
+        mid: rewrite_model_refs(data, namespace, aliases)
+        for mid, data in models.items()
+        if mid not in aliases
+    }
+
+    groups: Dict[str, List[str]] = {}
+    for mid in sorted(out_models):
+        shape = {k: v for k, v in out_models[mid].items() if k != "textures"}
+        if set(shape) - {"parent"}:
+            groups.setdefault(json_key(shape), []).append(mid)
+
+    shared = 0
+    for key, members in groups.items():
+        if len(members) < 2:
+            continue
+        textures = [dict(out_models[m].get("textures") or {}) for m in members]
+        common = {
+            k: v
+            for k, v in textures[0].items()
+            if all(t.get(k) == v for t in textures[1:])
         }
+        parent_id = (
+            f"{SHARED_MODEL_DIR}/{hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]}"
+        )
+        parent = json.loads(key)
+        if common:
+            parent["textures"] = common
+        out_models[parent_id] = parent
+        for m, tex in zip(members, textures):
+            child: Dict[str, Any] = {"parent": f"{namespace}:block/{parent_id}"}
+            own = {k: v for k, v in tex.items() if k not in common}
+            if own:
+                child["textures"] = own
+            out_models[m] = child
+        shared += 1
+
+    out_blockstates = {
+        bid: rewrite_model_refs(data, namespace, aliases)
+        for bid, data in blockstates.items()
     }
+    shapes = {
+        json_key(
+            walk_json_mutate(
+                bs, lambda v: "#model" if isinstance(v, str) and ":" in v else v
+            )
+        )
+        for bs in out_blockstates.values()
+    }
+
+    return OptimizedBlockAssets(
+        models=out_models,
+        blockstates=out_blockstates,
+        item_models={
+            iid: rewrite_model_refs(data, namespace, aliases)
+            for iid, data in item_models.items()
+        },
+        aliases=aliases,
+        shared_parents=shared,
+        blockstate_shapes=len(shapes),
+    )
+
+
+def log_optimized(opt: OptimizedBlockAssets, models_in: int) -> None:
+    LOG.info(
+        "Optimized block assets: %d -> %d model(s) (%d duplicate(s) dropped, %d shared parent(s)), "
+        "%d blockstate(s) with %d distinct shape(s).",
+        models_in,
+        len(opt.models),
+        len(opt.aliases),
+        opt.shared_parents,
+        len(opt.blockstates),
+        opt.blockstate_shapes,
+    )
 
 
 def load_lang(path: Path) -> Dict[str, str]:
@@ -126,6 +433,13 @@ def cmd_block_assets(args) -> int:
     namespace = str(getattr(args, "namespace", "modid") or "modid").strip()
     lang_file = str(getattr(args, "lang_file", "en_us.json") or "en_us.json")
     overwrite_lang = bool(getattr(args, "overwrite_lang", False))
+    dedupe_models = bool(getattr(args, "dedupe_models", False))
+    # btg.py main() passes its pooled writer; standalone use writes directly.
+    writer = getattr(args, "writer", None)
+    write_json = writer.write_json if writer is not None else save_json
+    properties = parse_block_properties(
+        str(getattr(args, "blockstate_properties", None) or "facing")
+    )
     dry_run = bool(getattr(args, "dry_run", False))
 
     model_templates_dir = Path(
@@ -160,6 +474,7 @@ def cmd_block_assets(args) -> int:
         return 0
 
     lang = load_lang(lang_path)
+    lang_before = dict(lang)
 
     written_block_models = 0
     written_blockstates = 0
@@ -169,6 +484,11 @@ def cmd_block_assets(args) -> int:
 
     seen_groups: set[str] = set()
 
+    # --dedupe-models: collected here and written after the optimizer pass.
+    block_models: Dict[str, Dict[str, Any]] = {}
+    blockstates: Dict[str, Dict[str, Any]] = {}
+    item_models: Dict[str, Dict[str, Any]] = {}
+
     for png in pngs:
         rel = png.relative_to(textures_dir) if textures_dir.is_dir() else Path(png.name)
         block_id = png.stem
@@ -200,7 +520,9 @@ def cmd_block_assets(args) -> int:
                 load_json(bs_template), new_ns=namespace
             )
         else:
-            blockstate_json = minecraft_blockstate_facing(namespace, block_id)
+            blockstate_json = property_matrix_blockstate(
+                f"{namespace}:block/{block_id}", properties
+            )
 
         # Item model + item forwarding definition
         item_model_json = minecraft_item_model_for_block(namespace, block_id)
@@ -211,16 +533,24 @@ def cmd_block_assets(args) -> int:
         item_model_path = models_item_dir / f"{block_id}.json"
         item_def_path = items_dir / f"{block_id}.json"
 
-        if dry_run:
+        if dedupe_models:
+            block_models[block_id] = model_json
+            blockstates[block_id] = blockstate_json
+            item_models[block_id] = item_model_json
+            if dry_run:
+                LOG.info("[DRY] Would write %s", item_def_path.as_posix())
+            else:
+                write_json(item_def_path, item_def_json)
+        elif dry_run:
             LOG.info("[DRY] Would write %s", model_path.as_posix())
             LOG.info("[DRY] Would write %s", bs_path.as_posix())
             LOG.info("[DRY] Would write %s", item_model_path.as_posix())
             LOG.info("[DRY] Would write %s", item_def_path.as_posix())
         else:
-            save_json(model_path, model_json)
-            save_json(bs_path, blockstate_json)
-            save_json(item_model_path, item_model_json)
-            save_json(item_def_path, item_def_json)
+            write_json(model_path, model_json)
+            write_json(bs_path, blockstate_json)
+            write_json(item_model_path, item_model_json)
+            write_json(item_def_path, item_def_json)
 
         written_block_models += 1
         written_blockstates += 1
@@ -243,6 +573,12 @@ def cmd_block_assets(args) -> int:
                 lang[item_key] = display_name
                 lang_changes += 1
 
+    if dedupe_models:
+        opt = optimize_block_assets(namespace, block_models, blockstates, item_models)
+        opt.write(base_dir, dry_run=dry_run, writer=writer)
+        log_optimized(opt, len(block_models))
+        written_block_models = len(opt.models)
+
     # ItemGroup lang entries
     for gid in sorted(seen_groups):
         key = f"itemGroup.{namespace}.{gid}"
@@ -252,7 +588,13 @@ def cmd_block_assets(args) -> int:
                 lang[key] = val
                 lang_changes += 1
 
-    if dry_run:
+    # Run-scoped accumulator from btg.py main(); standalone callers write directly.
+    acc = getattr(args, "lang_acc", None)
+    if acc is not None:
+        acc.update(
+            lang_path, {k: v for k, v in lang.items() if lang_before.get(k) != v}
+        )
+    elif dry_run:
         LOG.info(
             "[DRY] Would update %s (%d change(s))", lang_path.as_posix(), lang_changes
         )